@@ -0,0 +1,70 @@
+"""
+Measures how code generation time grows with the size of a program: many
+distinct constants, many blocks in one function, and many functions. Time
+per item should stay flat as sizes double.
+
+Usage: python benchmarks/codegen_scaling.py [--sizes N ...] [--runs N]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from little_duck import LittleDuckDescentParser, LittleDuckScanner
+from little_duck.analyzer import LittleDuckAnalyzer
+from little_duck.code_generator import LittleDuckCodeGenerator
+from little_duck.linker import LinkedProgram, link
+
+
+def constants_program(size: int) -> str:
+    body = '\n'.join(f"    x = x + {i}; y = y * {i}.5; print(\"s{i}\");" for i in range(size))
+    return f"program Big;\nmain {{\n    var x: int;\n    var y: float;\n    x = 0; y = 0.0;\n{body}\n    return 0;\n}}\nend;"
+
+def blocks_program(size: int) -> str:
+    body = '\n'.join(f"    if (x > {i % 7}) {{ var a: int; a = x; x = a + 1; }}" for i in range(size))
+    return f"program Big;\nmain {{\n    var x: int;\n    x = 0;\n{body}\n    return 0;\n}}\nend;"
+
+def functions_program(size: int) -> str:
+    functions = '\n'.join(f"int f{i}(n: int) : {{ total = total + n; return n; }}" for i in range(size))
+    calls = '\n'.join(f"    x = f{i}(x);" for i in range(size))
+    return f"program Big;\nvar total: int;\n{functions}\nmain {{\n    var x: int;\n    total = 0; x = 0;\n{calls}\n    return 0;\n}}\nend;"
+
+CASES: Dict[str, Callable[[int], str]] = {
+    'constants': constants_program,
+    'blocks': blocks_program,
+    'functions': functions_program,
+}
+
+def linked_program(code: str) -> LinkedProgram:
+    tree = LittleDuckDescentParser().parse(code, LittleDuckScanner())
+    return link([LittleDuckAnalyzer().analyze(tree)])
+
+def measure(code: str) -> float:
+    "Milliseconds it took to generate the code of a linked program"
+    quadruples, tables = linked_program(code)
+    start = time.perf_counter()
+    LittleDuckCodeGenerator().generate(tables, quadruples)
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Code generation scaling benchmark")
+    parser.add_argument("--sizes", type=int, nargs='*', default=[1000, 2000, 4000, 8000],
+                        help="Amount of items in each program")
+    parser.add_argument("--runs", type=int, default=3, help="Times each program is generated")
+    args = parser.parse_args()
+
+    for name, build in CASES.items():
+        print(f"{name}:")
+        for size in args.sizes:
+            code = build(size)
+            median = statistics.median(measure(code) for _ in range(args.runs))
+            print(f"{size:>8}: median {median:9.2f} ms, {median * 1000 / size:7.2f} us per item")
+
+
+if __name__ == "__main__":
+    main()
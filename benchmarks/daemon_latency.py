@@ -0,0 +1,70 @@
+"""
+Measures the latency of running a program from the command line: with
+run.py, which starts Python and the compiler every time, and with
+client.py, which sends the program to a daemon started beforehand.
+
+Usage: python benchmarks/daemon_latency.py [--runs N] [--workers N] [program] [-deps files]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def measure(command: List[str], runs: int) -> List[float]:
+    "Milliseconds each run of a command takes"
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+def wait_for(socket_path: str):
+    for _ in range(100):
+        if os.path.exists(socket_path):
+            return
+        time.sleep(0.1)
+    raise TimeoutError(f"Daemon didn't start on {socket_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Daemon latency benchmark")
+    parser.add_argument("program", type=str, nargs='?', default='code.ld', help="Program to run")
+    parser.add_argument("-deps", "--dependencies", type=str, nargs='*', default=['algorithms.ld'], help="Dependency files")
+    parser.add_argument("--runs", type=int, default=20, help="Times each way runs the program")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes of the daemon")
+    args = parser.parse_args()
+
+    program = [args.program, '-deps', *args.dependencies]
+    results = {
+        'run.py --no_cache': measure([sys.executable, 'run.py', *program, '--no_cache'], args.runs),
+        'run.py (cached)': measure([sys.executable, 'run.py', *program], args.runs),
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, 'daemon.sock')
+        daemon = subprocess.Popen([sys.executable, 'run.py', 'daemon', '--socket', socket_path,
+                                   '-w', str(args.workers), '--no_cache'],
+                                  cwd=ROOT, stdout=subprocess.DEVNULL)
+        try:
+            wait_for(socket_path)
+            results['client.py'] = measure([sys.executable, 'client.py', *program, '--socket', socket_path], args.runs)
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+    print(f"Median latency of {args.runs} runs of {args.program}:")
+    for name, times in results.items():
+        print(f"  {name:<18} {statistics.median(times):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Measures how analysis time grows with the size of a single expression:
+long chains of binary operations, and deeply nested parentheses. Time per
+term should stay flat as sizes double.
+
+Usage: python benchmarks/expression_scaling.py [--sizes N ...] [--runs N]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from little_duck import LittleDuckLexer, LittleDuckParser
+from little_duck.analyzer import LittleDuckAnalyzer
+
+
+def chain_expression(size: int) -> str:
+    return ' + '.join(f"x * {i} - f(x)" for i in range(size))
+
+def nested_expression(size: int) -> str:
+    return '(' * size + 'x' + ' - 1)' * size
+
+CASES: Dict[str, Callable[[int], str]] = {
+    'chain': chain_expression,
+    'nested': nested_expression,
+}
+
+def program(expression: str) -> str:
+    return f"program Big;\nint f(n: int) : {{ return n; }}\nmain {{\n    var x: int;\n    x = 1;\n    x = {expression};\n    return 0;\n}}\nend;"
+
+def measure(code: str, lexer: LittleDuckLexer, parser: LittleDuckParser) -> float:
+    tree = parser.parse(code, lexer)
+    start = time.perf_counter()
+    LittleDuckAnalyzer().analyze(tree)
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Expression analysis scaling benchmark")
+    parser.add_argument("--sizes", type=int, nargs='*', default=[1000, 2000, 4000, 8000, 16000],
+                        help="Amount of terms in each expression")
+    parser.add_argument("--runs", type=int, default=3, help="Times each program is analyzed")
+    args = parser.parse_args()
+
+    lexer = LittleDuckLexer()
+    little_duck_parser = LittleDuckParser()
+
+    for name, build in CASES.items():
+        print(f"{name}:")
+        for size in args.sizes:
+            code = program(build(size))
+            times = [measure(code, lexer, little_duck_parser) for _ in range(args.runs)]
+            median = statistics.median(times)
+            print(f"{size:>8}: median {median:9.2f} ms, {median * 1000 / size:7.2f} us per term")
+
+
+if __name__ == "__main__":
+    main()
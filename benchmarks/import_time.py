@@ -0,0 +1,52 @@
+"""
+Measures how long importing parts of the package takes in a new process,
+and which modules each import loads.
+
+Usage: python benchmarks/import_time.py [--runs N]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Runs in a new interpreter, prints the milliseconds it took and the loaded modules
+SCRIPT = """
+import sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+{statement}
+print((time.perf_counter() - start) * 1000)
+print(len([m for m in sys.modules if m.startswith(('little_duck', 'ply'))]))
+"""
+
+CASES = {
+    'package': "import little_duck",
+    'vm runner': "from little_duck import LittleDuckVirtualMachineRunner",
+    'compiler': "from little_duck import LittleDuckCompiler",
+}
+
+
+def measure(statement: str):
+    script = SCRIPT.format(root=str(ROOT), statement=statement)
+    output = subprocess.run([sys.executable, '-c', script],
+                            check=True, capture_output=True, text=True).stdout
+    time, modules = output.strip().splitlines()[-2:]
+    return float(time), int(modules)
+
+def main():
+    parser = argparse.ArgumentParser(description="Package import time benchmark")
+    parser.add_argument("--runs", type=int, default=10, help="Processes started per case")
+    args = parser.parse_args()
+
+    for name, statement in CASES.items():
+        results = [measure(statement) for _ in range(args.runs)]
+        times = [time for time, _ in results]
+        modules = results[-1][1]
+        print(f"{name:>10}: median {statistics.median(times):8.2f} ms, min {min(times):8.2f} ms, {modules} modules loaded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Reports memory used by the compiler on a large generated program, with
+tracemalloc: peak memory while parsing and analyzing it, the size of the
+syntax tree and quadruples that stay alive afterwards, and the peak of a
+whole compilation.
+
+Usage: python benchmarks/memory_report.py [--functions N]
+"""
+import argparse
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from little_duck import LittleDuckCompiler, LittleDuckParser, LittleDuckScanner
+from little_duck.analyzer import LittleDuckAnalyzer
+from parser_throughput import large_program
+
+def traced(function: Callable[[], Any]) -> Tuple[Any, int, int]:
+    "Result of a function, the memory it left allocated and its peak"
+    tracemalloc.start()
+    result = function()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+def megabytes(size: int) -> str:
+    return f"{size / 1024 / 1024:8.2f} MB"
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiler memory report")
+    parser.add_argument("--functions", type=int, default=1000, help="Functions in the generated program")
+    args = parser.parse_args()
+
+    code = large_program(args.functions, call_all=True)
+    print(f"Source: {code.count(chr(10))} lines, {len(code) / 1024:.0f} KB")
+
+    # Built before tracing, so tables and caches aren't counted
+    scanner, little_duck_parser = LittleDuckScanner(), LittleDuckParser()
+    tree, tree_size, parse_peak = traced(lambda: little_duck_parser.parse(code, scanner))
+    module, module_size, analysis_peak = traced(lambda: LittleDuckAnalyzer().analyze(tree))
+    print(f"Parse:    peak {megabytes(parse_peak)}, syntax tree {megabytes(tree_size)}")
+    print(f"Analysis: peak {megabytes(analysis_peak)}, quadruples and tables {megabytes(module_size)}")
+    del tree, module
+
+    with tempfile.TemporaryDirectory() as directory:
+        file = Path(directory) / 'large.ld'
+        file.write_text(code)
+        compiler = LittleDuckCompiler()
+        compiler.compile(str(file), []) # Warm up the lexer and parser
+        _, _, compile_peak = traced(lambda: compiler.compile(str(file), []))
+    print(f"Compile:  peak {megabytes(compile_peak)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Measures how long it takes to parse many dependency modules, one after
+the other and in a process pool. Tables are cached before measuring.
+
+Usage: python benchmarks/parallel_parsing.py [--modules N] [--functions N] [--workers N] [--runs N]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from little_duck import LittleDuckCompiler
+
+
+def write_modules(directory: Path, modules: int, functions: int) -> List[str]:
+    "Writes modules with many small functions, each importing the previous one"
+    files = []
+    for i in range(modules):
+        lines = [f"import Module{i - 1};" if i > 0 else "", f"program Module{i};"]
+        for j in range(functions):
+            lines += [
+                f"int f{i}_{j}(n: int) :",
+                "{",
+                "    var total: int;",
+                "    total = 0;",
+                "    while (n > 0) {",
+                "        if (n > 10) { total = total + n * 2; } else { total = total + n; }",
+                "        n = n - 1;",
+                "    }",
+                "    return total;",
+                "}",
+            ]
+        lines += ["main {", "    return 0;", "}", "end;"]
+
+        file = directory / f'module{i}.ld'
+        file.write_text('\n'.join(lines))
+        files.append(str(file))
+    return files
+
+def measure(files: List[str], workers: int) -> float:
+    compiler = LittleDuckCompiler(workers=workers)
+    start = time.perf_counter()
+    compiler.parse_modules(files)
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel module parsing benchmark")
+    parser.add_argument("--modules", type=int, default=32, help="Dependency modules to parse")
+    parser.add_argument("--functions", type=int, default=40, help="Functions in each module")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes in the pool")
+    parser.add_argument("--runs", type=int, default=5, help="Times each case is measured")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = write_modules(Path(directory), args.modules, args.functions)
+        measure(files[:1], 1) # Build the tables first
+
+        cases = {'sequential': 1, f'{args.workers} workers': args.workers}
+        for name, workers in cases.items():
+            times = [measure(files, workers) for _ in range(args.runs)]
+            print(f"{name:>12}: median {statistics.median(times):8.2f} ms, min {min(times):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Measures how parse time grows with the size of a program: bodies with
+more and more statements, functions with many parameters and calls with
+many arguments. Time per item should stay flat as sizes double.
+
+Usage: python benchmarks/parser_scaling.py [--sizes N ...] [--runs N]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from little_duck import LittleDuckLexer, LittleDuckParser
+
+
+def statements_program(size: int) -> str:
+    body = '\n'.join(f"    x = x + {i};" for i in range(size))
+    return f"program Big;\nmain {{\n    var x: int;\n    x = 0;\n{body}\n    return 0;\n}}\nend;"
+
+def functions_program(size: int) -> str:
+    functions = '\n'.join(f"int f{i}(n: int) : {{ return n; }}" for i in range(size))
+    return f"program Big;\n{functions}\nmain {{\n    return 0;\n}}\nend;"
+
+def arguments_program(size: int) -> str:
+    parameters = ', '.join(f"p{i}: int" for i in range(size))
+    arguments = ', '.join(str(i) for i in range(size))
+    return f"program Big;\nvoid f({parameters}) : {{ return; }}\nmain {{\n    f({arguments});\n    return 0;\n}}\nend;"
+
+CASES: Dict[str, Callable[[int], str]] = {
+    'statements': statements_program,
+    'functions': functions_program,
+    'arguments': arguments_program,
+}
+
+def measure(code: str, lexer: LittleDuckLexer, parser: LittleDuckParser) -> float:
+    start = time.perf_counter()
+    parser.parse(code, lexer)
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Parser scaling benchmark")
+    parser.add_argument("--sizes", type=int, nargs='*', default=[1000, 2000, 4000, 8000, 16000, 32000],
+                        help="Amount of items in each program")
+    parser.add_argument("--runs", type=int, default=3, help="Times each program is parsed")
+    args = parser.parse_args()
+
+    lexer = LittleDuckLexer()
+    little_duck_parser = LittleDuckParser()
+
+    for name, build in CASES.items():
+        print(f"{name}:")
+        for size in args.sizes:
+            code = build(size)
+            times = [measure(code, lexer, little_duck_parser) for _ in range(args.runs)]
+            median = statistics.median(times)
+            print(f"{size:>8}: median {median:9.2f} ms, {median * 1000 / size:7.2f} us per item")
+
+
+if __name__ == "__main__":
+    main()
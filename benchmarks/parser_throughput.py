@@ -0,0 +1,76 @@
+"""
+Measures source lines per second of the PLY parser and the hand written
+recursive descent parser on a large generated program. Both read tokens
+from the fast scanner, so the difference is only the parser.
+
+Usage: python benchmarks/parser_throughput.py [--functions N] [--runs N]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Union
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from little_duck import LittleDuckDescentParser, LittleDuckParser, LittleDuckScanner
+
+FUNCTION = """
+int f{i}(n: int, m: float, s: string,) : {{
+    var a, b: int;
+    var done: bool;
+    a = 0;
+    b = n * 2 + 1;
+    done = false;
+    while (a < b && !done) {{
+        if (a / 3 == n - 1 || a > 100) {{
+            done = true;
+        }} else {{
+            a = a + f{i}(a - 1, m * 1.5, "inner");
+        }}
+    }}
+    do {{
+        b = b - (a + -1) * 2;
+        print(s, b, m,);
+    }} while (b > 0);
+    return a;
+}}
+"""
+
+def large_program(functions: int, call_all: bool = False) -> str:
+    """
+    Program with many functions mixing every kind of statement and operator.
+    Main calls the first one, or every one with `call_all` so none of them
+    is dropped as unreachable when compiling.
+    """
+    declarations = ''.join(FUNCTION.format(i=i) for i in range(functions))
+    called = range(functions) if call_all else range(1)
+    calls = '\n'.join(f"    total = total + f{i}(1, 2.0, \"x\");" for i in called)
+    return f"program Large;\nvar total: int;\n{declarations}\nmain {{\n    total = 0;\n{calls}\n    return 0;\n}}\nend;\n"
+
+def measure(parser: Union[LittleDuckParser, LittleDuckDescentParser], text: str) -> float:
+    "Seconds it took to parse the text"
+    scanner = LittleDuckScanner()
+    start = time.perf_counter()
+    parser.parse(text, scanner)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Parser throughput benchmark")
+    parser.add_argument("--functions", type=int, default=2000, help="Functions in the generated program")
+    parser.add_argument("--runs", type=int, default=5, help="Times each parser reads the source")
+    args = parser.parse_args()
+
+    text = large_program(args.functions)
+    lines = text.count('\n')
+    print(f"Source: {lines} lines, {len(text) / 1024:.0f} KB")
+
+    for name, little_duck_parser in [('ply', LittleDuckParser()), ('descent', LittleDuckDescentParser())]:
+        seconds = statistics.median(measure(little_duck_parser, text) for _ in range(args.runs))
+        print(f"{name:>8}: {seconds * 1000:8.2f} ms, {lines / seconds / 1000:7.1f} K lines/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Measures tokens per second of the PLY lexer and the hand written scanner,
+on the Little Duck files of the repo repeated into a large source.
+
+Usage: python benchmarks/scanner_throughput.py [--copies N] [--runs N]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Union
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from little_duck import LittleDuckLexer, LittleDuckScanner
+
+
+def measure(lexer: Union[LittleDuckLexer, LittleDuckScanner], text: str):
+    "Returns the token count and seconds it took to read them all"
+    start = time.perf_counter()
+    tokens = lexer.input(text)
+    return len(tokens), time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Scanner throughput benchmark")
+    parser.add_argument("--copies", type=int, default=200, help="Times the repo files are repeated")
+    parser.add_argument("--runs", type=int, default=5, help="Times each lexer reads the source")
+    args = parser.parse_args()
+
+    sources = [path.read_text() for path in sorted(ROOT.glob('**/*.ld'))]
+    text = '\n'.join(sources) * args.copies
+    print(f"Source: {len(text) / 1024:.0f} KB")
+
+    for name, lexer in [('ply', LittleDuckLexer()), ('fast', LittleDuckScanner())]:
+        results = [measure(lexer, text) for _ in range(args.runs)]
+        count = results[0][0]
+        seconds = statistics.median(seconds for _, seconds in results)
+        print(f"{name:>5}: {count} tokens in {seconds * 1000:8.2f} ms, {count / seconds / 1e6:6.2f} M tokens/s")
+
+
+if __name__ == "__main__":
+    main()
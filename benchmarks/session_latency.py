@@ -0,0 +1,83 @@
+"""
+Measures the latency of compiling many small programs against the same
+library module: with a new compiler for every program, as separate runs
+of run.py do, and with one compiler session. The session should only
+spend time on the main module of each program.
+
+Usage: python benchmarks/session_latency.py [--functions N] [--programs N]
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from little_duck import LittleDuckCompiler, LittleDuckCompilerSession
+
+
+def library(functions: int) -> str:
+    declarations = '\n'.join(f"""
+int f{i}(n: int) : {{
+    var a: int;
+    a = n * {i} + 1;
+    while (a > 100) {{
+        a = a / 2;
+    }}
+    calls = calls + 1;
+    return a;
+}}""" for i in range(functions))
+    return f"program Library;\nvar calls: int;\n{declarations}\nmain {{\n    return 0;\n}}\nend;\n"
+
+def program(i: int, functions: int) -> str:
+    return f"""import Library;
+program Program{i};
+main {{
+    calls = 0;
+    print(f{i % functions}({i}), f{(i * 7) % functions}(2), calls);
+    return 0;
+}}
+end;
+"""
+
+def timings(compile: Callable[[str], None], files: List[str]) -> List[float]:
+    "Milliseconds it took to compile each program"
+    result = []
+    for file in files:
+        start = time.perf_counter()
+        compile(file)
+        result.append((time.perf_counter() - start) * 1000)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiler session latency benchmark")
+    parser.add_argument("--functions", type=int, default=200, help="Functions in the library module")
+    parser.add_argument("--programs", type=int, default=50, help="Programs compiled against the library")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        library_file = Path(directory) / 'library.ld'
+        library_file.write_text(library(args.functions))
+        files = []
+        for i in range(args.programs):
+            file = Path(directory) / f'program{i}.ld'
+            file.write_text(program(i, args.functions))
+            files.append(str(file))
+
+        dependencies = [str(library_file)]
+        session = LittleDuckCompilerSession()
+        cases = {
+            'compiler': lambda file: LittleDuckCompiler().compile(file, dependencies),
+            'session': lambda file: session.compile(file, dependencies),
+        }
+        for name, compile in cases.items():
+            result = timings(compile, files)
+            print(f"{name:>9}: first {result[0]:8.2f} ms, median {statistics.median(result[1:]):8.2f} ms per program")
+
+
+if __name__ == "__main__":
+    main()
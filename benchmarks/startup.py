@@ -0,0 +1,62 @@
+"""
+Measures how long it takes to build the lexer and parser in a new process,
+with and without the persisted PLY tables. Import time is not included.
+
+Usage: python benchmarks/startup.py [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Runs in a new interpreter, prints the milliseconds it took
+SCRIPT = """
+import sys, time
+sys.path.insert(0, {root!r})
+from little_duck.lexer import LittleDuckLexer
+from little_duck.parser import LittleDuckParser
+start = time.perf_counter()
+cache_tables = {cache_tables}
+options = {{}} if cache_tables else {{'write_tables': False, 'debug': False}}
+LittleDuckLexer(cache_tables=cache_tables)
+LittleDuckParser(cache_tables=cache_tables, **options)
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def measure(cache_tables: bool, cache_dir: str) -> float:
+    script = SCRIPT.format(root=str(ROOT), cache_tables=cache_tables)
+    env = dict(os.environ, LITTLE_DUCK_CACHE_DIR=cache_dir)
+    output = subprocess.run([sys.executable, '-c', script], env=env,
+                            check=True, capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Lexer and parser startup benchmark")
+    parser.add_argument("--runs", type=int, default=10, help="Processes started per case")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        results = {
+            'no cache': [measure(False, cache_dir) for _ in range(args.runs)],
+            'cold cache': [],
+            'warm cache': [],
+        }
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory() as empty_dir:
+                results['cold cache'].append(measure(True, empty_dir))
+
+        measure(True, cache_dir)
+        results['warm cache'] = [measure(True, cache_dir) for _ in range(args.runs)]
+
+    for name, times in results.items():
+        print(f"{name:>10}: median {statistics.median(times):8.2f} ms, min {min(times):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
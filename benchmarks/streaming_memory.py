@@ -0,0 +1,54 @@
+"""
+Compares peak memory of compiling a large generated program and saving
+its bytecode, with compiling it a function at a time straight into the
+bytecode file, with tracemalloc. Peak memory of the streaming compiler
+should grow with the syntax tree only, not with the quadruples.
+
+Usage: python benchmarks/streaming_memory.py [--sizes N ...]
+"""
+import argparse
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from little_duck import LittleDuckCompiler
+from little_duck.vm_bytecode import load_bytecode, save_bytecode
+from memory_report import megabytes
+from parser_throughput import large_program
+
+
+def peak(function: Callable[[], None]) -> int:
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming compilation memory benchmark")
+    parser.add_argument("--sizes", type=int, nargs='*', default=[500, 1000, 2000],
+                        help="Functions in each generated program")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source, output = Path(directory) / 'large.ld', Path(directory) / 'large.ldc'
+        compiler = LittleDuckCompiler()
+
+        for size in args.sizes:
+            source.write_text(large_program(size, call_all=True))
+            compiler.compile(str(source), []) # Warm up the lexer and parser
+
+            whole = peak(lambda: save_bytecode(compiler.compile(str(source), []), output))
+            whole_code = load_bytecode(output)
+            streamed = peak(lambda: compiler.compile_to_file(str(source), [], output))
+            assert load_bytecode(output) == whole_code
+            print(f"{size:>6} functions: whole program peak {megabytes(whole)}, a function at a time {megabytes(streamed)}")
+
+
+if __name__ == "__main__":
+    main()
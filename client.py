@@ -0,0 +1,121 @@
+import argparse
+import os
+import sys
+
+from little_duck.daemon_client import default_socket_path, request
+
+# Errors are shown like run.py does, by the status of their result
+ERROR_NAMES = {
+    'syntax_error': 'SyntaxError',
+    'semantic_error': 'SemanticError',
+    'compile_error': 'CompileError',
+    'runtime_error': 'VirtualMachineError',
+    'timeout': 'VirtualMachineError',
+}
+
+# Exit codes of the client
+SUCCESS = 0
+FAILURE = 1
+NO_DAEMON = 2
+
+
+def add_client_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--socket", type=str, default=default_socket_path(), help="Unix socket of the daemon")
+
+def add_program_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("input_file", type=str, help="Input source file")
+    parser.add_argument("-deps", "--dependencies", type=str, nargs='*', default=[], help="Dependency files")
+
+def program_request(command: str, args) -> dict:
+    return {
+        'command': command,
+        'cwd': os.getcwd(),
+        'program': args.input_file,
+        'dependencies': args.dependencies,
+    }
+
+def finish(result: dict) -> int:
+    "Shows the error of a result, returns the exit code of the client"
+    if result['status'] == 'ok':
+        return SUCCESS
+    print(f"{ERROR_NAMES.get(result['status'], 'Error')}:", result['error'])
+    return FAILURE
+
+#
+# Commands
+#
+def run_command(argv) -> int:
+    parser = argparse.ArgumentParser(description="Run Little Duck programs with a daemon started by 'run.py daemon'",
+                                     epilog="Use 'client.py compile' to write bytecode files and 'client.py stop' to stop the daemon.")
+    add_program_arguments(parser)
+    parser.add_argument("-t", "--timeout", type=float, help="Seconds the program may take, compilation included")
+    add_client_arguments(parser)
+    args = parser.parse_args(argv)
+
+    message = program_request('run', args)
+    if args.timeout is not None:
+        message['timeout'] = args.timeout
+
+    for answer in request(message, args.socket):
+        if 'status' in answer:
+            return finish(answer)
+        sys.stdout.write(answer['stdout'])
+        sys.stdout.flush()
+    return lost_daemon()
+
+def compile_command(argv) -> int:
+    parser = argparse.ArgumentParser(prog="client.py compile", description="Compile Little Duck code to bytecode with the daemon")
+    add_program_arguments(parser)
+    parser.add_argument("-o", "--output", type=str, help="Bytecode file to write, defaults to the input with .ldc extension")
+    add_client_arguments(parser)
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.input_file)[0] + '.ldc'
+    message = program_request('compile', args)
+    message['output'] = output
+
+    for answer in request(message, args.socket):
+        code = finish(answer)
+        if code == SUCCESS:
+            print("Compiled", args.input_file, "to", output)
+        return code
+    return lost_daemon()
+
+def stop_command(argv) -> int:
+    parser = argparse.ArgumentParser(prog="client.py stop", description="Stop the daemon")
+    add_client_arguments(parser)
+    args = parser.parse_args(argv)
+
+    for answer in request({'command': 'stop'}, args.socket):
+        print("Stopped daemon on", args.socket)
+        return finish(answer)
+    return lost_daemon()
+
+def lost_daemon() -> int:
+    print("The daemon closed the connection without an answer", file=sys.stderr)
+    return NO_DAEMON
+
+
+def main():
+    argv = sys.argv[1:]
+    try:
+        if argv and argv[0] == 'compile':
+            code = compile_command(argv[1:])
+        elif argv and argv[0] == 'stop':
+            code = stop_command(argv[1:])
+        else:
+            code = run_command(argv)
+
+    except (FileNotFoundError, ConnectionRefusedError):
+        print("No daemon is listening, start one with 'run.py daemon'", file=sys.stderr)
+        code = NO_DAEMON
+
+    except PermissionError as error:
+        print("Refusing to use the daemon:", error, file=sys.stderr)
+        code = NO_DAEMON
+
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,45 @@
-from .compiler import LittleDuckCompiler
-from .vm_runner import VirtualMachineRunner as LittleDuckVirtualMachineRunner
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .compiler import LittleDuckCompiler
+    from .descent_parser import LittleDuckDescentParser
+    from .lexer import LittleDuckLexer
+    from .parser import LittleDuckParser
+    from .scanner import LittleDuckScanner
+    from .session import CompilerSession as LittleDuckCompilerSession
+    from .vm_runner import VirtualMachineRunner as LittleDuckVirtualMachineRunner
+
+# Modules are only imported when their names are used, so running
+# compiled code never loads the compiler front end
+_lazy_imports = {
+    'LittleDuckCompiler': ('.compiler', 'LittleDuckCompiler'),
+    'LittleDuckCompilerSession': ('.session', 'CompilerSession'),
+    'LittleDuckDescentParser': ('.descent_parser', 'LittleDuckDescentParser'),
+    'LittleDuckLexer': ('.lexer', 'LittleDuckLexer'),
+    'LittleDuckParser': ('.parser', 'LittleDuckParser'),
+    'LittleDuckScanner': ('.scanner', 'LittleDuckScanner'),
+    'LittleDuckVirtualMachineRunner': ('.vm_runner', 'VirtualMachineRunner'),
+}
 
 __all__ = [
     'LittleDuckCompiler',
+    'LittleDuckCompilerSession',
+    'LittleDuckDescentParser',
+    'LittleDuckLexer',
+    'LittleDuckParser',
+    'LittleDuckScanner',
     'LittleDuckVirtualMachineRunner',
 ]
+
+def __getattr__(name: str) -> Any:
+    if name not in _lazy_imports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module_name, attribute = _lazy_imports[name]
+    value = getattr(import_module(module_name, __name__), attribute)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
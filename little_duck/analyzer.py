@@ -1,8 +1,10 @@
-from collections import deque
-from typing import List, Optional, Tuple, cast
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Type, cast
 
 from .errors import SemanticError
 from .nodes import (
+    ASTNode,
     AssignmentNode,
     BinaryOperationNode,
     DeclareVariableNode,
@@ -27,23 +29,52 @@ from .nodes import (
 from .quadruples import (
     Operand,
     PolishExpression,
-    PolishValue,
     Quadruple,
     QuadrupleConstVariable,
-    QuadrupleIdentifier,
     QuadrupleLineNumber,
     QuadrupleOperation,
-    QuadrupleTempVariable,
+    const_operand,
+    identifier_operand,
+    temp_operand,
 )
+from .linker import ModuleObject, place_function
 from .scope import FunctionMetadata, GlobalScope, Scope, VariableMetadata
 from .semantic_cubes import binary_semantic_cubes, unary_semantic_cubes
 from .stack import Stack
 
-AnalyzedProgram = Tuple[List[Quadruple], GlobalScope]
+# Fewer functions are analyzed sequentially, as starting workers would take longer
+MIN_PARALLEL_FUNCTIONS = 32
+
+# Steps of the expression analyzer
+VISIT, OPERATE, ARGUMENT, CALL = 'visit', 'operate', 'argument', 'call'
+
+
+@dataclass
+class FunctionFragment:
+    """
+    Analyzed function body. Line numbers, scope IDs and declaration indexes
+    are relative to its OPEN quadruple, until it's placed in its module.
+    """
+    function: FunctionMetadata
+    quadruples: List[Quadruple]
+    scope: Scope
+    constants: Set[QuadrupleConstVariable]
+    used_globals: Set[str]
+
+
+@dataclass
+class PendingCall:
+    "Call in an expression, waiting for its arguments to be analyzed"
+    node: NonVoidFunctionCallNode
+    function: FunctionMetadata
+    start: int # Where its arguments begin in the polish vector
+    argument_results: List[Operand]
+
 
 class LittleDuckAnalyzer():
-    def __init__(self, debug: bool = False):
+    def __init__(self, debug: bool = False, workers: int = 1):
         self.debug = debug
+        self.workers = workers
         self.module_name = ""
 
         self.scopes = Stack[Scope]()
@@ -51,57 +82,75 @@ class LittleDuckAnalyzer():
 
         self.quadruples: List[Quadruple] = []
         self.pending_jumps = Stack[int]()
+        self.used_globals: Set[str] = set()
+
+        # Globals each function of the module assigns, by function name
+        self.assigned_globals: Dict[str, Set[str]] = {}
 
     def analyze(self,
                 program: ProgramNode,
-                dependencies: AnalyzedProgram = ([], GlobalScope())) -> AnalyzedProgram:
+                imports: Optional[GlobalScope] = None) -> ModuleObject:
+        """
+        Analyzes a module on its own. `imports` has the functions and
+        variables of its dependencies, see `linker.import_scope`.
+        """
         # Analyze Program
         self.module_name = program.identifier
-        global_scope = self.a_ProgramNode(program, dependencies)
+        global_scope = self.a_ProgramNode(program, imports or GlobalScope())
+
+        # Keep only what this module declared
+        tables = GlobalScope()
+        tables.functions = {k: f for k, f in global_scope.functions.items() if f.module == self.module_name}
+        tables.variables = {k: v for k, v in global_scope.variables.items() if v.module == self.module_name}
+        tables.constants = global_scope.constants
+        tables.inner_scopes = global_scope.inner_scopes
 
         # Return generated quadruples and tables
-        return self.quadruples, global_scope
+        return ModuleObject(self.module_name, self.quadruples, tables)
+
+    def stream(self,
+               program: ProgramNode,
+               imports: Optional[GlobalScope] = None) -> Tuple[GlobalScope, Iterator[FunctionFragment]]:
+        """
+        Like `analyze`, but function bodies are analyzed one at a time while
+        the fragments are read, and never placed in the module, so only one
+        is kept in memory. Globals and function signatures are declared in
+        the returned scope before the first fragment is read.
+        """
+        self.module_name = program.identifier
+        global_scope = imports or GlobalScope()
+        self.scopes.push(global_scope)
+
+        self.a_DeclareVariableNode(DeclareVariableNode('exit_code', TypeNode('int')))
+        for variable in program.global_vars:
+            self.a_DeclareVariableNode(variable)
+
+        nodes = program.global_funcs + [program.main_func]
+        self.declare_functions(nodes)
+        return global_scope, map(self.analyze_function, nodes)
 
     #
     # Program & Scope handling
     #
-    def a_ProgramNode(self, node: ProgramNode, dependencies: AnalyzedProgram) -> GlobalScope:
+    def a_ProgramNode(self, node: ProgramNode, imports: GlobalScope) -> GlobalScope:
         self.log("Analyzing program", node.identifier)
-        dep_quadruples, dep_scope = dependencies
-
-        # Add startup jump
-        self.quadruples.append(
-            (QuadrupleOperation.GOTO, None, None, None))
-        self.pending_jumps.push(len(self.quadruples) - 1)
 
         # Create global scope
-        global_scope = dep_scope # GlobalScope()
+        global_scope = imports
         self.scopes.push(global_scope)
         self.log("Opened scope", "global")
 
         self.a_DeclareVariableNode(DeclareVariableNode('exit_code', TypeNode('int')))
 
-        # Add previous quadruples
-        self.quadruples += dep_quadruples
-
-        # Global variables & functions
+        # Global variables & functions, main included
         for variable in node.global_vars:
             self.a_DeclareVariableNode(variable)
-        for function in node.global_funcs:
-            self.a_FunctionDeclarationNode(function)
-
-        # Main function
-        self.a_FunctionDeclarationNode(node.main_func)
+        self.analyze_functions(node.global_funcs + [node.main_func])
 
         # Close global scope
         self.scopes.pop()
         self.log("Closed scope", "global")
 
-        # Create main func call
-        self.fill_pending_jump(self.pending_jumps.pop())
-        self.quadruples.append(
-            (QuadrupleOperation.FUNCTION_CALL, QuadrupleIdentifier('main'), None, QuadrupleIdentifier('exit_code')))
-
         self.log("Program", node.identifier, "analyzed successfully")
 
         return global_scope
@@ -132,7 +181,7 @@ class LittleDuckAnalyzer():
 
         # Create scope
         self.scopes.push(Scope(id=len(self.quadruples), function_name=node.identifier))
-        self.quadruples.append((QuadrupleOperation.OPEN_STACK_FRAME, QuadrupleIdentifier(node.identifier), None, None))
+        self.quadruples.append((QuadrupleOperation.OPEN_STACK_FRAME, identifier_operand(node.identifier), None, None))
         self.log("Opened function scope", node.identifier)
 
         # Build declare quadruples
@@ -141,7 +190,7 @@ class LittleDuckAnalyzer():
 
         # Build arg loading quadruples
         for argument in reversed(node.arguments):
-            assign_quadruple = (QuadrupleOperation.FUNCTION_ARGUMENT, None, None, QuadrupleIdentifier(argument.identifier))
+            assign_quadruple = (QuadrupleOperation.FUNCTION_ARGUMENT, None, None, identifier_operand(argument.identifier))
             self.quadruples.append(assign_quadruple)
             self.scopes.top().variables[argument.identifier].is_initialized = True
 
@@ -158,6 +207,113 @@ class LittleDuckAnalyzer():
 
         self.log("Closed function scope", node.identifier)
 
+    #
+    # Function bodies
+    #
+    def analyze_functions(self, nodes: List[FunctionDeclarationNode]):
+        """
+        Declares every function first, so they can call each other in any
+        order, then analyzes their bodies on their own, in parallel if there
+        are enough of them, and places them one after the other.
+        """
+        global_scope = cast(GlobalScope, self.scopes.bottom())
+        self.declare_functions(nodes)
+
+        # Second pass: bodies
+        if self.workers > 1 and len(nodes) >= MIN_PARALLEL_FUNCTIONS:
+            workers = min(self.workers, len(nodes))
+            self.log("Analyzing", len(nodes), "functions in", workers, "processes")
+            with ProcessPoolExecutor(max_workers=workers,
+                                     initializer=start_worker,
+                                     initargs=(type(self), self.debug, self.module_name, global_scope,
+                                               self.assigned_globals)) as executor:
+                fragments = list(executor.map(analyze_in_worker, nodes,
+                                              chunksize=max(1, len(nodes) // (workers * 4))))
+        else:
+            fragments = [self.analyze_function(node) for node in nodes]
+
+        for fragment in fragments:
+            self.place_fragment(fragment)
+
+        # Calls were registered on copies when analyzed by workers
+        for fragment in fragments:
+            for identifier in fragment.function.calls:
+                global_scope.functions[identifier].is_used = True
+
+    def declare_functions(self, nodes: List[FunctionDeclarationNode]):
+        "First pass: signatures, and globals assigned anywhere are initialized"
+        global_scope = cast(GlobalScope, self.scopes.bottom())
+        for node in nodes:
+            self.a_FunctionDeclarationNode(node)
+        self.assigned_globals = {node.identifier: assigned_globals(node) for node in nodes}
+        for identifiers in self.assigned_globals.values():
+            for identifier in identifiers:
+                variable = global_scope.get_variable(identifier)
+                if variable is not None:
+                    variable.is_initialized = True
+
+    def own_globals(self, function_name: str) -> List[VariableMetadata]:
+        """
+        Globals of the module only `function_name` assigns. Any other global
+        may have been assigned by another function before this one runs,
+        but these must be assigned in its body before they're read.
+        """
+        global_scope = cast(GlobalScope, self.scopes.bottom())
+        others = set().union(*(identifiers for name, identifiers in self.assigned_globals.items() if name != function_name))
+        variables = []
+        for identifier in self.assigned_globals.get(function_name, set()) - others:
+            variable = global_scope.get_variable(identifier)
+            if variable is not None and variable.module == self.module_name:
+                variables.append(variable)
+        return variables
+
+    def analyze_function(self, node: FunctionDeclarationNode) -> FunctionFragment:
+        "Analyzes the body of a declared function, as if it was the only one in the module"
+        global_scope = cast(GlobalScope, self.scopes.bottom())
+        function = global_scope.functions[node.identifier]
+
+        # Collect quadruples, constants and globals of this function only
+        module_quadruples, self.quadruples = self.quadruples, []
+        module_constants, global_scope.constants = global_scope.constants, set()
+        self.used_globals = set()
+
+        own_globals = self.own_globals(node.identifier)
+        for variable in own_globals:
+            variable.is_initialized = False
+        try:
+            self.a_FunctionScopeNode(node.body)
+        finally:
+            for variable in own_globals:
+                variable.is_initialized = True
+
+        fragment = FunctionFragment(function=function,
+                                    quadruples=self.quadruples,
+                                    scope=global_scope.inner_scopes.pop(),
+                                    constants=global_scope.constants,
+                                    used_globals=self.used_globals)
+
+        self.quadruples = module_quadruples
+        global_scope.constants = module_constants | fragment.constants
+
+        # Make sure function contains at least one return
+        # TODO: Detect return in all paths
+        if not function.returns:
+            type_name = node.type.identifier if node.type else 'void'
+            raise SemanticError(f"Function '{type_name} {node.identifier}' never returns", node)
+
+        return fragment
+
+    def place_fragment(self, fragment: FunctionFragment):
+        "Appends an analyzed function to the module quadruples"
+        global_scope = cast(GlobalScope, self.scopes.bottom())
+        self.quadruples += place_function(fragment.function, fragment.scope, fragment.quadruples, len(self.quadruples))
+        global_scope.add_function(fragment.function)
+        global_scope.inner_scopes.append(fragment.scope)
+
+        global_scope.constants |= fragment.constants
+        for identifier in fragment.used_globals:
+            global_scope.variables[identifier].is_used = True
+
     #
     # Statement analyzers
     #
@@ -181,7 +337,7 @@ class LittleDuckAnalyzer():
                                                     declare_index=len(self.quadruples)))
 
         # Build quadruple
-        # quadruple = (QuadrupleOperation.DECLARE, QuadrupleIdentifier(node.identifier), None, None)
+        # quadruple = (QuadrupleOperation.DECLARE, identifier_operand(node.identifier), None, None)
         # self.quadruples.append(quadruple)
 
         self.log("Declared variable", node.identifier)
@@ -211,23 +367,14 @@ class LittleDuckAnalyzer():
                                                    parameters=parameter_list,
                                                    returns=False,
                                                    is_used=node.identifier == 'main',
-                                                   start_index=len(self.quadruples)))
-        
+                                                   start_index=0)) # Set once placed
+
         # Build quadruple
-        # quadruple = (QuadrupleOperation.FUNCTION_DECLARATION, QuadrupleIdentifier(node.identifier), None, None)
+        # quadruple = (QuadrupleOperation.FUNCTION_DECLARATION, identifier_operand(node.identifier), None, None)
         # self.quadruples.append(quadruple)
 
         self.log("Declared function", node.identifier)
 
-        # Analize the body
-        self.a_FunctionScopeNode(node.body)
-
-        # Make sure function contains at least one return
-        # TODO: Detect return in all paths
-        if not global_scope.functions[node.identifier].returns:
-            type_name = node.type.identifier if node.type else 'void'
-            raise SemanticError(f"Function '{type_name} {node.identifier}' never returns", node)
-
     def a_AssignmentNode(self, node: AssignmentNode):
         # Evaluate expression
         # This will populate the 'type' field
@@ -252,12 +399,17 @@ class LittleDuckAnalyzer():
         
         # Build quadruple
         result = self.process_polish_expression(polish)
-        quadruple = (QuadrupleOperation.ASSIGN, result, None, QuadrupleIdentifier(node.identifier))
+        quadruple = (QuadrupleOperation.ASSIGN, result, None, identifier_operand(node.identifier))
         self.quadruples.append(quadruple)
 
         # Register the variable was initialized
         variable.is_initialized = True
 
+        # Writing a global variable is a side effect
+        function = self.current_function()
+        if function is not None and self.is_global_variable(variable):
+            function.has_side_effects = True
+
         self.log("Assigned to variable", node.identifier)
 
     def a_VoidFunctionCallNode(self, node: VoidFunctionCallNode):
@@ -304,11 +456,12 @@ class LittleDuckAnalyzer():
             self.quadruples.append(argument_quadruple)
         
         # Build call quadruple
-        quadruple = (QuadrupleOperation.FUNCTION_CALL, QuadrupleIdentifier(node.identifier), None, None)
+        quadruple = (QuadrupleOperation.FUNCTION_CALL, identifier_operand(node.identifier), None, None)
         self.quadruples.append(quadruple)
 
         # Register the function was used
         global_scope.functions[node.identifier].is_used = True
+        self.register_call(node.identifier)
 
         self.log("Called void function", node.identifier)
 
@@ -334,6 +487,11 @@ class LittleDuckAnalyzer():
         quadruple = (QuadrupleOperation.PRINT, None, None, None)
         self.quadruples.append(quadruple)
 
+        # Printing is a side effect
+        function = self.current_function()
+        if function is not None:
+            function.has_side_effects = True
+
         self.log("Printed in console")
 
     def a_IfConditionNode(self, node: IfConditionNode):
@@ -523,24 +681,24 @@ class LittleDuckAnalyzer():
 
     #
     # Expression analyzers
-    # Must return polish expression as a deque
+    # Append the expression to a polish vector, in postfix order
     #
-    def a_ValueNode(self, node: ValueNode) -> PolishExpression:
+    def a_ValueNode(self, node: ValueNode, polish: PolishExpression):
         # Passthrough value type
         node.type = TypeNode(node.value.primitive_type)
         self.log("Literal of type", node.value.primitive_type, ":", qstr(node.value.value))
 
         # Create const object
-        const_var = QuadrupleConstVariable(node.value.primitive_type, node.value.value)
+        const_var = const_operand(node.value.primitive_type, node.value.value)
 
         # Register constant in global scope
         global_scope = cast(GlobalScope, self.scopes.bottom())
         global_scope.constants.add(const_var)
 
-        # Build polish vector to return
-        return deque([const_var])
+        # Add to polish vector
+        polish.append(const_var)
 
-    def a_ReadVariableNode(self, node: ReadVariableNode) -> PolishExpression:
+    def a_ReadVariableNode(self, node: ReadVariableNode, polish: PolishExpression):
         # Check if variable exists
         variable: Optional[VariableMetadata] = None
         for scope in self.scopes:
@@ -557,27 +715,33 @@ class LittleDuckAnalyzer():
         if not variable.is_initialized:
             raise SemanticError(f"'{node.identifier}' was used before being initialized", node)
 
-        # temp_var = QuadrupleTempVariable(self.current_temp)
-        # quadruple = (QuadrupleOperation.READ, QuadrupleIdentifier(node.identifier), None, temp_var)
+        # temp_var = temp_operand(self.current_temp)
+        # quadruple = (QuadrupleOperation.READ, identifier_operand(node.identifier), None, temp_var)
         # self.current_temp += 1
         # self.quadruples.append(quadruple)
 
-        var = QuadrupleIdentifier(node.identifier)
+        var = identifier_operand(node.identifier)
 
         # Register the variable was used
         variable.is_used = True
+
+        # Result of function depends on global state
+        function = self.current_function()
+        if function is not None and self.is_global_variable(variable):
+            function.reads_globals = True
+            self.used_globals.add(node.identifier)
         
         self.log("Got variable", node.identifier)
 
-        # Build polish vector to return
-        return deque([var])
+        # Add to polish vector
+        polish.append(var)
     
-    def a_NonVoidFunctionCallNode(self, node: NonVoidFunctionCallNode) -> PolishExpression:
+    def a_NonVoidFunctionCallNode(self, node: NonVoidFunctionCallNode, polish: PolishExpression) -> PendingCall:
+        "Checks a call before its arguments are analyzed, see `call_argument` and `call_function`"
         # Prohibit calling main
         if node.identifier == 'main':
             raise SemanticError("Main function cannot be called from within the program", node)
 
-        # Check if function exists
         # Check if function exists
         global_scope = cast(GlobalScope, self.scopes.bottom())
         function = global_scope.get_function(node.identifier)
@@ -592,31 +756,36 @@ class LittleDuckAnalyzer():
         # Check if number of arguments match
         if len(function.parameters) != len(node.arguments):
             raise SemanticError(f"'{node.identifier}' takes {len(function.parameters)}, but {len(node.arguments)} were provided", node)
-        
-        # Evaluate arguments
-        argument_results: List[Operand] = []
 
-        for i, argument in enumerate(node.arguments):
-            parameter_name, parameter_type = function.parameters[i]
+        # Arguments are added to the polish vector after this point
+        return PendingCall(node, function, len(polish), [])
 
-            # Evaluate expression
-            # This will populate the 'type' field
-            polish_argument = self.analize_expression_node(argument)
-            self.log("Function call argument expression:", ' '.join(map(qstr, polish_argument)))
+    def call_argument(self, call: PendingCall, i: int, polish: PolishExpression):
+        "Generates an analyzed argument of a call, removing it from the polish vector"
+        argument = call.node.arguments[i]
+        parameter_name, parameter_type = call.function.parameters[i]
+        polish_argument = polish[call.start:]
+        del polish[call.start:]
+        self.log("Function call argument expression:", ' '.join(map(qstr, polish_argument)))
 
-            if argument.type is None:
-                raise SemanticError("Type of expression could not be inferred", argument)
+        if argument.type is None:
+            raise SemanticError("Type of expression could not be inferred", argument)
 
-            # Check if types match
-            if argument.type.identifier != parameter_type:
-                raise SemanticError(f"Parameter '{parameter_name}' is of type '{parameter_type}', not '{argument.type}'", node)
-            
-            # Cache result for later
-            result = self.process_polish_expression(polish_argument)
-            argument_results.append(result)
+        # Check if types match
+        if argument.type.identifier != parameter_type:
+            raise SemanticError(f"Parameter '{parameter_name}' is of type '{parameter_type}', not '{argument.type}'", call.node)
+        
+        # Cache result for later
+        result = self.process_polish_expression(polish_argument)
+        call.argument_results.append(result)
+
+    def call_function(self, call: PendingCall, polish: PolishExpression):
+        "Generates a call once all of its arguments are"
+        node, function = call.node, call.function
+        global_scope = cast(GlobalScope, self.scopes.bottom())
 
         # Build argument quadruples
-        for result in argument_results:
+        for result in call.argument_results:
             argument_quadruple = (QuadrupleOperation.FUNCTION_PARAMETER, result, None, None)
             self.quadruples.append(argument_quadruple)
         
@@ -625,25 +794,23 @@ class LittleDuckAnalyzer():
 
         # Build call quadruple
         current_scope = self.scopes.top()
-        temp_var = QuadrupleTempVariable(current_scope.current_temp)
-        quadruple = (QuadrupleOperation.FUNCTION_CALL, QuadrupleIdentifier(node.identifier), None, temp_var)
+        temp_var = temp_operand(current_scope.current_temp)
+        quadruple = (QuadrupleOperation.FUNCTION_CALL, identifier_operand(node.identifier), None, temp_var)
         current_scope.current_temp += 1
         self.quadruples.append(quadruple)
 
         # Register the function was used
         global_scope.functions[node.identifier].is_used = True
+        self.register_call(node.identifier)
 
         self.log(f"Called {function.type} function", node.identifier)
 
-        # Build polish vector to return
-        return deque([temp_var])
-
-    def a_BinaryOperationNode(self, node: BinaryOperationNode) -> PolishExpression:
-        # Evaluate expressions
-        # This will populate the 'type' field
-        polish_left = self.analize_expression_node(node.left_side)
-        polish_right = self.analize_expression_node(node.right_side)
+        # Add to polish vector
+        polish.append(temp_var)
 
+    def a_BinaryOperationNode(self, node: BinaryOperationNode, polish: PolishExpression):
+        # Both sides were analyzed before
+        # That populated their 'type' field
         if node.left_side.type is None:
             raise SemanticError("Type of expression could not be inferred", node.left_side)
         if node.right_side.type is None:
@@ -659,14 +826,12 @@ class LittleDuckAnalyzer():
         node.type = TypeNode(identifier=resulting_type)
         self.log("Performed binary operation", node.operator.value)
 
-        # Build polish vector to return
-        return self.create_binary_polish(node.operator, polish_left, polish_right)
-
-    def a_UnaryOperationNode(self, node: UnaryOperationNode) -> PolishExpression:
-        # Evaluate expression
-        # This will populate the 'type' field
-        polish = self.analize_expression_node(node.expression)
+        # Add to polish vector
+        self.add_binary_polish(node.operator, polish)
 
+    def a_UnaryOperationNode(self, node: UnaryOperationNode, polish: PolishExpression):
+        # Expression was analyzed before
+        # That populated its 'type' field
         if node.expression.type is None:
             raise SemanticError("Type of expression could not be inferred", node.expression)
 
@@ -681,41 +846,42 @@ class LittleDuckAnalyzer():
         node.type = TypeNode(identifier=resulting_type)
         self.log("Performed unary operation", node.operator.value)
 
-        # Build polish vector to return
-        return self.create_unary_polish(node.operator, polish)
+        # Add to polish vector
+        self.add_unary_polish(node.operator, polish)
 
     #
     # Operator shortcuts
+    # Operands are already in the polish vector
     #
-    def create_binary_polish(self,
-                             operator: QuadrupleOperation,
-                             polish_left: PolishExpression,
-                             polish_right: PolishExpression) -> PolishExpression:
+    def add_binary_polish(self,
+                          operator: QuadrupleOperation,
+                          polish: PolishExpression):
         global_scope = cast(GlobalScope, self.scopes.bottom())
 
         # Return variation based on shortcutted operator
         if operator == QuadrupleOperation.NOTEQUALS:
             equals = QuadrupleOperation.EQUALS
-            false = QuadrupleConstVariable('bool', False)
+            false = const_operand('bool', False)
             global_scope.constants.add(false)
 
-            return deque([equals, equals, *polish_left, *polish_right, false])
+            polish += [equals, false, equals]
+            return
 
         # Standard polish expression
-        return deque([operator, *polish_left, *polish_right])
+        polish.append(operator)
 
-    def create_unary_polish(self,
-                            operator: QuadrupleOperation,
-                            value: PolishExpression) -> PolishExpression:
+    def add_unary_polish(self,
+                         operator: QuadrupleOperation,
+                         polish: PolishExpression):
         global_scope = cast(GlobalScope, self.scopes.bottom())
 
         # Get operation and right side const
         if operator == QuadrupleOperation.SUBTRACTION:
             new_operator = QuadrupleOperation.MULTIPLICATION
-            const_var = QuadrupleConstVariable('int', -1)
+            const_var = const_operand('int', -1)
         elif operator == QuadrupleOperation.NOT:
             new_operator = QuadrupleOperation.EQUALS
-            const_var = QuadrupleConstVariable('bool', False)
+            const_var = const_operand('bool', False)
         else:
             raise ValueError("Unary operator", operator, "not implemented")
         
@@ -723,52 +889,37 @@ class LittleDuckAnalyzer():
         global_scope.constants.add(const_var)
 
         # Build final polish expression
-        return deque([new_operator, *value, const_var])
+        polish += [const_var, new_operator]
 
     #
     # Polish Expression handling
     #
     def process_polish_expression(self, polish: PolishExpression) -> Operand:
         current_scope = self.scopes.top()
-        stack = Stack[PolishValue]()
+        stack = Stack[Operand]()
 
-        # Add first item to the stack
-        stack.push(polish.popleft())
-        
-        # If first token is operation, more operations should be coming
-        while len(stack) > 1 or isinstance(stack.top(), QuadrupleOperation):
-            # See if operation can be processed
-            if (
-                len(stack) > 2 and \
-                isinstance(stack.top(2), QuadrupleOperation) and \
-                not isinstance(stack.top(1), QuadrupleOperation) and \
-                not isinstance(stack.top(0), QuadrupleOperation)
-            ):
-                # Operation can be created
-                right_side_value = stack.pop()
-                left_side_value = stack.pop()
-                operator = stack.pop()
-
-                # Create operation
-                temp_var = QuadrupleTempVariable(current_scope.current_temp)
-                quadruple = (operator, left_side_value, right_side_value, temp_var)
-                current_scope.current_temp += 1
-                self.quadruples.append(quadruple) # type: ignore[arg-type]
-
-                # Save temp var in stack
-                stack.push(temp_var)
-            else:
-                # If no operation is currently possible,
-                # get more tokens from polish vector
-                stack.push(polish.popleft())
-                # NOTE: Should never crash, because if deque has been
-                # fully read, all operations should be solvable
-                # A crash would indicate this algorithm is wrong
+        # Operators come after both of their operands
+        for value in polish:
+            if not isinstance(value, QuadrupleOperation):
+                stack.push(value)
+                continue
+
+            # Operation can be created
+            right_side_value = stack.pop()
+            left_side_value = stack.pop()
+
+            # Create operation
+            temp_var = temp_operand(current_scope.current_temp)
+            quadruple = (value, left_side_value, right_side_value, temp_var)
+            current_scope.current_temp += 1
+            self.quadruples.append(quadruple) # type: ignore[arg-type]
+
+            # Save temp var in stack
+            stack.push(temp_var)
 
         # At this point, stack will always have only 1 item
         # Process and return that remaining item
-        # (remember one item polish vectors skip the while loop entirely)
-        return stack.pop() # type: ignore[return-value]
+        return stack.pop()
 
     #
     # Helpers
@@ -783,10 +934,68 @@ class LittleDuckAnalyzer():
         new_quadruple = (old_quadruple[0], old_quadruple[1], old_quadruple[2], QuadrupleLineNumber(len(self.quadruples)))
         self.quadruples[quad_index] = new_quadruple
 
+    def current_function(self) -> Optional[FunctionMetadata]:
+        global_scope = cast(GlobalScope, self.scopes.bottom())
+        for scope in self.scopes:
+            if scope.function_name is not None:
+                return global_scope.get_function(scope.function_name)
+        return None
+
+    def is_global_variable(self, variable: VariableMetadata) -> bool:
+        global_scope = cast(GlobalScope, self.scopes.bottom())
+        return global_scope.get_variable(variable.identifier) is variable
+
+    def register_call(self, identifier: str):
+        # Save edge in call graph
+        function = self.current_function()
+        if function is not None:
+            function.calls.add(identifier)
+
     def analize_expression_node(self, node: ExpressionNode) -> PolishExpression:
-        # Analyze depending on node type
-        analyze_node = getattr(self, 'a_' + type(node).__name__)
-        return analyze_node(node)
+        """
+        Analyzes an expression, returns its polish vector in postfix order.
+        Nodes are visited with a stack of pending steps instead of recursion,
+        so long or deeply nested expressions never reach the recursion limit.
+
+        Function calls are generated as they're found, after their arguments.
+        Other operations are generated by `process_polish_expression`.
+        """
+        polish: PolishExpression = []
+        steps: List[Tuple[str, Any, int]] = [(VISIT, node, 0)]
+
+        while steps:
+            step, item, i = steps.pop()
+
+            if step == VISIT:
+                if isinstance(item, (BinaryOperationNode, UnaryOperationNode)):
+                    # Operands first, left to right
+                    steps.append((OPERATE, item, 0))
+                    if isinstance(item, BinaryOperationNode):
+                        steps.append((VISIT, item.right_side, 0))
+                        steps.append((VISIT, item.left_side, 0))
+                    else:
+                        steps.append((VISIT, item.expression, 0))
+                elif isinstance(item, NonVoidFunctionCallNode):
+                    # Each argument is generated before the next one is analyzed
+                    call = self.a_NonVoidFunctionCallNode(item, polish)
+                    steps.append((CALL, call, 0))
+                    for i in reversed(range(len(item.arguments))):
+                        steps.append((ARGUMENT, call, i))
+                        steps.append((VISIT, item.arguments[i], 0))
+                else:
+                    # Analyze depending on node type
+                    analyze_node = getattr(self, 'a_' + type(item).__name__)
+                    analyze_node(item, polish)
+
+            elif step == OPERATE:
+                analyze_node = getattr(self, 'a_' + type(item).__name__)
+                analyze_node(item, polish)
+            elif step == ARGUMENT:
+                self.call_argument(item, i, polish)
+            else:
+                self.call_function(item, polish)
+
+        return polish
 
     def analize_statement_node(self, node: StatementNode):
         # Analyze depending on node type
@@ -818,3 +1027,67 @@ def qstr(value) -> str:
     if isinstance(value, str):
         return f'"{value}"'
     return str(value)
+
+def assigned_globals(node: FunctionDeclarationNode) -> Set[str]:
+    "Names assigned somewhere in a function that aren't its parameters or local variables"
+    assigned: Set[str] = set()
+
+    def visit(statements: Iterable[StatementNode], local_names: Set[str]):
+        local_names = set(local_names) # Locals of inner scopes end with them
+        for statement in statements:
+            if isinstance(statement, DeclareVariableNode):
+                local_names.add(statement.identifier)
+            elif isinstance(statement, AssignmentNode) and statement.identifier not in local_names:
+                assigned.add(statement.identifier)
+            elif isinstance(statement, IfConditionNode):
+                visit(statement.body.statements, local_names)
+                if statement.else_body:
+                    visit(statement.else_body.statements, local_names)
+            elif isinstance(statement, (WhileCycleNode, DoWhileCycleNode)):
+                visit(statement.body.statements, local_names)
+
+    visit(node.body.statements, set(argument.identifier for argument in node.body.arguments))
+    return assigned
+
+def program_constants(node: ProgramNode) -> Set[QuadrupleConstVariable]:
+    """
+    Constants analyzing a program registers, found without analyzing it:
+    its literals, and the ones operators are rewritten with
+    """
+    constants: Set[QuadrupleConstVariable] = set()
+    pending: List[Any] = [node]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, list):
+            pending += item
+        elif isinstance(item, ASTNode):
+            if isinstance(item, ValueNode):
+                constants.add(const_operand(item.value.primitive_type, item.value.value))
+            elif isinstance(item, BinaryOperationNode) and item.operator == QuadrupleOperation.NOTEQUALS:
+                constants.add(const_operand('bool', False))
+            elif isinstance(item, UnaryOperationNode) and item.operator == QuadrupleOperation.SUBTRACTION:
+                constants.add(const_operand('int', -1))
+            elif isinstance(item, UnaryOperationNode):
+                constants.add(const_operand('bool', False))
+            pending += [getattr(item, f.name) for f in fields(item)]
+    return constants
+
+#
+# Worker processes
+#
+# Analyzer of the current worker process, with every signature of the module
+worker_analyzer: Optional[LittleDuckAnalyzer] = None
+
+def start_worker(analyzer_type: Type[LittleDuckAnalyzer],
+                 debug: bool,
+                 module_name: str,
+                 global_scope: GlobalScope,
+                 assigned_globals: Dict[str, Set[str]]):
+    global worker_analyzer
+    worker_analyzer = analyzer_type(debug=debug)
+    worker_analyzer.module_name = module_name
+    worker_analyzer.scopes.push(global_scope)
+    worker_analyzer.assigned_globals = assigned_globals
+
+def analyze_in_worker(node: FunctionDeclarationNode) -> FunctionFragment:
+    return cast(LittleDuckAnalyzer, worker_analyzer).analyze_function(node)
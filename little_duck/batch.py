@@ -0,0 +1,144 @@
+import io
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, cast
+
+from .errors import CompileError, SemanticError, VirtualMachineError
+from .errors import VirtualMachineRuntimeErrors as Errors
+from .session import CompilerSession
+from .vm_runner import VirtualMachineRunner
+
+# Result statuses
+OK = 'ok'
+SYNTAX_ERROR = 'syntax_error'
+SEMANTIC_ERROR = 'semantic_error'
+COMPILE_ERROR = 'compile_error'
+RUNTIME_ERROR = 'runtime_error'
+TIMEOUT = 'timeout'
+INTERNAL_ERROR = 'internal_error'
+
+
+@dataclass
+class BatchResult:
+    "Outcome of compiling and running a program, one line of the report"
+    program: str
+    status: str
+    exit_code: Optional[int]
+    stdout: str
+    error: Optional[str]
+    compile_ms: float
+    run_ms: float
+
+
+def program_files(paths: Iterable[str]) -> List[str]:
+    "Programs to run, directories give every Little Duck file in them"
+    files: List[str] = []
+    for path in paths:
+        if Path(path).is_dir():
+            files += sorted(str(file) for file in Path(path).glob('*.ld'))
+        else:
+            files.append(path)
+    return files
+
+def run_batch(programs: List[str],
+              dependencies: List[str],
+              workers: int = 1,
+              timeout: Optional[float] = None,
+              memo_size: int = 1024,
+              compiler_options: Optional[Dict[str, Any]] = None) -> Iterator[BatchResult]:
+    """
+    Compiles and runs every program, in worker processes if there are
+    more than one, each with a compiler session reused by its jobs.
+    Results are given in the order of `programs`, as they're ready.
+
+    A program stops running once `timeout` seconds passed since its job
+    began, compilation included. Compilation itself is never stopped.
+    """
+    options = compiler_options or {}
+    if workers <= 1 or len(programs) <= 1:
+        start_worker(options)
+        for program in programs:
+            yield run_job(program, dependencies, timeout, memo_size)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(programs)),
+                             initializer=start_worker,
+                             initargs=(options,)) as executor:
+        yield from executor.map(run_job, programs,
+                                [dependencies] * len(programs),
+                                [timeout] * len(programs),
+                                [memo_size] * len(programs))
+
+def write_report(results: Iterable[BatchResult], file: TextIO) -> Dict[str, int]:
+    "Writes results as JSON lines while they come, returns how many have each status"
+    statuses: Dict[str, int] = {}
+    for result in results:
+        file.write(json.dumps(asdict(result)) + '\n')
+        file.flush()
+        statuses[result.status] = statuses.get(result.status, 0) + 1
+    return statuses
+
+#
+# Worker processes
+#
+# Compiler session of the current worker process, shared by every job it runs
+worker_session: Optional[CompilerSession] = None
+
+def start_worker(options: Dict[str, Any]):
+    global worker_session
+    worker_session = CompilerSession(**options)
+    worker_session.front_end() # Build lexer and parser before the first job
+
+def run_job(program: str,
+            dependencies: List[str],
+            timeout: Optional[float],
+            memo_size: int) -> BatchResult:
+    output = io.StringIO()
+    result = execute_job(program, dependencies, timeout, memo_size, output)
+    result.stdout = output.getvalue()
+    return result
+
+def execute_job(program: str,
+                dependencies: List[str],
+                timeout: Optional[float],
+                memo_size: int,
+                output: TextIO) -> BatchResult:
+    "Compiles and runs a program with the worker's session, printing to `output`"
+    session = cast(CompilerSession, worker_session)
+    result = BatchResult(program, OK, None, '', None, 0.0, 0.0)
+
+    start = time.monotonic()
+    deadline = start + timeout if timeout is not None else None
+    compiled: Optional[float] = None
+    try:
+        code = session.compile(program, dependencies)
+        compiled = time.monotonic()
+        with redirect_stdout(output):
+            result.exit_code = VirtualMachineRunner(memo_size=memo_size).run_from_code(code, deadline)
+    except Exception as error: # A broken program never stops the worker
+        result.status, result.error = error_status(error)
+
+    end = time.monotonic()
+    result.compile_ms = milliseconds((compiled or end) - start)
+    result.run_ms = milliseconds(end - compiled) if compiled is not None else 0.0
+    return result
+
+def error_status(error: Exception) -> Tuple[str, str]:
+    "Status and message of a job that failed with `error`"
+    if isinstance(error, SyntaxError):
+        return SYNTAX_ERROR, str(error)
+    if isinstance(error, SemanticError):
+        return SEMANTIC_ERROR, error.message
+    if isinstance(error, CompileError):
+        return COMPILE_ERROR, error.message
+    if isinstance(error, VirtualMachineError):
+        timed_out = error.code == Errors.TIME_LIMIT_EXCEEDED.value[0]
+        return TIMEOUT if timed_out else RUNTIME_ERROR, error.message
+    return INTERNAL_ERROR, repr(error)
+
+def milliseconds(seconds: float) -> float:
+    return round(seconds * 1000, 3)
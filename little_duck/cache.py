@@ -0,0 +1,10 @@
+import os
+from pathlib import Path
+
+
+def cache_directory() -> Path:
+    "Root directory for files cached between compilations"
+    directory = os.environ.get('LITTLE_DUCK_CACHE_DIR')
+    if directory:
+        return Path(directory)
+    return Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'little_duck'
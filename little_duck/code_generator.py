@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 
 from .quadruples import (
     Operand,
@@ -26,8 +26,10 @@ type_map = {
 
 class LittleDuckCodeGenerator:
     def __init__(self,
-                 debug: bool = False):
+                 debug: bool = False,
+                 memoize: bool = False):
         self.debug = debug
+        self.memoize = memoize
         self.tables = GlobalScope()
         self.raw_quadruples: List[RawQuadruple] = []
 
@@ -35,6 +37,11 @@ class LittleDuckCodeGenerator:
         self.scope_stack = Stack[Scope]()
         self.variable_map_stack = Stack[Tuple[Dict[str, int], int, int]]()
 
+        # Indexes, so operands and scopes are found without scanning lists
+        self.constant_map: Dict[Tuple[int, Any], int] = {}
+        self.inner_scope_maps: Dict[Scope, Dict[int, Scope]] = {}
+        self.symbols: Dict[str, List[int]] = {}
+
         self.function_directory: List[FunctionDirectoryEntry] = []
         self.memory_templates: List[MemoryScopeTemplate] = []
         self.constants: List[Constant] = []
@@ -44,33 +51,62 @@ class LittleDuckCodeGenerator:
                  tables: GlobalScope,
                  raw_quadruples: List[RawQuadruple]) -> GeneratedCode:
         # Set values
-        self.tables = tables
         self.raw_quadruples = raw_quadruples
-
-        # Generate function directory & map
-        sorted_functions = sorted(self.tables.functions.values(),
+        sorted_functions = sorted(tables.functions.values(),
                                   key=lambda f: f.start_index)
-        for i, f in enumerate(sorted_functions):
-            self.function_directory.append(FunctionDirectoryEntry(i, f.start_index))
-            self.function_map[f.identifier] = i
+        self.start(tables, [f.identifier for f in sorted_functions])
+
+        # Generate new quadruples
+        self.quadruples = list(self.map_raw_quadruples(self.raw_quadruples))
+        self.function_directory = self.function_entries()
+
+        return (self.function_directory, self.memory_templates,
+                self.constants, self.quadruples)
+
+    def start(self, tables: GlobalScope, functions: List[str]):
+        "Numbers functions in the order they're placed, constants, and enters the global scope"
+        self.tables = tables
+
+        # Generate function map
+        for i, identifier in enumerate(functions):
+            self.function_map[identifier] = i
 
         # Generate constants table
         sorted_constants = sorted(self.tables.constants)
         self.constants = [(type_map[c.type], c.value) for c in sorted_constants]
+        for i, constant in enumerate(self.constants):
+            self.constant_map.setdefault(constant, i)
 
         # Process global scope
-        self.scope_stack.push(self.tables)
-        self.variable_map_stack.push(variable_map(len(self.constants), self.tables))
-        self.memory_templates.append(count_variables(self.tables))
-
-        # Generate new quadruples
-        self.map_raw_quadruples()
-
-        return (self.function_directory, self.memory_templates,
-                self.constants, self.quadruples)
-    
-    def map_raw_quadruples(self):
-        for i, raw_quadruple in enumerate(self.raw_quadruples):
+        self.push_scope(self.tables, len(self.constants))
+
+    def generate_function(self,
+                          scope: Scope,
+                          raw_quadruples: List[RawQuadruple],
+                          start: int) -> List[FinalQuadruple]:
+        """
+        Final quadruples of a function placed at `start`, for programs
+        generated one function at a time. Its scope isn't one of the global
+        scope's inner scopes, and it's forgotten once generated.
+        """
+        self.inner_scope_maps[self.tables] = {scope.id: scope}
+        quadruples = list(self.map_raw_quadruples(raw_quadruples, start))
+        self.inner_scope_maps.clear()
+        return quadruples
+
+    def function_entries(self) -> List[FunctionDirectoryEntry]:
+        "Function directory, once every function has been placed"
+        entries: List[FunctionDirectoryEntry] = []
+        for identifier, i in self.function_map.items():
+            f = self.tables.functions[identifier]
+            memoize = self.memoize and f.is_pure and f.type is not None
+            entries.append(FunctionDirectoryEntry(i, f.start_index, memoize))
+        return entries
+
+    def map_raw_quadruples(self,
+                           raw_quadruples: Iterable[RawQuadruple],
+                           start: int = 0) -> Iterator[FinalQuadruple]:
+        for i, raw_quadruple in enumerate(raw_quadruples, start):
             operation, left, right, result = raw_quadruple
             vm_operation = VirtualMachineInstruction[operation.name].value
 
@@ -80,26 +116,23 @@ class LittleDuckCodeGenerator:
             if operation == RawOp.OPEN_STACK_FRAME:
                 # handle OPEN_STACK_FRAME
                 # Get scope based on id (quad number)
-                stack = self.scope_stack.top().child(i)
+                stack = self.child_scope(self.scope_stack.top(), i)
                 offset = self.variable_map_stack.top()[2]
 
                 # Add new scope to stack
-                self.scope_stack.push(stack)
-                self.variable_map_stack.push(variable_map(offset, stack))
-                self.memory_templates.append(count_variables(stack))
+                self.push_scope(stack, offset)
 
                 self.log(i, "New variable map:", self.variable_map_stack.top())
                 self.log(i, "New memory template", len(self.memory_templates) - 1, self.memory_templates[-1])
 
                 # Add quadruple with memory template id
-                self.quadruples.append((vm_operation, len(self.memory_templates) - 1, None, None))
+                yield (vm_operation, len(self.memory_templates) - 1, None, None)
 
             elif operation == RawOp.CLOSE_STACK_FRAME:
                 # handle CLOSE_STACK_FRAME
-                self.quadruples.append((vm_operation, None, None, None))
+                yield (vm_operation, None, None, None)
 
-                self.scope_stack.pop()
-                self.variable_map_stack.pop()
+                self.pop_scope()
 
             #
             # Jumps
@@ -109,13 +142,13 @@ class LittleDuckCodeGenerator:
                 if not isinstance(result, QuadrupleLineNumber):
                     raise ValueError(f"GOTO doesnt end with Line Number: {result}")
                 if operation == RawOp.GOTO:
-                    self.quadruples.append((vm_operation, None, None, result.number))
+                    yield (vm_operation, None, None, result.number)
                 else:
                     # GOTOT/F condition
                     if left is None:
                         raise ValueError(f"Missing value in quadruple {i}: left")
                     value = self.relative_address(left)
-                    self.quadruples.append((vm_operation, value, None, result.number))
+                    yield (vm_operation, value, None, result.number)
 
             #
             # Functions
@@ -128,40 +161,40 @@ class LittleDuckCodeGenerator:
 
                 if result is None or isinstance(result, QuadrupleLineNumber):
                     # Function that returns void
-                    self.quadruples.append((vm_operation, function_id, None, None))
+                    yield (vm_operation, function_id, None, None)
                 else:
                     # Function that returns a value
                     value = self.relative_address(result)
-                    self.quadruples.append((vm_operation, function_id, None, value))
+                    yield (vm_operation, function_id, None, value)
 
             elif operation == RawOp.RETURN:
                 # handle RETURN
                 if left is None:
-                    self.quadruples.append((vm_operation, None, None, None))
+                    yield (vm_operation, None, None, None)
                 else:
                     value = self.relative_address(left)
-                    self.quadruples.append((vm_operation, value, None, None))
+                    yield (vm_operation, value, None, None)
 
             elif operation == RawOp.FUNCTION_PARAMETER:
                 # handle FUNCTION_PARAMETER
                 if left is None:
                     raise ValueError(f"Missing value in quadruple {i}: left")
                 value = self.relative_address(left)
-                self.quadruples.append((vm_operation, value, None, None))
+                yield (vm_operation, value, None, None)
 
             elif operation == RawOp.FUNCTION_ARGUMENT:
                 # handle FUNCTION_ARGUMENT
                 if not isinstance(result, QuadrupleIdentifier):
                     raise ValueError(f"Invalid value in quadruple {i}: result")
                 value = self.relative_address(result)
-                self.quadruples.append((vm_operation, None, None, value))
+                yield (vm_operation, None, None, value)
 
             #
             # Console
             #
             elif operation == RawOp.PRINT:
                 # handle PRINT
-                self.quadruples.append((vm_operation, None, None, None))
+                yield (vm_operation, None, None, None)
 
             #
             # Variables
@@ -175,7 +208,7 @@ class LittleDuckCodeGenerator:
                 
                 operand_value = self.relative_address(left)
                 result_value = self.relative_address(result)
-                self.quadruples.append((vm_operation, operand_value, None, result_value))
+                yield (vm_operation, operand_value, None, result_value)
 
             #
             # Binary Operations
@@ -192,7 +225,7 @@ class LittleDuckCodeGenerator:
                 left_value = self.relative_address(left)
                 right_value = self.relative_address(right)
                 result_value = self.relative_address(result)
-                self.quadruples.append((vm_operation, left_value, right_value, result_value))
+                yield (vm_operation, left_value, right_value, result_value)
 
             elif operation in (RawOp.EQUALS, RawOp.LESSTHAN, RawOp.MORETHAN):
                 # handle comparison operations
@@ -206,7 +239,7 @@ class LittleDuckCodeGenerator:
                 left_value = self.relative_address(left)
                 right_value = self.relative_address(right)
                 result_value = self.relative_address(result)
-                self.quadruples.append((vm_operation, left_value, right_value, result_value))
+                yield (vm_operation, left_value, right_value, result_value)
 
             elif operation in (RawOp.ADDITION, RawOp.SUBTRACTION, 
                                RawOp.MULTIPLICATION, RawOp.DIVISION):
@@ -221,18 +254,50 @@ class LittleDuckCodeGenerator:
                 left_value = self.relative_address(left)
                 right_value = self.relative_address(right)
                 result_value = self.relative_address(result)
-                self.quadruples.append((vm_operation, left_value, right_value, result_value))
+                yield (vm_operation, left_value, right_value, result_value)
 
             else:
                 raise ValueError(f"Unknown operation: {operation}")
 
+    #
+    # Scopes
+    #
+    def push_scope(self, scope: Scope, offset: int):
+        "Enters a scope, its variables hide the ones with the same name outside"
+        self.scope_stack.push(scope)
+        self.variable_map_stack.push(variable_map(offset, scope))
+        self.memory_templates.append(count_variables(scope))
+
+        for identifier, address in self.variable_map_stack.top()[0].items():
+            self.symbols.setdefault(identifier, []).append(address)
+
+    def pop_scope(self):
+        self.scope_stack.pop()
+        for identifier in self.variable_map_stack.pop()[0]:
+            self.symbols[identifier].pop()
+
+    def child_scope(self, scope: Scope, scope_id: int) -> Scope:
+        "Same as `scope.child(scope_id)`, indexing the inner scopes the first time"
+        inner_scopes = self.inner_scope_maps.get(scope)
+        if inner_scopes is None:
+            inner_scopes = {}
+            for inner_scope in scope.inner_scopes:
+                inner_scopes.setdefault(inner_scope.id, inner_scope)
+            self.inner_scope_maps[scope] = inner_scopes
+
+        if scope_id not in inner_scopes:
+            raise ValueError(f"Scope with id {scope_id} not found")
+        return inner_scopes[scope_id]
+
+    #
+    # Operands
+    #
     def relative_address(self, operand: Operand) -> int:
         if isinstance(operand, QuadrupleConstVariable):
-            for i, constant in enumerate(self.constants):
-                if constant[0] == type_map[operand.type]:
-                    if constant[1] == operand.value:
-                        return i
-            raise ValueError(f"Constant not found: {operand}")
+            address = self.constant_map.get((type_map[operand.type], operand.value))
+            if address is None:
+                raise ValueError(f"Constant not found: {operand}")
+            return address
 
         elif isinstance(operand, QuadrupleTempVariable):
             current_scope = self.variable_map_stack.top()
@@ -240,11 +305,11 @@ class LittleDuckCodeGenerator:
             return temp_offset + operand.number
         
         elif isinstance(operand, QuadrupleIdentifier):
-            for current_scope in self.variable_map_stack:
-                variable_map = current_scope[0]
-                if operand.identifier in variable_map:
-                    return variable_map[operand.identifier]
-            raise ValueError(f"Variable not found: {operand}")
+            # Innermost scope declaring it
+            addresses = self.symbols.get(operand.identifier)
+            if not addresses:
+                raise ValueError(f"Variable not found: {operand}")
+            return addresses[-1]
 
         else:
             raise ValueError(f"Operand type not supported: {type(operand)}")
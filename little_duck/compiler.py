@@ -1,55 +1,273 @@
-from typing import Callable, Dict, List, TypeVar
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy, deepcopy
+from dataclasses import replace
+from itertools import chain
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, Set, Tuple, TypeVar, Union
 
-from .analyzer import AnalyzedProgram, LittleDuckAnalyzer, qstr
+from .analyzer import LittleDuckAnalyzer, program_constants, qstr
 from .code_generator import LittleDuckCodeGenerator
 from .dependency_analyzer import LittleDuckDependencyAnalyzer
 from .dependency_graph import DependencyGraph
+from .descent_parser import LittleDuckDescentParser
 from .errors import CompileError
 from .lexer import LittleDuckLexer
+from .linker import (
+    ModuleObject,
+    check_duplicate,
+    import_scope,
+    link,
+    place_function,
+    reachable_functions,
+    split_functions,
+)
+from .module_cache import ModuleCache
+from .module_index import ModuleIndex
+from .module_index import module_name as declared_module_name
+from .optimizer import LittleDuckOptimizer
 from .parser import LittleDuckParser
-from .scope import GlobalScope
+from .program_cache import ProgramCache
+from .purity import analyze_purity
+from .quadruples import Quadruple, QuadrupleIdentifier, QuadrupleLineNumber, QuadrupleOperation
+from .scanner import LittleDuckScanner
+from .scope import GlobalScope, VariableMetadata
+from .vm_bytecode import BytecodeWriter
 from .vm_types import GeneratedCode
 
+# Fewer modules are parsed sequentially, as starting workers would take longer
+MIN_PARALLEL_MODULES = 4
+
 
 class LittleDuckCompiler():
-    def __init__(self, debug: bool = False):
+    def __init__(self,
+                 debug: bool = False,
+                 memoize: bool = False,
+                 optimize: bool = False,
+                 evaluation_steps: int = 10000,
+                 unroll_factor: int = 4,
+                 cache_tables: bool = True,
+                 program_cache: Optional[ProgramCache] = None,
+                 module_cache: Optional[ModuleCache] = None,
+                 workers: int = 1,
+                 search_paths: Optional[List[str]] = None,
+                 scanner: str = 'ply',
+                 parser_backend: str = 'ply'):
         self.debug = debug
+        self.memoize = memoize
+        self.optimize = optimize
+        self.evaluation_steps = evaluation_steps
+        self.unroll_factor = unroll_factor
+        self.cache_tables = cache_tables
+        self.program_cache = program_cache
+        self.module_cache = module_cache
+        self.workers = workers
+        self.search_paths = search_paths or []
+        self.scanner = scanner
+        self.parser_backend = parser_backend
+
+        # Built on first use, shared by every module
+        self.lexer: Optional[Union[LittleDuckLexer, LittleDuckScanner]] = None
+        self.parser: Optional[Union[LittleDuckParser, LittleDuckDescentParser]] = None
 
     def compile(self,
                 main_file_name: str,
                 dependency_file_names: List[str]) -> GeneratedCode:
-        
+
+        # Reuse the result of compiling the same files with the same options
+        if self.program_cache is not None:
+            module_files = ModuleIndex(dependency_file_names, self.search_paths).search_path_files()
+            return self.program_cache.compile([main_file_name] + dependency_file_names + module_files,
+                                              self.options(),
+                                              lambda: self.compile_program(main_file_name, dependency_file_names))
+
+        return self.compile_program(main_file_name, dependency_file_names)
+
+    def compile_program(self,
+                        main_file_name: str,
+                        dependency_file_names: List[str]) -> GeneratedCode:
+
         # Main file parsing
         main_module = self.parse_module(main_file_name)
+        main_imports, dependency_objects = self.analyze_dependencies(main_module, dependency_file_names)
 
-        if dependency_file_names:
-            # Compilation has dependencies, let's resolve them
-            self.log("Compilation has dependencies:", dependency_file_names)
+        # Analyze main module
+        analyzer = LittleDuckAnalyzer(debug=self.debug, workers=self.workers)
+        main_object = analyzer.analyze(main_module[0], main_imports)
+        self.log("File analyzed successfully")
+
+        # Place all modules in the program, leaving out functions main never calls
+        program_objects = dependency_objects + [main_object]
+        reachable = reachable_functions(program_objects)
+        self.log("Unreachable functions:", sorted(set(
+            f for o in program_objects for f in o.tables.functions) - reachable))
+
+        raw_quadruples, tables = link(program_objects, reachable)
+        self.log("Modules linked successfully")
+
+        # Find functions without side effects
+        pure_functions = analyze_purity(tables)
+        self.log("Pure functions:", sorted(pure_functions))
+
+        # Optimize intermediate code
+        if self.optimize:
+            optimizer = LittleDuckOptimizer(debug=self.debug,
+                                            evaluation_steps=self.evaluation_steps,
+                                            unroll_factor=self.unroll_factor)
+            raw_quadruples = optimizer.optimize(tables, raw_quadruples)
+            self.log("File optimized successfully")
+
+            if self.debug:
+                self.log_list(raw_quadruples, lambda q: f"({', '.join(list(map(qstr, q)))})")
+        
+        if self.debug:
+            self.log(tables)
+            self.log_list(raw_quadruples, lambda q: f"({', '.join(list(map(qstr, q)))})")
+
+        # Generate intermediate code
+        code_generator = LittleDuckCodeGenerator(debug=self.debug, memoize=self.memoize)
+        code = code_generator.generate(tables, raw_quadruples)
+
+        if self.debug:
+            func_dir, mem_list, constants, quadruples = code
+
+            self.log("Constants:")
+            self.log_list(constants, str)
+
+            self.log("Function directory:")
+            self.log_list(func_dir, str)
+
+            self.log("Memory scope templates:")
+            self.log_list(mem_list, str)
+
+            self.log("Final Quadruples:")
+            self.log_list(quadruples, lambda q: f"({', '.join(list(map(str, q)))})")
+
+        self.log("File compiled successfully")
+        return code
+
+    def compile_to_file(self,
+                        main_file_name: str,
+                        dependency_file_names: List[str],
+                        file: Union[str, Path, BinaryIO]):
+        """
+        Compiles a program straight into a bytecode file, a function at a
+        time: each function of the main module is analyzed, placed, generated
+        and written before the next one is analyzed, so the quadruples of the
+        whole program are never in memory. Dependencies are analyzed as usual.
+
+        Every function is kept, as unreachable ones are only known once the
+        whole program is analyzed, and programs can't be optimized.
+        """
+        if isinstance(file, (str, Path)):
+            try:
+                with open(file, 'wb') as output:
+                    self.compile_to_file(main_file_name, dependency_file_names, output)
+            except BaseException:
+                Path(file).unlink(missing_ok=True) # Never leave half written programs
+                raise
+            return
+
+        if self.optimize:
+            raise CompileError("Programs can't be optimized while compiling a function at a time, the optimizer needs the whole program")
+
+        main_module = self.parse_module(main_file_name)
+        main_imports, dependency_objects = self.analyze_dependencies(main_module, dependency_file_names)
+
+        analyzer = LittleDuckAnalyzer(debug=self.debug)
+        global_scope, main_fragments = analyzer.stream(main_module[0], main_imports)
+        main_nodes = main_module[0].global_funcs + [main_module[0].main_func]
+
+        # Addresses of globals come after the constants, so every constant
+        # and global must be known before the first function is generated
+        tables = GlobalScope()
+        tables.constants = program_constants(main_module[0])
+        module_variables: List[Iterable[VariableMetadata]] = []
+        for module in dependency_objects:
+            tables.constants |= module.tables.constants
+            module_variables.append(module.tables.variables.values())
+        module_variables.append(v for v in global_scope.variables.values() if v.module == analyzer.module_name)
+
+        # Declared in the order modules are placed, exit_code always first
+        owners: Dict[str, str] = {}
+        tables.add_variable(replace(global_scope.variables['exit_code'], declare_index=0))
+        for variables in module_variables:
+            for variable in sorted(variables, key=lambda v: v.declare_index):
+                check_duplicate(owners, variable.identifier, variable.module)
+                if variable.identifier != 'exit_code':
+                    tables.add_variable(replace(variable, declare_index=len(tables.variables)))
+
+        # Functions are numbered in the order they're placed
+        function_order = [f.identifier for module in dependency_objects
+                          for f in sorted(module.tables.functions.values(), key=lambda f: f.start_index)]
+        function_order += [node.identifier for node in main_nodes]
+
+        code_generator = LittleDuckCodeGenerator(debug=self.debug, memoize=self.memoize)
+        code_generator.start(tables, function_order)
+        writer = BytecodeWriter(file)
+        writer.write(code_generator.map_raw_quadruples([jump_to(0)])) # Patched once main is placed
 
-            # Parse dependencies
-            parsed_dependencies = [self.parse_module(file) for file in dependency_file_names]
+        dependency_functions = ((copy(function), deepcopy(scope), quadruples) for module in dependency_objects
+                                for function, scope, quadruples in split_functions(module.quadruples, module.tables))
+        main_functions_code = ((f.function, f.scope, f.quadruples) for f in main_fragments)
+        position = 1
+        for function, scope, function_quadruples in chain(dependency_functions, main_functions_code):
+            check_duplicate(owners, function.identifier, function.module)
+            quadruples = place_function(function, scope, function_quadruples, position)
+            tables.add_function(function)
+            final_quadruples = code_generator.generate_function(scope, quadruples, position)
+            writer.write(final_quadruples)
+
+            if self.debug:
+                self.log("Function", function.identifier, "placed at", position)
+                self.log_list(quadruples, lambda q: f"({', '.join(list(map(qstr, q)))})", position)
+                self.log_list(final_quadruples, lambda q: f"({', '.join(list(map(str, q)))})", position)
+            position += len(quadruples)
+        self.log("File analyzed successfully")
+
+        # Call main at the end
+        writer.write(code_generator.map_raw_quadruples(
+            [(QuadrupleOperation.FUNCTION_CALL, QuadrupleIdentifier('main'), None, QuadrupleIdentifier('exit_code'))], position))
+        writer.patch(0, next(code_generator.map_raw_quadruples([jump_to(position)])))
+
+        # Only known once every function was analyzed, as the directory is written last
+        pure_functions = analyze_purity(tables)
+        self.log("Pure functions:", sorted(pure_functions))
+
+        writer.close(code_generator.function_entries(), code_generator.memory_templates, code_generator.constants)
+        self.log("File compiled successfully")
+
+    def analyze_dependencies(self, main_module, dependency_file_names: List[str]) -> Tuple[GlobalScope, List[ModuleObject]]:
+        """
+        Finds, parses and analyzes the modules main imports, directly or not.
+        Returns the scope main is analyzed in, and the module objects in the
+        order they're placed in the program.
+        """
+        # Only modules main imports, directly or not, are parsed
+        index = ModuleIndex(dependency_file_names, self.search_paths)
+        modules, dependency_files = self.find_modules(main_module, index)
+
+        if dependency_files or dependency_file_names:
+            # Compilation has dependencies, let's resolve them
+            self.log("Compilation has dependencies:", list(dependency_files.values()))
 
             # Build dependency graph
-            all_modules = [main_module] + parsed_dependencies
-            all_module_names = [t[1] for t in all_modules]
-            
             deps: Dict[str, List[str]] = {}
-            for tree, module_name, dependencies in [main_module] + parsed_dependencies:
-                # Check all dependencies exist
-                for dependency in dependencies:
-                    if dependency not in all_module_names:
-                        raise CompileError(f"Module {dependency} not found; imported on {module_name}")
-                # Write in graph
+            for tree, module_name, dependencies in modules.values():
                 deps[module_name] = dependencies
 
             dependency_graph = DependencyGraph()
             dependency_graph.build_graph(deps)
 
+            # Dependency files nothing imports were never parsed
+            for file_name in dependency_file_names:
+                if file_name not in dependency_files.values():
+                    dependency_graph.add_module(declared_module_name(file_name) or file_name)
+
             # Detect unused modules
             unused_modules = dependency_graph.remove_unused_modules(main_module[1])
 
             if unused_modules:
-                raise CompileError(f"Modules {', '.join(unused_modules)} are never imported by main module; they're totally unused")
+                raise CompileError(f"Modules {', '.join(sorted(unused_modules))} are never imported by main module; they're totally unused")
             
             # Detect cycles
             dependency_graph.detect_cycles() # Will raise error if cycle is found
@@ -63,54 +281,141 @@ class LittleDuckCompiler():
                 # Main module should be the last one to be compiled
                 raise CompileError(f"Invalid dependency graph, {main_module[1]} should be the first to be compiled, not {last_module}")
 
-            # Analyze dependencies
-            analyzed_program: AnalyzedProgram = ([], GlobalScope())
+            # Analyze dependencies on their own, in compilation order
+            objects: Dict[str, ModuleObject] = {}
+            object_keys: Dict[str, str] = {}
+            for dep_name in reversed(sorted_modules):
+                dep_tree = modules[dep_name][0]
+                imported_modules = transitive_dependencies(dep_name, deps)
+
+                # Reuse object if neither this module nor its dependencies changed
+                if self.module_cache is not None:
+                    source_key = self.module_cache.source_key(dependency_files[dep_name])
+                    object_keys[dep_name] = self.module_cache.object_key(source_key, [object_keys[m] for m in imported_modules])
+                    cached_object = self.module_cache.get_object(object_keys[dep_name])
+                    if cached_object is not None:
+                        objects[dep_name] = cached_object
+                        continue
 
-            while sorted_modules:
-                dep_name = sorted_modules.pop()
-                dep_tree = [(t[0]) for t in parsed_dependencies if t[1] == dep_name][0]
+                if dep_tree is None:
+                    dep_tree = self.parse_module(dependency_files[dep_name])[0]
 
-                dep_analyzer = LittleDuckDependencyAnalyzer(debug=self.debug)
-                analyzed_program = dep_analyzer.analyze(dep_tree, analyzed_program)
+                dep_analyzer = LittleDuckDependencyAnalyzer(debug=self.debug, workers=self.workers)
+                objects[dep_name] = dep_analyzer.analyze(dep_tree, self.importing_scope([objects[m] for m in imported_modules]))
+
+                if self.module_cache is not None:
+                    self.module_cache.put_object(object_keys[dep_name], objects[dep_name])
+
+            main_imports = self.importing_scope([objects[m] for m in transitive_dependencies(main_module[1], deps)])
+            dependency_objects = [objects[m] for m in reversed(sorted_modules)]
         else:
             # Compilation doesn't have dependencies
             self.log("Compilation doesn't have dependencies")
-            analyzed_program = ([], GlobalScope())
+            main_imports = GlobalScope()
+            dependency_objects = []
 
-        # Analyze main module
-        analyzer = LittleDuckAnalyzer(debug=self.debug)
-        raw_quadruples, tables = analyzer.analyze(main_module[0], analyzed_program)
-        self.log("File analyzed successfully")
-        
-        if self.debug:
-            self.log(tables)
-            self.log_list(raw_quadruples, lambda q: f"({', '.join(list(map(qstr, q)))})")
+        return main_imports, dependency_objects
 
-        # Generate intermediate code
-        code_generator = LittleDuckCodeGenerator(debug=self.debug)
-        code = code_generator.generate(tables, raw_quadruples)
+    def importing_scope(self, objects: List[ModuleObject]) -> GlobalScope:
+        "Scope a module importing `objects` is analyzed in, see `linker.import_scope`"
+        return import_scope(objects)
 
-        if self.debug:
-            func_dir, mem_list, constants, quadruples = code
+    def options(self) -> Dict[str, Any]:
+        "Options that change the generated code, as keyword arguments"
+        return {
+            'memoize': self.memoize,
+            'optimize': self.optimize,
+            'evaluation_steps': self.evaluation_steps,
+            'unroll_factor': self.unroll_factor,
+        }
 
-            self.log("Constants:")
-            self.log_list(constants, str)
+    def find_modules(self, main_module, index: ModuleIndex):
+        """
+        Parses the modules main imports, directly or not, a level of imports
+        at a time. Returns every module by name, and dependency files by name.
+        """
+        modules = {main_module[1]: main_module}
+        files: Dict[str, str] = {}
 
-            self.log("Function directory:")
-            self.log_list(func_dir, str)
+        pending = [main_module]
+        while pending:
+            # Modules imported for the first time, with the module importing them
+            importers: Dict[str, str] = {}
+            for _, module_name, dependencies in pending:
+                for dependency in dependencies:
+                    if dependency not in modules:
+                        importers.setdefault(dependency, module_name)
 
-            self.log("Memory scope templates:")
-            self.log_list(mem_list, str)
+            imported = sorted(importers)
+            for dependency in imported:
+                file_name = index.find(dependency)
+                if file_name is None:
+                    raise CompileError(f"Module {dependency} not found; imported on {importers[dependency]}")
+                files[dependency] = file_name
 
-            self.log("Final Quadruples:")
-            self.log_list(quadruples, lambda q: f"({', '.join(list(map(str, q)))})")
+            pending = self.parse_dependencies([files[dependency] for dependency in imported])
+            for dependency, module in zip(imported, pending):
+                if module[1] != dependency:
+                    raise CompileError(f"Module {dependency} was expected in {files[dependency]}, but it declares {module[1]}")
+                modules[dependency] = module
+
+        return modules, files
+
+    def front_end_options(self) -> Dict[str, Any]:
+        "Options of the lexer and parser, which never change the generated code"
+        return {
+            'cache_tables': self.cache_tables,
+            'scanner': self.scanner,
+            'parser_backend': self.parser_backend,
+        }
+
+    def parse_dependencies(self, file_names: List[str]):
+        "Like parse_modules, but trees are None if the module cache knows their imports"
+        if self.module_cache is None:
+            return self.parse_modules(file_names)
+
+        source_keys = [self.module_cache.source_key(file_name) for file_name in file_names]
+        headers = [self.module_cache.get_header(source_key) for source_key in source_keys]
+
+        # Only parse modules the cache doesn't know
+        pending = [i for i, header in enumerate(headers) if header is None]
+        parsed_modules = self.parse_modules([file_names[i] for i in pending])
+
+        modules: List[Any] = [None if header is None else (None, header[0], header[1]) for header in headers]
+        for i, (tree, module_name, dependencies) in zip(pending, parsed_modules):
+            self.module_cache.put_header(source_keys[i], (module_name, dependencies))
+            modules[i] = tree, module_name, dependencies
+        return modules
+
+    def parse_modules(self, file_names: List[str]):
+        "Parses modules in parallel when there are enough of them to pay for the workers"
+        if self.workers <= 1 or len(file_names) < MIN_PARALLEL_MODULES:
+            return [self.parse_module(file_name) for file_name in file_names]
+
+        workers = min(self.workers, len(file_names))
+        self.log("Parsing", len(file_names), "modules in", workers, "processes")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            modules = list(executor.map(parse_in_worker, file_names, [self.front_end_options()] * len(file_names)))
+
+        for tree, _, _ in modules:
+            self.log(tree)
+        return modules
+
+    def front_end(self) -> Tuple[Union[LittleDuckLexer, LittleDuckScanner], Union[LittleDuckParser, LittleDuckDescentParser]]:
+        "Lexer and parser, built on first use"
+        if self.lexer is None or self.parser is None:
+            if self.scanner == 'fast':
+                self.lexer = LittleDuckScanner()
+            else:
+                self.lexer = LittleDuckLexer(cache_tables=self.cache_tables)
+            if self.parser_backend == 'descent':
+                self.parser = LittleDuckDescentParser()
+            else:
+                self.parser = LittleDuckParser(cache_tables=self.cache_tables)
+        return self.lexer, self.parser
 
-        self.log("File compiled successfully")
-        return code
-    
     def parse_module(self, file_name: str):
-        lexer = LittleDuckLexer()
-        parser = LittleDuckParser()
+        lexer, parser = self.front_end()
 
         # Get the file contents
         file_contents = ""
@@ -119,8 +424,7 @@ class LittleDuckCompiler():
 
         # Only lex if token list will be shown
         if self.debug:
-            new_lexer = LittleDuckLexer()
-            tokens = new_lexer.input(file_contents)
+            tokens = lexer.input(file_contents)
             result = list(map(lambda x: x.type, tokens))
             self.log(result)
             self.log("File tokenized successfully")
@@ -141,12 +445,36 @@ class LittleDuckCompiler():
             print(*args)
 
     T = TypeVar('T')
-    def log_list(self, values: List[T], text: Callable[[T], str]):
+    def log_list(self, values: List[T], text: Callable[[T], str], start: int = 0):
         if not self.debug:
             return
         
-        number_width = len(str(len(values)))
-        for i, value in enumerate(values):
+        number_width = len(str(start + len(values)))
+        for i, value in enumerate(values, start):
             amount_of_spaces = number_width - len(str(i))
             spaces = ' ' * amount_of_spaces
             print(f"{i}:{spaces} {text(value)}")
+
+
+# Compiler of the current worker process, its lexer and parser are reused by every task
+worker_compiler: Optional[LittleDuckCompiler] = None
+
+def parse_in_worker(file_name: str, options: Dict[str, Any]):
+    global worker_compiler
+    if worker_compiler is None:
+        worker_compiler = LittleDuckCompiler(**options)
+    return worker_compiler.parse_module(file_name)
+
+def jump_to(line: int) -> Quadruple:
+    return (QuadrupleOperation.GOTO, None, None, QuadrupleLineNumber(line))
+
+def transitive_dependencies(module_name: str, deps: Dict[str, List[str]]) -> List[str]:
+    "Every module `module_name` imports, directly or not, sorted by name"
+    found: Set[str] = set()
+    pending = list(deps.get(module_name, []))
+    while pending:
+        dependency = pending.pop()
+        if dependency not in found:
+            found.add(dependency)
+            pending += deps.get(dependency, [])
+    return sorted(found)
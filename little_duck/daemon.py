@@ -0,0 +1,224 @@
+import os
+import signal
+import socket
+import stat
+import time
+import traceback
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, cast
+
+from . import batch
+from .batch import OK, BatchResult, error_status, execute_job, milliseconds, start_worker
+from .daemon_client import receive_messages, send_message
+from .session import CompilerSession
+from .vm_bytecode import save_bytecode
+
+# Status of requests the daemon doesn't understand
+BAD_REQUEST = 'bad_request'
+
+# Connections waiting for a worker before new ones are refused
+BACKLOG = 64
+
+
+class CompilerDaemon:
+    """
+    Compiles and runs programs for clients of a Unix socket, so they don't
+    start Python and build the compiler for every program.
+
+    The daemon warms up a compiler session and forks worker processes,
+    which inherit it and take turns accepting connections, one request at
+    a time. Their sessions keep dependency modules between requests, and
+    workers that die are replaced. Every request is compiled with the same
+    options. See `daemon_client` for the messages.
+
+    The socket can only be used by the user running the daemon, as files
+    are read and bytecode is written with that user's rights.
+    """
+    def __init__(self,
+                 socket_path: str,
+                 workers: int = 1,
+                 timeout: Optional[float] = None,
+                 memo_size: int = 1024,
+                 compiler_options: Optional[Dict[str, Any]] = None,
+                 debug: bool = False):
+        self.socket_path = socket_path
+        self.worker_count = max(workers, 1)
+        self.timeout = timeout
+        self.memo_size = memo_size
+        self.compiler_options = compiler_options or {}
+        self.debug = debug
+
+        self.pid = os.getpid()
+        self.workers: List[int] = []
+
+    def serve(self, listener: Optional[socket.socket] = None):
+        "Serves requests until the daemon gets SIGTERM, SIGINT or a stop request"
+        listener = listener or self.listen()
+        handlers = {number: signal.signal(number, stop_daemon) for number in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            start_worker(self.compiler_options)
+            while True:
+                while len(self.workers) < self.worker_count:
+                    self.workers.append(self.fork_worker(listener))
+
+                pid, status = os.wait()
+                if pid in self.workers:
+                    self.workers.remove(pid)
+                    self.log(f"Worker {pid} ended with status {status}, replacing it")
+        finally:
+            for number, handler in handlers.items():
+                signal.signal(number, handler)
+            self.stop_workers()
+            listener.close()
+            os.unlink(self.socket_path)
+
+    def listen(self) -> socket.socket:
+        "Creates the daemon's socket, which clients may connect to before it serves"
+        directory = os.path.dirname(os.path.abspath(self.socket_path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory, mode=0o700)
+        if not trusted_directory(directory):
+            raise OSError(f"Other users could replace the socket in {directory}")
+
+        if os.path.lexists(self.socket_path):
+            if os.lstat(self.socket_path).st_uid != os.getuid():
+                raise OSError(f"{self.socket_path} belongs to another user")
+            if daemon_is_running(self.socket_path):
+                raise OSError(f"A daemon is already listening on {self.socket_path}")
+            os.unlink(self.socket_path) # Left by a daemon that was killed
+
+        # Only the daemon's owner may connect, clients write files as that user
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+        try:
+            listener.bind(self.socket_path)
+        finally:
+            os.umask(umask)
+        listener.listen(BACKLOG)
+        return listener
+
+    def fork_worker(self, listener: socket.socket) -> int:
+        pid = os.fork()
+        if pid != 0:
+            return pid
+
+        # The daemon stops its workers when it's interrupted
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        try:
+            self.work(listener)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            os._exit(1)
+
+    def stop_workers(self):
+        for pid in self.workers:
+            os.kill(pid, signal.SIGTERM)
+        for pid in self.workers:
+            os.waitpid(pid, 0)
+        self.workers = []
+
+    #
+    # Worker processes
+    #
+    def work(self, listener: socket.socket):
+        self.log(f"Worker {os.getpid()} started")
+        while True:
+            connection, _ = listener.accept()
+            with connection:
+                try:
+                    self.handle(connection)
+                except OSError as error: # The client went away
+                    self.log(f"Worker {os.getpid()} lost its client: {error}")
+
+    def handle(self, connection: socket.socket):
+        try:
+            request = next(receive_messages(connection))
+            command = request['command']
+            if command == 'stop':
+                send_message(connection, {'status': OK})
+                os.kill(self.pid, signal.SIGTERM)
+                return
+
+            # Paths are relative to the client's working directory
+            directory = request.get('cwd', '/')
+            program = os.path.join(directory, request['program'])
+            dependencies = [os.path.join(directory, file) for file in request.get('dependencies', [])]
+            if command == 'run':
+                output = ClientOutput(connection)
+                result = execute_job(program, dependencies, self.job_timeout(request.get('timeout')), self.memo_size, output)
+                output.flush()
+            elif command == 'compile':
+                result = compile_job(program, dependencies, os.path.join(directory, request['output']))
+            else:
+                raise ValueError(f"Unknown command {command!r}")
+
+        except (StopIteration, KeyError, TypeError, ValueError) as error:
+            send_message(connection, {'status': BAD_REQUEST, 'error': repr(error)})
+            return
+
+        self.log(f"Worker {os.getpid()} {command}: {program}, {result.status}")
+        send_message(connection, asdict(result))
+
+    def job_timeout(self, requested: Optional[float]) -> Optional[float]:
+        "Clients may ask for less time than the daemon's timeout, never more"
+        if requested is None:
+            return self.timeout
+        if self.timeout is None:
+            return float(requested)
+        return min(float(requested), self.timeout)
+
+    def log(self, *args):
+        if self.debug:
+            print(*args, flush=True)
+
+
+class ClientOutput:
+    "Sends what a program prints to its client, a line or more at a time"
+    def __init__(self, connection: socket.socket):
+        self.connection = connection
+        self.buffer: List[str] = []
+
+    def write(self, text: str) -> int:
+        self.buffer.append(text)
+        if '\n' in text:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self.buffer:
+            send_message(self.connection, {'stdout': ''.join(self.buffer)})
+            self.buffer = []
+
+
+def compile_job(program: str, dependencies: List[str], bytecode_file: str) -> BatchResult:
+    "Compiles a program with the worker's session and saves its bytecode"
+    session = cast(CompilerSession, batch.worker_session)
+    result = BatchResult(program, OK, None, '', None, 0.0, 0.0)
+    start = time.monotonic()
+    try:
+        save_bytecode(session.compile(program, dependencies), bytecode_file)
+    except Exception as error:
+        result.status, result.error = error_status(error)
+    result.compile_ms = milliseconds(time.monotonic() - start)
+    return result
+
+def daemon_is_running(socket_path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(socket_path)
+            return True
+        except OSError:
+            return False
+
+def trusted_directory(directory: str) -> bool:
+    "Checks only the current user, or root, may add or remove files in a directory"
+    status = os.stat(directory)
+    if status.st_uid not in (os.getuid(), 0):
+        return False
+    # Files in sticky directories, like /tmp, can only be removed by their owner
+    return not status.st_mode & 0o022 or bool(status.st_mode & stat.S_ISVTX)
+
+def stop_daemon(number: int, frame: Any):
+    raise SystemExit(0)
@@ -0,0 +1,62 @@
+"""
+Messages between the Little Duck daemon and its clients.
+
+Messages are JSON objects, one per line. Clients connect to the daemon's
+Unix socket and send a single request:
+
+    {"command": "run", "cwd": path, "program": path, "dependencies": [paths], "timeout": seconds}
+    {"command": "compile", "cwd": path, "program": path, "dependencies": [paths], "output": path}
+    {"command": "stop"}
+
+Relative paths are resolved against "cwd", the client's working
+directory. The daemon reads programs and writes bytecode with the rights
+of the user running it, the only one who may use its socket. The timeout
+is optional, and can't be longer than the daemon's own. While a program runs, the daemon sends what it
+prints as {"stdout": text} messages. Every request ends with a message
+holding its "status", with the fields of batch.BatchResult for runs and
+compilations, and the connection is closed.
+
+Only the standard library is used here, so clients start quickly.
+"""
+import json
+import os
+import socket
+from typing import Any, Dict, Iterator, Optional
+
+Message = Dict[str, Any]
+
+
+def default_socket_path() -> str:
+    """
+    Socket in LITTLE_DUCK_SOCKET, or in the user's runtime directory. Without
+    XDG_RUNTIME_DIR it's in a directory of the user in the temporary one,
+    which the daemon creates only they can use.
+    """
+    if os.environ.get('LITTLE_DUCK_SOCKET'):
+        return os.environ['LITTLE_DUCK_SOCKET']
+    directory = os.environ.get('XDG_RUNTIME_DIR') or \
+                os.path.join(os.environ.get('TMPDIR', '/tmp'), f'little_duck-{os.getuid()}')
+    return os.path.join(directory, 'little_duck.sock')
+
+def request(message: Message, socket_path: Optional[str] = None) -> Iterator[Message]:
+    """
+    Sends a request to the daemon and yields its answers as they come.
+    Raises PermissionError if the socket belongs to another user, who
+    would get the request and could answer anything.
+    """
+    socket_path = socket_path or default_socket_path()
+    if os.stat(socket_path).st_uid != os.getuid():
+        raise PermissionError(f"{socket_path} belongs to another user")
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        send_message(connection, message)
+        yield from receive_messages(connection)
+
+def send_message(connection: socket.socket, message: Message):
+    connection.sendall(json.dumps(message).encode() + b'\n')
+
+def receive_messages(connection: socket.socket) -> Iterator[Message]:
+    with connection.makefile('rb') as lines:
+        for line in lines:
+            yield json.loads(line)
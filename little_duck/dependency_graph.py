@@ -1,4 +1,4 @@
-from typing import Dict, List, Set
+from typing import Dict, Iterator, List, Set
 
 from .errors import CompileError
 
@@ -28,9 +28,14 @@ class DependencyGraph:
                 self.add_dependency(module_name, dependency)
 
     def remove_unused_modules(self, main_module: str) -> Set[str]:
+        "Removes modules main doesn't import, directly or not"
         modules_used: Set[str] = set([main_module])
-        for module, dependencies in self.graph.items():
-            modules_used = modules_used.union(dependencies)
+        pending = [main_module]
+        while pending:
+            for dependency in self.graph.get(pending.pop(), set()):
+                if dependency not in modules_used:
+                    modules_used.add(dependency)
+                    pending.append(dependency)
 
         unused_modules = set(self.graph.keys()).difference(modules_used)
         for module in unused_modules:
@@ -39,35 +44,43 @@ class DependencyGraph:
         return unused_modules
 
     def detect_cycles(self):
-        def visit(node):
-            if node in self.stack:
-                raise CompileError(f"Circular dependency detected: {node}")
-            if node not in self.visited:
-                self.stack.add(node)
-                for neighbor in self.graph.get(node, []):
-                    visit(neighbor)
-                self.stack.remove(node)
-                self.visited.add(node)
-
         for module in self.graph:
             if module not in self.visited:
-                visit(module)
+                for _ in self.depth_first(module):
+                    pass
 
     def topological_sort(self):
-        def visit(node: str):
-            if node not in self.visited:
-                self.visited.add(node)
-                for neighbor in self.graph.get(node, set()):
-                    visit(neighbor)
-                self.sorted_modules.append(node)
-
         self.visited.clear()
         for module in self.graph:
             if module not in self.visited:
-                visit(module)
+                self.sorted_modules += self.depth_first(module)
 
         return self.sorted_modules[::-1]
 
+    def depth_first(self, start: str) -> Iterator[str]:
+        """
+        Visits the modules reachable from `start` that weren't visited yet,
+        yielding each one after all its dependencies. Doesn't recurse, so long
+        import chains never reach the recursion limit.
+        """
+        self.visited.add(start)
+        self.stack.add(start)
+        pending = [(start, iter(self.graph.get(start, set())))]
+        while pending:
+            node, neighbors = pending[-1]
+            for neighbor in neighbors:
+                if neighbor in self.stack:
+                    raise CompileError(f"Circular dependency detected: {neighbor}")
+                if neighbor not in self.visited:
+                    self.visited.add(neighbor)
+                    self.stack.add(neighbor)
+                    pending.append((neighbor, iter(self.graph.get(neighbor, set()))))
+                    break
+            else:
+                pending.pop()
+                self.stack.remove(node)
+                yield node
+
 if __name__ == "__main__":
     modules: Dict[str, List[str]] = {
         'module1': ['module2', 'module3'],
@@ -0,0 +1,383 @@
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Callable, Dict, List, Optional, Union
+
+from ply.lex import LexToken
+
+from .lexer import LittleDuckLexer
+from .nodes import (
+    AssignmentNode,
+    BinaryOperationNode,
+    BoolPrimitiveValueNode,
+    DeclareVariableNode,
+    DoWhileCycleNode,
+    ExpressionNode,
+    FloatPrimitiveValueNode,
+    FunctionDeclarationNode,
+    FunctionScopeNode,
+    IfConditionNode,
+    IntegerPrimitiveValueNode,
+    NonVoidFunctionCallNode,
+    PrimitiveValueNode,
+    PrintNode,
+    ProgramNode,
+    ReadVariableNode,
+    ReturnStatementNode,
+    ScopeNode,
+    StatementNode,
+    StringPrimitiveValueNode,
+    TypeNode,
+    UnaryOperationNode,
+    ValueNode,
+    VoidFunctionCallNode,
+    WhileCycleNode,
+)
+from .quadruples import QuadrupleOperation as Operation
+from .scanner import LittleDuckScanner
+
+# How tightly binary operators hold their operands, all are left associative
+# Expresion: && || < Subexpresion: == != < > < Exp: + - < Term: * /
+BINDING_POWERS: Dict[str, int] = {
+    'AND': 1, 'OR': 1,
+    'EQUALS': 2, 'NOTEQUALS': 2, 'LESS': 2, 'GREATER': 2,
+    'PLUS': 3, 'MINUS': 3,
+    'TIMES': 4, 'DIVIDE': 4,
+}
+
+TYPES = {'INT', 'FLOAT', 'STRING', 'BOOL'}
+
+CONSTANTS: Dict[str, Callable[..., PrimitiveValueNode]] = {
+    'CTE_FLOAT': FloatPrimitiveValueNode,
+    'CTE_INT': IntegerPrimitiveValueNode,
+    'CTE_STRING': StringPrimitiveValueNode,
+    'CTE_BOOL': BoolPrimitiveValueNode,
+}
+
+# Marks the next token hasn't been read yet
+UNREAD = LexToken()
+
+
+@dataclass
+class PendingExpression:
+    "Expresion being parsed, in parentheses or as an argument of `call`"
+    call: Optional[str] = None
+    unary: Optional[LexToken] = None # Applied to the call once it ends
+    arguments: List[ExpressionNode] = field(default_factory=list)
+    operands: List[ExpressionNode] = field(default_factory=list)
+    operators: List[LexToken] = field(default_factory=list)
+
+    def reduce(self, min_power: int):
+        "Combines the last operands with the operators binding at least `min_power`"
+        while self.operators and BINDING_POWERS[self.operators[-1].type] >= min_power:
+            operator = self.operators.pop()
+            right = self.operands.pop()
+            left = self.operands.pop()
+            self.operands.append(BinaryOperationNode(None, Operation(operator.value), left, right))
+
+    def finish(self) -> ExpressionNode:
+        "The whole expression, leaving room for the next argument"
+        self.reduce(1)
+        return self.operands.pop()
+
+
+###
+### Parser
+###
+class LittleDuckDescentParser():
+    """
+    Hand written parser for the grammar of LittleDuckParser, building the
+    same trees without any tables. Statements are parsed by recursive
+    descent, and expressions by operator precedence, with an explicit stack
+    of the parentheses and calls they're nested in.
+
+    Tokens are read when they're needed, like PLY does, so syntax errors
+    and illegal characters are reported with the same messages and in the
+    same order.
+    """
+    def __init__(self, **kwargs):
+        self.next_token: Callable[[], Optional[LexToken]] = lambda: None
+        self.token: Optional[LexToken] = UNREAD
+        self.block_ids = count()
+
+    def parse(self, text: str, lexer: Union[LittleDuckLexer, LittleDuckScanner]) -> ProgramNode:
+        lexer.lexer.lineno = 1
+        lexer.lexer.input(text)
+        self.next_token = lexer.lexer.token
+        self.token = UNREAD
+        self.block_ids = count() # Numbered in the order blocks end, like LittleDuckParser
+
+        program = self.program()
+        if self.peek() is not None:
+            self.error()
+        return program
+
+    #
+    # Tokens
+    #
+    def peek(self) -> Optional[LexToken]:
+        "Next token, without consuming it"
+        if self.token is UNREAD:
+            self.token = self.next_token()
+        return self.token
+
+    def accept(self, token_type: str) -> Optional[LexToken]:
+        "Consumes the next token if it's of the given type"
+        token = self.peek()
+        if token is not None and token.type == token_type:
+            self.token = UNREAD
+            return token
+        return None
+
+    def expect(self, token_type: str) -> LexToken:
+        "Consumes the next token, which must be of the given type"
+        token = self.peek()
+        if token is None or token.type != token_type:
+            self.error()
+        self.token = UNREAD
+        return token # type: ignore[return-value]
+
+    def next_type(self) -> Optional[str]:
+        token = self.peek()
+        return token.type if token is not None else None
+
+    def error(self):
+        token = self.peek()
+        if token:
+            raise SyntaxError(f"Syntax error '{token.value}' on line {token.lineno} {token}")
+        else:
+            raise SyntaxError("Syntax error at EOF")
+
+    #
+    # Program structure
+    #
+    def program(self) -> ProgramNode:
+        # Programa : IMPORTS PROGRAM ID SEMICOLON VARS FUNCS MAIN Body END SEMICOLON
+        dependencies: List[str] = []
+        while self.accept('import'):
+            dependencies.append(self.expect('ID').value)
+            self.expect('SEMICOLON')
+
+        self.expect('PROGRAM')
+        identifier = self.expect('ID').value
+        self.expect('SEMICOLON')
+
+        global_vars: List[DeclareVariableNode] = []
+        while self.next_type() == 'VAR':
+            global_vars.extend(self.var_declaration())
+
+        global_funcs: List[FunctionDeclarationNode] = []
+        while self.next_type() != 'MAIN':
+            global_funcs.append(self.function())
+
+        self.expect('MAIN')
+        body = FunctionScopeNode('main', self.body().statements, [])
+        main = FunctionDeclarationNode(identifier='main',
+                                       type=TypeNode('int'),
+                                       parameters=[],
+                                       body=body)
+        self.expect('END')
+        self.expect('SEMICOLON')
+        return ProgramNode(identifier, dependencies, global_vars, global_funcs, main)
+
+    def var_declaration(self) -> List[DeclareVariableNode]:
+        # VarDeclaration : VAR ListaVars COLON TYPE SEMICOLON
+        self.expect('VAR')
+        identifiers = [self.expect('ID').value]
+        while self.accept('COMMA'):
+            identifiers.append(self.expect('ID').value)
+        self.expect('COLON')
+        type = self.type()
+        self.expect('SEMICOLON')
+        return [DeclareVariableNode(identifier, type) for identifier in identifiers]
+
+    def type(self) -> TypeNode:
+        # TYPE : INT | FLOAT | STRING | BOOL
+        if self.next_type() not in TYPES:
+            self.error()
+        token = self.peek()
+        self.token = UNREAD
+        return TypeNode(token.value) # type: ignore[union-attr]
+
+    def function(self) -> FunctionDeclarationNode:
+        # Funcion : TipoFunc ID LPAREN Parametros RPAREN COLON Body
+        type = None if self.accept('VOID') else self.type()
+        identifier = self.expect('ID').value
+        self.expect('LPAREN')
+
+        # Parametros, may end with a comma
+        parameters: List[DeclareVariableNode] = []
+        while self.next_type() == 'ID':
+            parameter_identifier = self.expect('ID').value
+            self.expect('COLON')
+            parameters.append(DeclareVariableNode(parameter_identifier, self.type()))
+            if not self.accept('COMMA'):
+                break
+        self.expect('RPAREN')
+
+        self.expect('COLON')
+        body = FunctionScopeNode(identifier, self.body().statements, parameters)
+        return FunctionDeclarationNode(identifier, type, parameters, body)
+
+    def body(self) -> ScopeNode:
+        # Body : LBRACE Statements RBRACE
+        self.expect('LBRACE')
+        statements: List[StatementNode] = []
+        while True:
+            token_type = self.next_type()
+            if token_type == 'RBRACE':
+                break
+            if token_type == 'VAR':
+                statements.extend(self.var_declaration())
+            else:
+                statements.append(self.statement())
+        self.expect('RBRACE')
+        return ScopeNode(str(next(self.block_ids)), statements)
+
+    #
+    # Statements
+    #
+    def statement(self) -> StatementNode:
+        token_type = self.next_type()
+
+        if token_type == 'ID':
+            identifier = self.expect('ID').value
+            if self.accept('ASSIGN'):
+                # ASSIGNMENT : ID ASSIGN Expresion SEMICOLON
+                value = self.expression()
+                self.expect('SEMICOLON')
+                return AssignmentNode(identifier, value)
+
+            # F_Call : ID LPAREN Expresiones RPAREN SEMICOLON
+            self.expect('LPAREN')
+            arguments = self.arguments()
+            self.expect('SEMICOLON')
+            return VoidFunctionCallNode(identifier, arguments)
+
+        if token_type == 'IF':
+            # CONDITION : IF LPAREN Expresion RPAREN Body [ELSE Body]
+            self.expect('IF')
+            condition = self.condition()
+            body = self.body()
+            else_body = self.body() if self.accept('ELSE') else None
+            return IfConditionNode(condition, body, else_body)
+
+        if token_type == 'WHILE':
+            # CYCLE : WHILE LPAREN Expresion RPAREN Body
+            self.expect('WHILE')
+            condition = self.condition()
+            return WhileCycleNode(condition=condition, body=self.body())
+
+        if token_type == 'DO':
+            # CYCLE : DO Body WHILE LPAREN Expresion RPAREN SEMICOLON
+            self.expect('DO')
+            body = self.body()
+            self.expect('WHILE')
+            condition = self.condition()
+            self.expect('SEMICOLON')
+            return DoWhileCycleNode(condition=condition, body=body)
+
+        if token_type == 'PRINT':
+            # Print : PRINT LPAREN Expresiones RPAREN SEMICOLON
+            self.expect('PRINT')
+            self.expect('LPAREN')
+            arguments = self.arguments()
+            self.expect('SEMICOLON')
+            return PrintNode(arguments)
+
+        if token_type == 'return':
+            # RETURN : return [Expresion] SEMICOLON
+            self.expect('return')
+            if self.accept('SEMICOLON'):
+                return ReturnStatementNode(value=None)
+            value = self.expression()
+            self.expect('SEMICOLON')
+            return ReturnStatementNode(value=value)
+
+        self.error()
+        raise AssertionError # Unreachable, error always raises
+
+    def condition(self) -> ExpressionNode:
+        "Parenthesized condition of if and while statements"
+        self.expect('LPAREN')
+        condition = self.expression()
+        self.expect('RPAREN')
+        return condition
+
+    def arguments(self) -> List[ExpressionNode]:
+        "Expresiones and the closing parenthesis, the list may end with a comma"
+        arguments: List[ExpressionNode] = []
+        while not self.accept('RPAREN'):
+            arguments.append(self.expression())
+            if not self.accept('COMMA'):
+                self.expect('RPAREN')
+                break
+        return arguments
+
+    #
+    # Expressions
+    #
+    def expression(self) -> ExpressionNode:
+        """
+        Expresion, parsed with an explicit stack of the parentheses and calls
+        it's nested in, so deep nesting never reaches Python's recursion
+        limit. Operators are combined by precedence within each of them.
+        """
+        pending = [PendingExpression()]
+        while True:
+            # Factor : LPAREN Expresion RPAREN | MINUS Subfactor | NOT Subfactor | Subfactor
+            if self.accept('LPAREN'):
+                pending.append(PendingExpression())
+                continue
+            unary = self.accept('MINUS') or self.accept('NOT')
+
+            # Subfactor : CTE | ID LPAREN Expresiones RPAREN | ID
+            operand: ExpressionNode
+            token = self.peek()
+            if token is not None and token.type in CONSTANTS:
+                self.token = UNREAD
+                operand = ValueNode(None, CONSTANTS[token.type](value=token.value))
+            else:
+                identifier = self.expect('ID').value
+                if not self.accept('LPAREN'):
+                    operand = ReadVariableNode(None, identifier)
+                elif self.accept('RPAREN'):
+                    operand = NonVoidFunctionCallNode(None, identifier, [])
+                else:
+                    pending.append(PendingExpression(call=identifier, unary=unary))
+                    continue
+            if unary is not None:
+                operand = UnaryOperationNode(None, Operation(unary.value), operand)
+
+            # An operator continues the expression, anything else ends it
+            while True:
+                current = pending[-1]
+                current.operands.append(operand)
+                token = self.peek()
+                power = BINDING_POWERS.get(token.type, 0) if token is not None else 0
+                if power > 0:
+                    self.token = UNREAD
+                    current.reduce(power)
+                    current.operators.append(token) # type: ignore[arg-type]
+                    break
+
+                value = current.finish()
+                if len(pending) == 1:
+                    return value
+
+                if current.call is None:
+                    self.expect('RPAREN')
+                    pending.pop()
+                    operand = value
+                    continue
+
+                # Expresiones : the list may end with a comma
+                current.arguments.append(value)
+                if self.accept('COMMA'):
+                    if not self.accept('RPAREN'):
+                        break # Next argument
+                else:
+                    self.expect('RPAREN')
+                pending.pop()
+                operand = NonVoidFunctionCallNode(None, current.call, current.arguments)
+                if current.unary is not None:
+                    operand = UnaryOperationNode(None, Operation(current.unary.value), operand)
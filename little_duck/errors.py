@@ -1,12 +1,13 @@
 from enum import Enum
-from typing import Tuple
+from typing import TYPE_CHECKING, Tuple
 
-from .nodes import ASTNode
+if TYPE_CHECKING:
+    from .nodes import ASTNode
 
 
 class LittleDuckError(Exception):
     """Little Duck Code Analysis Exception"""
-    def __init__(self, message: str, node: ASTNode) -> None:
+    def __init__(self, message: str, node: 'ASTNode') -> None:
         super().__init__(message, node)
         self.message = message
         self.node = node
@@ -40,6 +41,8 @@ class VirtualMachineRuntimeErrors(Enum):
     STACK_TEMPLATE_NOT_FOUND = (22, "Memory allocation data not found")
     MEMORY_ADDRESS_MISSING = (23, "Memory address not found")
     GOTO_JUMP_MISSING = (24, "GOTO jump line not found")
+    STEP_LIMIT_EXCEEDED = (25, "Execution step limit exceeded")
+    TIME_LIMIT_EXCEEDED = (26, "Execution time limit exceeded")
 
 class VirtualMachineRuntimeError(VirtualMachineError):
     """Little Duck Virtual Machine Runtime Exception"""
@@ -63,3 +66,15 @@ class VirtualMachineMemoryError(VirtualMachineError):
                  address: int) -> None:
         super().__init__(*error.value, address)
         self.address = address
+
+class BytecodeErrors(Enum):
+    """Little Duck Bytecode File Exceptions Enum"""
+    NOT_BYTECODE = (30, "File is not Little Duck bytecode")
+    UNSUPPORTED_VERSION = (31, "Bytecode version is not supported")
+    CORRUPTED_FILE = (32, "Bytecode file is incomplete or corrupted")
+    UNSUPPORTED_CONSTANT = (33, "Constant can't be stored as bytecode")
+
+class BytecodeError(VirtualMachineError):
+    """Little Duck Bytecode File Exception"""
+    def __init__(self, error: BytecodeErrors, *args) -> None:
+        super().__init__(*error.value, *args)
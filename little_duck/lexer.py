@@ -1,5 +1,9 @@
+from sys import intern
+
 from ply import lex
 
+from .tables import build_table, load_table
+
 # Tokens y palabras reservadas
 reserved = {
     'program': 'PROGRAM',
@@ -34,12 +38,27 @@ tokens = [
 ### Lexer
 ###
 class LittleDuckLexer():
-    def __init__(self, **kwargs):
+    def __init__(self, cache_tables: bool = True, **kwargs):
         self.reserved = reserved
         self.tokens = tokens
-        self.lexer = lex.lex(module=self, **kwargs)
+
+        if not cache_tables:
+            self.lexer = lex.lex(module=self, **kwargs)
+            return
+
+        # Use tables from a previous run if possible
+        table = load_table('little_duck_lextab')
+        if table is not None:
+            self.lexer = lex.lex(module=self, optimize=True, lextab=table, **kwargs)
+        else:
+            self.lexer = build_table('little_duck_lextab', lambda directory: lex.lex(module=self,
+                                                                                    optimize=directory is not None,
+                                                                                    lextab='little_duck_lextab',
+                                                                                    outputdir=directory,
+                                                                                    **kwargs))
 
     def input(self, text: str):
+        self.lexer.lineno = 1
         self.lexer.input(text)
         return list(self.lexer)
 
@@ -74,6 +93,7 @@ class LittleDuckLexer():
     def t_ID(self, t):
         r'[a-zA-Z_][a-zA-Z0-9_]*'
         t.type = self.reserved.get(t.value, 'ID') # Checar si es palabra reservada
+        t.value = intern(t.value) # Names repeat, every use shares one string
         return t
 
     def t_CTE_FLOAT(self, t):
@@ -0,0 +1,163 @@
+from copy import copy, deepcopy
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .errors import CompileError
+from .quadruples import (
+    Quadruple,
+    QuadrupleConstVariable,
+    QuadrupleIdentifier,
+    QuadrupleLineNumber,
+    QuadrupleOperation,
+)
+from .scope import FunctionMetadata, GlobalScope, Scope, VariableMetadata
+
+LinkedProgram = Tuple[List[Quadruple], GlobalScope]
+
+# Function, its scope and its quadruples, placed at the function start index
+FunctionCode = Tuple[FunctionMetadata, Scope, List[Quadruple]]
+
+
+@dataclass
+class ModuleObject:
+    """
+    Analyzed module that can be placed anywhere in the program.
+
+    Line numbers, scope IDs, function start indexes and declaration indexes
+    are relative to the first quadruple of the module. Other modules are
+    only referenced by function and variable names.
+    """
+    identifier: str
+    quadruples: List[Quadruple]
+    tables: GlobalScope # Exported functions & variables, constants and scopes
+
+
+def import_scope(objects: Iterable[ModuleObject]) -> GlobalScope:
+    """
+    Global scope a module is analyzed in, with everything exported by its
+    dependencies. Metadata is copied so analysis never changes the objects.
+    """
+    scope = GlobalScope()
+    for module in objects:
+        for function in module.tables.functions.values():
+            scope.add_function(copy(function))
+        for variable in module.tables.variables.values():
+            scope.add_variable(copy(variable))
+    return scope
+
+def reachable_functions(objects: Iterable[ModuleObject], root: str = 'main') -> Set[str]:
+    "Functions `root` calls, directly or not, following the call graph"
+    calls: Dict[str, Set[str]] = {}
+    for module in objects:
+        for function in module.tables.functions.values():
+            calls[function.identifier] = function.calls
+
+    found: Set[str] = set()
+    pending = [root]
+    while pending:
+        identifier = pending.pop()
+        if identifier not in found and identifier in calls:
+            found.add(identifier)
+            pending += calls[identifier]
+    return found
+
+def link(objects: List[ModuleObject], functions: Optional[Set[str]] = None) -> LinkedProgram:
+    """
+    Places modules one after the other, moving their line numbers and
+    scope IDs to their final position, and merges their tables.
+    Main module must be the last one.
+
+    If `functions` is given, every other function is left out, along with
+    the global variables and constants only they used.
+
+    Program starts jumping to a call to main, placed after every module.
+    """
+    quadruples: List[Quadruple] = [(QuadrupleOperation.GOTO, None, None, None)]
+    tables = GlobalScope()
+    owners: Dict[str, str] = {}
+    variables: List[VariableMetadata] = []
+    used_names: Set[str] = {'exit_code'}
+
+    for module in objects:
+        base = len(quadruples)
+
+        # Functions are placed one by one, as the ones in between may be left out
+        for function, scope, function_quadruples in split_functions(module.quadruples, module.tables):
+            check_duplicate(owners, function.identifier, module.identifier)
+            if functions is not None and function.identifier not in functions:
+                continue
+
+            # Only what's placed is copied, so objects can be linked again
+            function, scope = copy(function), deepcopy(scope)
+            placed = place_function(function, scope, function_quadruples, len(quadruples))
+            tables.add_function(function)
+            tables.inner_scopes.append(scope)
+            quadruples += placed
+
+            for _, left, right, result in placed:
+                for operand in (left, right, result):
+                    if isinstance(operand, QuadrupleIdentifier):
+                        used_names.add(operand.identifier)
+                    elif isinstance(operand, QuadrupleConstVariable):
+                        tables.constants.add(operand)
+
+        for identifier, variable in module.tables.variables.items():
+            check_duplicate(owners, identifier, module.identifier)
+            variable = copy(variable)
+            if identifier != 'exit_code': # Always declared first
+                variable.declare_index += base
+            variables.append(variable)
+
+        if functions is None:
+            tables.constants |= module.tables.constants
+
+    # Globals may be used by any module placed after them
+    for variable in variables:
+        if functions is None or variable.identifier in used_names:
+            tables.add_variable(variable)
+
+    # Call main at the end
+    quadruples[0] = (QuadrupleOperation.GOTO, None, None, QuadrupleLineNumber(len(quadruples)))
+    quadruples.append(
+        (QuadrupleOperation.FUNCTION_CALL, QuadrupleIdentifier('main'), None, QuadrupleIdentifier('exit_code')))
+
+    return quadruples, tables
+
+def split_functions(quadruples: List[Quadruple], tables: GlobalScope) -> Iterator[FunctionCode]:
+    "Functions of an analyzed module, in the order they're placed in it"
+    function_scopes = {scope.id: scope for scope in tables.inner_scopes}
+    functions = sorted(tables.functions.values(), key=lambda f: f.start_index)
+    function_ends = [f.start_index for f in functions[1:]] + [len(quadruples)]
+    for function, end in zip(functions, function_ends):
+        start = function.start_index
+        yield function, function_scopes[start], quadruples[start:end]
+
+def place_function(function: FunctionMetadata,
+                   scope: Scope,
+                   quadruples: Iterable[Quadruple],
+                   position: int) -> List[Quadruple]:
+    "Moves a function and its scope to `position`, returns its moved quadruples"
+    offset = position - function.start_index
+    function.start_index = position
+    scope.id += offset
+    relocate_scope(scope, offset)
+
+    placed: List[Quadruple] = []
+    for operation, left, right, result in quadruples:
+        if isinstance(result, QuadrupleLineNumber):
+            result = QuadrupleLineNumber(result.number + offset)
+        placed.append((operation, left, right, result))
+    return placed
+
+def relocate_scope(scope: Scope, offset: int):
+    "Moves the variables and inner scopes of a scope `offset` quadruples"
+    for variable in scope.variables.values():
+        variable.declare_index += offset
+    for inner_scope in scope.inner_scopes:
+        inner_scope.id += offset
+        relocate_scope(inner_scope, offset)
+
+def check_duplicate(owners: Dict[str, str], identifier: str, module: str):
+    if identifier in owners:
+        raise CompileError(f"'{identifier}' is declared in modules {owners[identifier]} and {module}")
+    owners[identifier] = module
@@ -0,0 +1,100 @@
+import os
+import pickle
+from hashlib import sha256
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .cache import cache_directory
+from .linker import ModuleObject
+from .program_cache import compiler_signature, evict_least_recently_used, write_atomically
+
+# Change when the cache keys or stored files change
+CACHE_VERSION = 1
+
+ModuleHeader = Tuple[str, List[str]] # Module name and its imports
+
+
+class ModuleCache:
+    """
+    Objects of analyzed dependency modules, stored on disk.
+
+    An object depends on its source and on what its dependencies export,
+    so it's keyed by its source hash and the keys of its dependencies.
+    Changing a module only invalidates it and the modules importing it.
+    """
+    def __init__(self,
+                 directory: Optional[Path] = None,
+                 max_size: int = 64 * 1024 * 1024,
+                 debug: bool = False):
+        self.directory = directory or cache_directory() / 'modules'
+        self.max_size = max_size
+        self.debug = debug
+
+    #
+    # Keys
+    #
+    def source_key(self, file_name: str) -> str:
+        "Hash of a module's source and the compiler"
+        digest = sha256(f"{CACHE_VERSION}:{compiler_signature()}:".encode())
+        with open(file_name, 'rb') as file:
+            digest.update(file.read())
+        return digest.hexdigest()
+
+    def object_key(self, source_key: str, dependency_keys: List[str]) -> str:
+        "Key of a module object, given the object keys of everything it imports"
+        return sha256(':'.join([source_key] + dependency_keys).encode()).hexdigest()
+
+    #
+    # Stored values
+    #
+    def get_header(self, source_key: str) -> Optional[ModuleHeader]:
+        "Returns the name and imports of a module, without parsing it"
+        header = self.read(f"{source_key}.header.pickle")
+        if header is not None:
+            self.log("Module cache knows imports of", header[0])
+        return header
+
+    def put_header(self, source_key: str, header: ModuleHeader):
+        self.write(f"{source_key}.header.pickle", header)
+
+    def get_object(self, object_key: str) -> Optional[ModuleObject]:
+        module_object = self.read(f"{object_key}.object.pickle")
+        self.log("Module cache", "hit:" if module_object is not None else "miss:", object_key)
+        return module_object
+
+    def put_object(self, object_key: str, module_object: ModuleObject):
+        self.write(f"{object_key}.object.pickle", module_object)
+
+    #
+    # Files
+    #
+    def read(self, file_name: str):
+        path = self.directory / file_name
+        try:
+            with open(path, 'rb') as file:
+                value = pickle.load(file)
+            os.utime(path) # Mark as recently used
+            return value
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self.log("Module cache entry is unreadable:", file_name)
+            path.unlink(missing_ok=True)
+            return None
+
+    def write(self, file_name: str, value):
+        try:
+            write_atomically(self.directory / file_name, pickle.dumps(value))
+        except OSError as error:
+            self.log("Module cache couldn't be written:", error)
+            return
+
+        for path in evict_least_recently_used(self.directory, '*.pickle', self.max_size):
+            self.log("Module cache evicted:", path.name)
+
+    #
+    # Debug
+    #
+    def log(self, *args):
+        if self.debug:
+            print(*args)
@@ -0,0 +1,43 @@
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# Module name, found without parsing the file
+PROGRAM_PATTERN = re.compile(r'program\s+(\w+)\s*;')
+COMMENT_PATTERN = re.compile(r'/\*.*?\*/|//[^\n]*', re.DOTALL)
+
+
+def module_name(file_name: str) -> Optional[str]:
+    "Name a module file declares in its `program` statement"
+    with open(file_name, 'r') as file:
+        match = PROGRAM_PATTERN.search(COMMENT_PATTERN.sub('', file.read()))
+    return match.group(1) if match else None
+
+
+class ModuleIndex:
+    """
+    Finds the file of an imported module. Files given explicitly come
+    first, then `.ld` files in each search path, in order. Search paths
+    are only scanned when a module is looked up for the first time.
+    """
+    def __init__(self, file_names: Iterable[str] = (), search_paths: Iterable[str] = ()):
+        self.file_names = list(file_names)
+        self.search_paths = list(search_paths)
+        self.modules: Optional[Dict[str, str]] = None
+
+    def find(self, name: str) -> Optional[str]:
+        "File of a module, or None if no file declares it"
+        if self.modules is None:
+            self.modules = {}
+            for file_name in self.file_names + self.search_path_files():
+                found_name = module_name(file_name)
+                if found_name is not None:
+                    self.modules.setdefault(found_name, file_name)
+        return self.modules.get(name)
+
+    def search_path_files(self) -> List[str]:
+        "Every module file in the search paths, which a program could import"
+        files: List[str] = []
+        for search_path in self.search_paths:
+            files += sorted(str(path) for path in Path(search_path).glob('*.ld'))
+        return files
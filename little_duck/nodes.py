@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, List, Optional
 
 from .quadruples import QuadrupleOperation
@@ -6,29 +6,30 @@ from .quadruples import QuadrupleOperation
 
 #
 # Base Nodes
+# Nodes have slots instead of a __dict__, so large trees take less memory
 #
-@dataclass
+@dataclass(slots=True)
 class ASTNode:
     pass
 
-@dataclass
+@dataclass(slots=True)
 class TypeNode(ASTNode):
     identifier: str
 
-@dataclass
+@dataclass(slots=True)
 class StatementNode(ASTNode):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class ExpressionNode(ASTNode):
     type: Optional[TypeNode]
 
-@dataclass
+@dataclass(slots=True)
 class PrimitiveValueNode(ASTNode):
     primitive_type: str
     value: Any
 
-@dataclass
+@dataclass(slots=True)
 class ScopeNode(ASTNode):
     identifier: str
     statements: List[StatementNode]
@@ -36,57 +37,49 @@ class ScopeNode(ASTNode):
 #
 # Primitive Types
 #
-@dataclass
+@dataclass(slots=True)
 class StringPrimitiveValueNode(PrimitiveValueNode):
+    primitive_type: str = field(default='string', init=False)
     value: str
-    def __init__(self, value: str):
-        super().__init__(primitive_type='string', value=value)
-        self.value = value
 
-@dataclass
+@dataclass(slots=True)
 class IntegerPrimitiveValueNode(PrimitiveValueNode):
+    primitive_type: str = field(default='int', init=False)
     value: int
-    def __init__(self, value: int):
-        super().__init__(primitive_type='int', value=value)
-        self.value = value
 
-@dataclass
+@dataclass(slots=True)
 class FloatPrimitiveValueNode(PrimitiveValueNode):
+    primitive_type: str = field(default='float', init=False)
     value: float
-    def __init__(self, value: float):
-        super().__init__(primitive_type='float', value=value)
-        self.value = value
 
-@dataclass
+@dataclass(slots=True)
 class BoolPrimitiveValueNode(PrimitiveValueNode):
+    primitive_type: str = field(default='bool', init=False)
     value: bool
-    def __init__(self, value: bool):
-        super().__init__(primitive_type='bool', value=value)
-        self.value = value
 
 #
 # Expressions
 #
-@dataclass
+@dataclass(slots=True)
 class BinaryOperationNode(ExpressionNode):
     operator: QuadrupleOperation
     left_side: ExpressionNode
     right_side: ExpressionNode
 
-@dataclass
+@dataclass(slots=True)
 class UnaryOperationNode(ExpressionNode):
     operator: QuadrupleOperation
     expression: ExpressionNode
 
-@dataclass
+@dataclass(slots=True)
 class ReadVariableNode(ExpressionNode):
     identifier: str
 
-@dataclass
+@dataclass(slots=True)
 class ValueNode(ExpressionNode):
     value: PrimitiveValueNode
 
-@dataclass
+@dataclass(slots=True)
 class NonVoidFunctionCallNode(ExpressionNode):
     identifier: str
     arguments: List[ExpressionNode]
@@ -94,60 +87,60 @@ class NonVoidFunctionCallNode(ExpressionNode):
 #
 # Statements & Scopes
 #
-@dataclass
+@dataclass(slots=True)
 class DeclareVariableNode(StatementNode):
     identifier: str
     type: TypeNode
 
-@dataclass
+@dataclass(slots=True)
 class AssignmentNode(StatementNode):
     identifier: str
     value: ExpressionNode
 
-@dataclass
+@dataclass(slots=True)
 class FunctionScopeNode(ScopeNode):
     arguments: List[DeclareVariableNode]
 
-@dataclass
+@dataclass(slots=True)
 class FunctionDeclarationNode(StatementNode):
     identifier: str
     type: Optional[TypeNode]
     parameters: List[DeclareVariableNode]
     body: FunctionScopeNode
 
-@dataclass
+@dataclass(slots=True)
 class VoidFunctionCallNode(StatementNode):
     identifier: str
     arguments: List[ExpressionNode]
 
-@dataclass
+@dataclass(slots=True)
 class PrintNode(StatementNode):
     arguments: List[ExpressionNode]
 
-@dataclass
+@dataclass(slots=True)
 class IfConditionNode(StatementNode):
     condition: ExpressionNode
     body: ScopeNode
     else_body: Optional[ScopeNode]
 
-@dataclass
+@dataclass(slots=True)
 class WhileCycleNode(StatementNode):
     condition: ExpressionNode
     body: ScopeNode
 
-@dataclass
+@dataclass(slots=True)
 class DoWhileCycleNode(StatementNode):
     condition: ExpressionNode
     body: ScopeNode
 
-@dataclass
+@dataclass(slots=True)
 class ReturnStatementNode(StatementNode):
     value: Optional[ExpressionNode]
 
 #
 # Program Node
 #
-@dataclass
+@dataclass(slots=True)
 class ProgramNode(ASTNode):
     identifier: str
     dependencies: List[str]
@@ -0,0 +1,855 @@
+from copy import deepcopy
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple, Union, cast
+
+from .analyzer import qstr
+from .code_generator import LittleDuckCodeGenerator
+from .errors import VirtualMachineError
+from .quadruples import (
+    Operand,
+    Quadruple,
+    QuadrupleConstVariable,
+    QuadrupleIdentifier,
+    QuadrupleLineNumber,
+    QuadrupleOperation,
+    QuadrupleTempVariable,
+    const_operand,
+    identifier_operand,
+    temp_operand,
+)
+from .scope import GlobalScope, Scope, VariableMetadata
+from .semantic_cubes import binary_semantic_cubes
+from .stack import Stack
+from .vm import VirtualMachine
+
+JUMPS = (QuadrupleOperation.GOTO, QuadrupleOperation.GOTOT, QuadrupleOperation.GOTOF)
+ARITHMETIC = (QuadrupleOperation.ADDITION, QuadrupleOperation.SUBTRACTION,
+              QuadrupleOperation.MULTIPLICATION, QuadrupleOperation.DIVISION)
+
+# Bodies bigger than this are not unrolled
+MAX_UNROLL_SIZE = 48
+
+class Label:
+    """Position inside the optimizer code that jumps can target"""
+    def __repr__(self) -> str:
+        return f"L_{id(self):x}"
+
+# Jumps point to labels, and OPEN quadruples carry their scope,
+# so passes can freely add, remove and copy quadruples
+Code = List[Union[Quadruple, Label]]
+
+@dataclass
+class CountedLoop:
+    """
+    While loop shaped like `while (i < N) { ...; i = i + c; }`, where
+    `i` is only updated once per iteration and `N` never changes.
+    """
+    start: int # Label evaluated on every iteration
+    open_index: int # Body scope
+    close_index: int
+    goto_index: int # Jump back to start
+
+    variable: VariableMetadata
+    step: int
+    increment_end: int # Index after the counter is updated
+    condition: List[Quadruple]
+    scope: Scope # Scope where loop is declared
+
+class LittleDuckOptimizer:
+    def __init__(self,
+                 debug: bool = False,
+                 evaluation_steps: int = 10000,
+                 unroll_factor: int = 4):
+        self.debug = debug
+        self.evaluation_steps = evaluation_steps
+        self.unroll_factor = unroll_factor
+
+        self.tables = GlobalScope()
+
+    def optimize(self,
+                 tables: GlobalScope,
+                 raw_quadruples: List[Quadruple]) -> List[Quadruple]:
+        self.tables = tables
+        code = lift(tables, raw_quadruples)
+
+        # Run passes
+        code = self.evaluate_pure_calls(code)
+        code = self.reduce_induction_variables(code)
+        code = self.reduce_strength(code)
+        if self.unroll_factor > 1:
+            code = self.unroll_loops(code)
+        code = self.propagate_copies(code)
+
+        return lower(tables, code)
+
+    #
+    # Partial evaluation
+    #
+    def evaluate_pure_calls(self, code: Code) -> Code:
+        """
+        Replaces calls to pure functions with constant arguments
+        by their result, computed running the program's own code.
+        """
+        # Generate the code the evaluations will run
+        generator = LittleDuckCodeGenerator(memoize=True)
+        func_dir, mem_list, constants, quadruples = generator.generate(self.tables, lower(self.tables, code))
+        virtual_machine = VirtualMachine(function_directory=func_dir,
+                                         memory_scope_templates=mem_list,
+                                         constants=[t[1] for t in constants],
+                                         instructions=quadruples,
+                                         debug=False)
+
+        new_code: Code = []
+        scopes = Stack[Scope]([self.tables])
+        known_values: Dict[int, QuadrupleConstVariable] = {}
+        folded_temps: Dict[int, QuadrupleConstVariable] = {}
+
+        for item in code:
+            # Values can't be known when several paths meet
+            if isinstance(item, Label):
+                known_values.clear()
+                new_code.append(item)
+                continue
+
+            operation, left, right, result = item
+
+            # Replace results of folded calls
+            if isinstance(left, QuadrupleTempVariable) and left.number in folded_temps:
+                left = folded_temps.pop(left.number)
+            if isinstance(right, QuadrupleTempVariable) and right.number in folded_temps:
+                right = folded_temps.pop(right.number)
+            item = (operation, left, right, result)
+
+            if operation == QuadrupleOperation.OPEN_STACK_FRAME:
+                scope = cast(Scope, result)
+                scopes.push(scope)
+                if scope.function_name is not None:
+                    known_values.clear()
+
+            elif operation == QuadrupleOperation.CLOSE_STACK_FRAME:
+                scopes.pop()
+
+            elif operation == QuadrupleOperation.ASSIGN and isinstance(result, QuadrupleIdentifier):
+                variable = resolve(scopes, result.identifier)
+                if isinstance(left, QuadrupleConstVariable):
+                    known_values[id(variable)] = left
+                else:
+                    known_values.pop(id(variable), None)
+
+            elif operation == QuadrupleOperation.FUNCTION_CALL:
+                function = self.tables.functions[cast(QuadrupleIdentifier, left).identifier]
+                value = None
+                if function.is_pure and isinstance(result, QuadrupleTempVariable):
+                    value = self.evaluate_call(virtual_machine, generator.function_map[function.identifier],
+                                               len(function.parameters), new_code, scopes, known_values)
+                if value is not None:
+                    # Remove call and its parameters
+                    del new_code[len(new_code) - len(function.parameters):]
+
+                    const_var = const_operand(cast(str, function.type), value)
+                    self.tables.constants.add(const_var)
+                    folded_temps[cast(QuadrupleTempVariable, result).number] = const_var
+
+                    self.log("Evaluated call to", function.identifier, "at compile time:", const_var)
+                    continue
+
+                # Called function could change global variables
+                if not function.is_pure:
+                    known_values.clear()
+
+            elif isinstance(result, QuadrupleIdentifier):
+                # Any other write makes the variable unknown
+                known_values.pop(id(resolve(scopes, result.identifier)), None)
+
+            new_code.append(item)
+
+        return new_code
+
+    def evaluate_call(self,
+                      virtual_machine: VirtualMachine,
+                      function_id: int,
+                      parameter_count: int,
+                      code: Code,
+                      scopes: Stack[Scope],
+                      known_values: Dict[int, QuadrupleConstVariable]) -> Optional[Any]:
+        # Parameters are always right before the call
+        parameters = code[len(code) - parameter_count:] if parameter_count else []
+        if len(parameters) != parameter_count:
+            return None
+
+        arguments: List[Any] = []
+        for parameter in parameters:
+            if isinstance(parameter, Label) or parameter[0] != QuadrupleOperation.FUNCTION_PARAMETER:
+                return None
+
+            value = constant_value(cast(Operand, parameter[1]), scopes, known_values)
+            if value is None:
+                return None
+            arguments.append(value)
+
+        # Run the function with a bounded amount of steps
+        try:
+            return virtual_machine.evaluate(function_id, arguments, self.evaluation_steps)
+        except (VirtualMachineError, ArithmeticError) as error:
+            self.log("Could not evaluate function", function_id, "at compile time:", error)
+            return None
+
+    #
+    # Strength reduction
+    #
+    def reduce_induction_variables(self, code: Code) -> Code:
+        """
+        Replaces `i * k` inside counted loops by a variable that starts
+        as `i * k` and grows by `k * step` every time `i` is updated.
+        """
+        new_code: Code = []
+        scopes = Stack[Scope]([self.tables])
+
+        i = 0
+        while i < len(code):
+            item = code[i]
+            loop = find_counted_loop(code, i, scopes) if isinstance(item, Label) else None
+            reduced = self.reduce_loop(code, loop, scopes) if loop is not None else None
+            if loop is None or reduced is None:
+                new_code.append(item)
+                if not isinstance(item, Label):
+                    if item[0] == QuadrupleOperation.OPEN_STACK_FRAME:
+                        scopes.push(cast(Scope, item[3]))
+                    elif item[0] == QuadrupleOperation.CLOSE_STACK_FRAME:
+                        scopes.pop()
+                i += 1
+                continue
+
+            new_code += reduced
+            i = loop.goto_index + 1
+
+        return new_code
+
+    def reduce_loop(self, code: Code, loop: CountedLoop, scopes: Stack[Scope]) -> Optional[Code]:
+        counter = identifier_operand(loop.variable.identifier)
+
+        # Find products of the counter
+        factors: Set[int] = set()
+        body_scopes = Stack[Scope](reversed(list(scopes)))
+        for item in code[loop.open_index:loop.close_index]:
+            if isinstance(item, Label):
+                continue
+            if item[0] == QuadrupleOperation.OPEN_STACK_FRAME:
+                body_scopes.push(cast(Scope, item[3]))
+            elif item[0] == QuadrupleOperation.CLOSE_STACK_FRAME:
+                body_scopes.pop()
+            factor = match_product(item, body_scopes, loop.variable)
+            if factor is not None:
+                factors.add(factor)
+
+        if not factors:
+            return None
+
+        # Start derived variables before the loop
+        start = Label()
+        reduced: Code = [code[loop.start]]
+        derived: Dict[int, QuadrupleIdentifier] = {}
+        for factor in sorted(factors):
+            derived[factor] = self.derived_variable(loop, factor)
+            reduced.append((QuadrupleOperation.MULTIPLICATION, counter,
+                            self.constant('int', factor), derived[factor]))
+            self.log(f"Reduced '{counter} * {factor}' into induction variable '{derived[factor]}'")
+        reduced.append(start)
+        reduced += code[loop.start + 1:loop.open_index]
+
+        # Replace products by derived variables
+        replaced: Dict[Tuple[int, int], QuadrupleIdentifier] = {}
+        body_scopes = Stack[Scope](reversed(list(scopes)))
+        for index in range(loop.open_index, loop.close_index + 1):
+            item = code[index]
+            if not isinstance(item, Label):
+                operation, left, right, result = item
+                if operation == QuadrupleOperation.OPEN_STACK_FRAME:
+                    body_scopes.push(cast(Scope, result))
+
+                # Use derived variable where product was used
+                scope_id = id(body_scopes.top())
+                if isinstance(left, QuadrupleTempVariable):
+                    left = replaced.pop((scope_id, left.number), left) # type: ignore[arg-type]
+                if isinstance(right, QuadrupleTempVariable):
+                    right = replaced.pop((scope_id, right.number), right) # type: ignore[arg-type]
+                item = (operation, left, right, result)
+
+                factor = match_product(item, body_scopes, loop.variable)
+                if factor is not None and isinstance(result, QuadrupleTempVariable):
+                    replaced[(scope_id, result.number)] = derived[factor]
+                    continue
+
+                if operation == QuadrupleOperation.CLOSE_STACK_FRAME:
+                    body_scopes.pop()
+            reduced.append(item)
+
+            # Update derived variables right after the counter
+            if index + 1 == loop.increment_end:
+                for factor in sorted(factors):
+                    reduced.append((QuadrupleOperation.ADDITION, derived[factor],
+                                    self.constant('int', factor * loop.step), derived[factor]))
+
+        reduced.append((QuadrupleOperation.GOTO, None, None, start)) # type: ignore[arg-type]
+        return reduced
+
+    def derived_variable(self, loop: CountedLoop, factor: int) -> QuadrupleIdentifier:
+        # Name can't collide with variables written by the user
+        identifier = f"{loop.variable.identifier}*{factor}"
+        if not loop.scope.has_variable(identifier):
+            loop.scope.add_variable(VariableMetadata(identifier=identifier,
+                                                     module=loop.variable.module,
+                                                     type='int',
+                                                     is_initialized=True,
+                                                     is_used=True,
+                                                     declare_index=loop.variable.declare_index))
+        return identifier_operand(identifier)
+
+    def reduce_strength(self, code: Code) -> Code:
+        """
+        Replaces multiplications by 1, 0, -1 and 2 with assignments,
+        subtractions and additions.
+        """
+        new_code: Code = []
+        scopes = Stack[Scope]([self.tables])
+        temp_types: Dict[Tuple[int, int], str] = {}
+
+        for item in code:
+            if isinstance(item, Label):
+                new_code.append(item)
+                continue
+
+            operation = item[0]
+            if operation == QuadrupleOperation.OPEN_STACK_FRAME:
+                scopes.push(cast(Scope, item[3]))
+            elif operation == QuadrupleOperation.CLOSE_STACK_FRAME:
+                scopes.pop()
+            elif operation == QuadrupleOperation.MULTIPLICATION:
+                item = self.reduce_multiplication(item, scopes, temp_types)
+                if item[0] != operation:
+                    self.log(f"Reduced multiplication into ({', '.join(map(qstr, item))})")
+
+            # Save type of temp variables, needed to reduce them
+            _, left, right, result = item
+            if isinstance(result, QuadrupleTempVariable):
+                result_type = self.result_type(item, scopes, temp_types)
+                if result_type is not None:
+                    temp_types[(id(scopes.top()), result.number)] = result_type
+
+            new_code.append(item)
+
+        return new_code
+
+    def reduce_multiplication(self,
+                              quadruple: Quadruple,
+                              scopes: Stack[Scope],
+                              temp_types: Dict[Tuple[int, int], str]) -> Quadruple:
+        _, left, right, result = quadruple
+        if isinstance(right, QuadrupleConstVariable) and not isinstance(left, QuadrupleConstVariable):
+            const_var, value = right, left
+        elif isinstance(left, QuadrupleConstVariable) and not isinstance(right, QuadrupleConstVariable):
+            const_var, value = left, right
+        else:
+            return quadruple
+
+        value_type = operand_type(cast(Operand, value), scopes, temp_types)
+        if value_type is None:
+            return quadruple
+        result_type = binary_semantic_cubes['*'][value_type][const_var.type]
+        keeps_type = result_type == value_type
+
+        if const_var.value == 1 and keeps_type:
+            return (QuadrupleOperation.ASSIGN, value, None, result)
+        if const_var.value == 2 and keeps_type:
+            return (QuadrupleOperation.ADDITION, value, value, result)
+
+        # Floats keep the sign of zero, so only ints are reduced
+        if result_type == 'int' and const_var.value == 0 and not isinstance(value, QuadrupleTempVariable):
+            return (QuadrupleOperation.ASSIGN, self.constant('int', 0), None, result)
+        if result_type == 'int' and const_var.value == -1:
+            return (QuadrupleOperation.SUBTRACTION, self.constant('int', 0), value, result)
+
+        return quadruple
+
+    def result_type(self,
+                    quadruple: Quadruple,
+                    scopes: Stack[Scope],
+                    temp_types: Dict[Tuple[int, int], str]) -> Optional[str]:
+        operation, left, right, _ = quadruple
+        if operation == QuadrupleOperation.ASSIGN:
+            return operand_type(cast(Operand, left), scopes, temp_types)
+        if operation == QuadrupleOperation.FUNCTION_CALL:
+            return self.tables.functions[cast(QuadrupleIdentifier, left).identifier].type
+        if operation.value in binary_semantic_cubes:
+            left_type = operand_type(cast(Operand, left), scopes, temp_types)
+            right_type = operand_type(cast(Operand, right), scopes, temp_types)
+            if left_type is not None and right_type is not None:
+                return binary_semantic_cubes[operation.value][left_type][right_type]
+        return None
+
+    def constant(self, type: str, value: Any) -> QuadrupleConstVariable:
+        const_var = const_operand(type, value)
+        self.tables.constants.add(const_var)
+        return const_var
+
+    #
+    # Copy propagation
+    #
+    def propagate_copies(self, code: Code) -> Code:
+        """
+        Writes results directly to the variable a temp is assigned to,
+        and replaces temps holding a copy of a value by the value itself.
+        """
+        uses = count_temp_uses(code, self.tables)
+        scopes = Stack[Scope]([self.tables])
+        removed: Set[int] = set()
+        copies: Dict[int, Tuple[QuadrupleTempVariable, Operand]] = {}
+        new_code: Code = []
+
+        for i, item in enumerate(code):
+            if i in removed:
+                continue
+            if isinstance(item, Label):
+                new_code.append(item)
+                continue
+
+            operation, left, right, result = item
+            if operation == QuadrupleOperation.OPEN_STACK_FRAME:
+                scopes.push(cast(Scope, result))
+
+            # Use copied value instead of the temp
+            if i in copies:
+                temp, value = copies.pop(i)
+                left = value if left == temp else left
+                right = value if right == temp else right
+
+            if isinstance(result, QuadrupleTempVariable) and uses.get((id(scopes.top()), result.number)) == 1:
+                following = code[i + 1] if i + 1 < len(code) else None
+
+                # `op a b t; ASSIGN t x` is `op a b x`
+                if following is not None and not isinstance(following, Label) \
+                   and following[0] == QuadrupleOperation.ASSIGN and following[1] == result:
+                    self.log("Forwarded", qstr(result), "to", qstr(following[3]))
+                    result = following[3]
+                    removed.add(i + 1)
+
+                # `ASSIGN a t; ...; op t b u` is `op a b u`
+                elif operation == QuadrupleOperation.ASSIGN:
+                    use = find_copy_use(code, i, cast(Operand, left))
+                    if use is not None:
+                        self.log("Propagated", qstr(left), "into", qstr(result))
+                        copies[use] = (result, cast(Operand, left))
+                        continue
+
+            if operation == QuadrupleOperation.CLOSE_STACK_FRAME:
+                scopes.pop()
+            new_code.append((operation, left, right, result))
+
+        return new_code
+
+    #
+    # Loop unrolling
+    #
+    def unroll_loops(self, code: Code) -> Code:
+        """
+        Repeats the body of small counted loops, so the condition and jumps
+        run once every `unroll_factor` iterations. A copy of the original
+        loop handles the remaining iterations.
+        """
+        new_code: Code = []
+        scopes = Stack[Scope]([self.tables])
+
+        i = 0
+        while i < len(code):
+            item = code[i]
+            loop = find_counted_loop(code, i, scopes) if isinstance(item, Label) else None
+            if loop is None:
+                new_code.append(item)
+                if not isinstance(item, Label):
+                    if item[0] == QuadrupleOperation.OPEN_STACK_FRAME:
+                        scopes.push(cast(Scope, item[3]))
+                    elif item[0] == QuadrupleOperation.CLOSE_STACK_FRAME:
+                        scopes.pop()
+                i += 1
+                continue
+
+            new_code += self.unroll_loop(code, loop)
+            self.log(f"Unrolled loop over '{loop.variable.identifier}' by a factor of {self.unroll_factor}")
+            i = loop.goto_index + 1
+
+        return new_code
+
+    def unroll_loop(self, code: Code, loop: CountedLoop) -> Code:
+        start = cast(Label, code[loop.start])
+        remainder = Label()
+        *condition, compare = loop.condition
+        operation, left, right, result = compare
+        body = code[loop.open_index:loop.close_index + 1]
+        gotof = cast(Quadruple, code[loop.open_index - 1])
+
+        # Check all iterations can run: i + (factor - 1) * step < N
+        offset = const_operand('int', (self.unroll_factor - 1) * loop.step)
+        self.tables.constants.add(offset)
+        last_value = temp_operand(loop.scope.current_temp)
+        loop.scope.current_temp += 1
+
+        variable = identifier_operand(loop.variable.identifier)
+        if operation == QuadrupleOperation.LESSTHAN:
+            compare = (operation, last_value, right, result)
+        else:
+            compare = (operation, left, last_value, result)
+
+        unrolled: Code = [start, *condition,
+                          (QuadrupleOperation.ADDITION, variable, offset, last_value),
+                          compare,
+                          (QuadrupleOperation.GOTOF, result, None, remainder)] # type: ignore[list-item]
+        for _ in range(self.unroll_factor):
+            unrolled += copy_body(body, loop.scope)
+        unrolled.append((QuadrupleOperation.GOTO, None, None, start)) # type: ignore[arg-type]
+
+        # Original loop runs the remaining iterations
+        unrolled += [remainder, *loop.condition, gotof, *body,
+                     (QuadrupleOperation.GOTO, None, None, remainder)] # type: ignore[list-item]
+        return unrolled
+
+    #
+    # Debug
+    #
+    def log(self, *args):
+        if self.debug:
+            print(*args)
+
+#
+# Code conversion
+#
+def lift(tables: GlobalScope, quadruples: List[Quadruple]) -> Code:
+    "Converts line numbers into labels so code can be moved around"
+    scopes: Dict[int, Scope] = {}
+    pending = list(tables.inner_scopes)
+    while pending:
+        scope = pending.pop()
+        scopes[scope.id] = scope
+        pending += scope.inner_scopes
+
+    labels: Dict[int, Label] = {}
+    for quadruple in quadruples:
+        if quadruple[0] in JUMPS:
+            line = cast(QuadrupleLineNumber, quadruple[3]).number
+            labels.setdefault(line, Label())
+
+    code: Code = []
+    for i, (operation, left, right, result) in enumerate(quadruples):
+        if i in labels:
+            code.append(labels[i])
+
+        if operation in JUMPS:
+            result = labels[cast(QuadrupleLineNumber, result).number] # type: ignore[assignment]
+        elif operation == QuadrupleOperation.OPEN_STACK_FRAME:
+            result = scopes[i] # type: ignore[assignment]
+        code.append((operation, left, right, result))
+
+    if len(quadruples) in labels:
+        code.append(labels[len(quadruples)])
+
+    return code
+
+def lower(tables: GlobalScope, code: Code) -> List[Quadruple]:
+    "Converts labels back into line numbers, updating scope & function addresses"
+    positions: Dict[Label, int] = {}
+    position = 0
+    for item in code:
+        if isinstance(item, Label):
+            positions[item] = position
+        else:
+            position += 1
+
+    quadruples: List[Quadruple] = []
+    for item in code:
+        if isinstance(item, Label):
+            continue
+
+        operation, left, right, result = item
+        if operation in JUMPS:
+            result = QuadrupleLineNumber(positions[cast(Label, result)])
+        elif operation == QuadrupleOperation.OPEN_STACK_FRAME:
+            cast(Scope, result).id = len(quadruples)
+            result = None
+        quadruples.append((operation, left, right, result))
+
+    # Functions start where their scope is opened
+    for scope in tables.inner_scopes:
+        if scope.function_name is not None:
+            tables.functions[scope.function_name].start_index = scope.id
+
+    return quadruples
+
+#
+# Loops
+#
+def find_counted_loop(code: Code, start: int, scopes: Stack[Scope]) -> Optional[CountedLoop]:
+    "Checks if the loop starting at the given label is a counted loop"
+    label = code[start]
+
+    # Condition is a single comparison, maybe with some arithmetic before it
+    i = start + 1
+    condition: List[Quadruple] = []
+    while i < len(code) and not isinstance(code[i], Label):
+        operation = cast(Quadruple, code[i])[0]
+        if operation not in ARITHMETIC + (QuadrupleOperation.LESSTHAN, QuadrupleOperation.MORETHAN):
+            break
+        condition.append(cast(Quadruple, code[i]))
+        i += 1
+
+    if not condition or i + 1 >= len(code):
+        return None
+    gotof, body_open = code[i], code[i + 1]
+    if isinstance(gotof, Label) or isinstance(body_open, Label):
+        return None
+    if gotof[0] != QuadrupleOperation.GOTOF or gotof[1] != condition[-1][3]:
+        return None
+    if body_open[0] != QuadrupleOperation.OPEN_STACK_FRAME:
+        return None
+
+    # Get counter variable
+    operation, left, right, _ = condition[-1]
+    if operation == QuadrupleOperation.LESSTHAN:
+        counter = left
+    elif operation == QuadrupleOperation.MORETHAN:
+        counter = right
+    else:
+        return None
+    if not isinstance(counter, QuadrupleIdentifier):
+        return None
+    variable = resolve(scopes, counter.identifier)
+    if variable is None or variable.type != 'int':
+        return None
+
+    # Find end of body, which must jump back to the start
+    open_index = i + 1
+    depth = 0
+    for close_index in range(open_index, len(code)):
+        item = code[close_index]
+        if isinstance(item, Label):
+            continue
+        if item[0] == QuadrupleOperation.OPEN_STACK_FRAME:
+            depth += 1
+        elif item[0] == QuadrupleOperation.CLOSE_STACK_FRAME:
+            depth -= 1
+            if depth == 0:
+                break
+    else:
+        return None
+
+    goto_index = close_index + 1
+    if goto_index >= len(code) or code[goto_index] != (QuadrupleOperation.GOTO, None, None, label):
+        return None
+    if close_index - open_index > MAX_UNROLL_SIZE:
+        return None
+
+    # Check what the body does
+    body_scopes = Stack[Scope](reversed(list(scopes)))
+    written: Set[int] = set()
+    seen_labels: Set[Label] = set()
+    calls_impure = False
+    step: Optional[int] = None
+
+    i = open_index
+    while i < close_index:
+        item = code[i]
+        if isinstance(item, Label):
+            seen_labels.add(item)
+            i += 1
+            continue
+
+        operation, left, right, result = item
+        if operation == QuadrupleOperation.OPEN_STACK_FRAME:
+            body_scopes.push(cast(Scope, result))
+        elif operation == QuadrupleOperation.CLOSE_STACK_FRAME:
+            body_scopes.pop()
+        elif operation in JUMPS and result in seen_labels:
+            # Nested loops are not unrolled
+            return None
+        elif operation == QuadrupleOperation.FUNCTION_CALL:
+            calls_impure = calls_impure or not is_pure_call(scopes, cast(QuadrupleIdentifier, left))
+
+        # Look for `i = i + c` on the top level of the body
+        increment = match_increment(code, i, body_scopes, variable)
+        if increment is not None:
+            if step is not None or len(body_scopes) != len(scopes) + 1:
+                return None
+            step, i = increment
+            increment_end = i
+            continue
+
+        if isinstance(result, QuadrupleIdentifier):
+            target = resolve(body_scopes, result.identifier)
+            if target is variable:
+                return None
+            written.add(id(target))
+        i += 1
+
+    if step is None:
+        return None
+
+    # Called functions could change a global counter
+    global_scope = cast(GlobalScope, scopes.bottom())
+    if calls_impure and global_scope.get_variable(variable.identifier) is variable:
+        return None
+
+    # Bound of the loop must not change
+    for quadruple in condition:
+        for operand in quadruple[1:3]:
+            if not isinstance(operand, QuadrupleIdentifier):
+                continue
+            operand_variable = resolve(scopes, operand.identifier)
+            if operand_variable is variable and quadruple is not condition[-1]:
+                return None
+            if id(operand_variable) in written:
+                return None
+            if calls_impure and global_scope.get_variable(operand.identifier) is operand_variable:
+                return None
+
+    return CountedLoop(start=start,
+                       open_index=open_index,
+                       close_index=close_index,
+                       goto_index=goto_index,
+                       variable=variable,
+                       step=step,
+                       increment_end=increment_end,
+                       condition=condition,
+                       scope=scopes.top())
+
+def match_increment(code: Code, i: int, scopes: Stack[Scope], variable: VariableMetadata) -> Optional[tuple]:
+    "Matches `+ i c t; ASSIGN t i` and `+ i c i`, returning the step and next index"
+    item = code[i]
+    if isinstance(item, Label) or item[0] != QuadrupleOperation.ADDITION:
+        return None
+
+    _, left, right, result = item
+    if isinstance(right, QuadrupleIdentifier):
+        left, right = right, left
+    if not isinstance(left, QuadrupleIdentifier) or resolve(scopes, left.identifier) is not variable:
+        return None
+    if not isinstance(right, QuadrupleConstVariable) or right.type != 'int' or right.value <= 0:
+        return None
+
+    if isinstance(result, QuadrupleIdentifier) and resolve(scopes, result.identifier) is variable:
+        return right.value, i + 1
+
+    if i + 1 < len(code) and isinstance(result, QuadrupleTempVariable):
+        assign = code[i + 1]
+        if not isinstance(assign, Label) and assign[0] == QuadrupleOperation.ASSIGN and assign[1] == result:
+            target = assign[3]
+            if isinstance(target, QuadrupleIdentifier) and resolve(scopes, target.identifier) is variable:
+                return right.value, i + 2
+
+    return None
+
+def match_product(item: Union[Quadruple, Label], scopes: Stack[Scope], variable: VariableMetadata) -> Optional[int]:
+    "Matches `i * k` with a constant int k, returning k"
+    if isinstance(item, Label) or item[0] != QuadrupleOperation.MULTIPLICATION:
+        return None
+
+    _, left, right, _ = item
+    if isinstance(right, QuadrupleIdentifier):
+        left, right = right, left
+    if not isinstance(left, QuadrupleIdentifier) or resolve(scopes, left.identifier) is not variable:
+        return None
+    if not isinstance(right, QuadrupleConstVariable) or right.type != 'int' or right.value in (0, 1):
+        return None
+    return right.value
+
+def copy_body(body: Code, parent_scope: Scope) -> Code:
+    "Copies a scope's quadruples, with new labels and scopes"
+    body_scope = cast(Scope, cast(Quadruple, body[0])[3])
+    memo: Dict[int, Any] = {}
+    parent_scope.inner_scopes.append(deepcopy(body_scope, memo))
+
+    labels: Dict[Label, Label] = {}
+    copied: Code = []
+    for item in body:
+        if isinstance(item, Label):
+            copied.append(labels.setdefault(item, Label()))
+            continue
+
+        operation, left, right, result = item
+        if operation in JUMPS:
+            result = labels.setdefault(cast(Label, result), Label()) # type: ignore[assignment]
+        elif operation == QuadrupleOperation.OPEN_STACK_FRAME:
+            result = memo[id(result)]
+        copied.append((operation, left, right, result))
+
+    return copied
+
+#
+# Helpers
+#
+def is_pure_call(scopes: Stack[Scope], identifier: QuadrupleIdentifier) -> bool:
+    global_scope = cast(GlobalScope, scopes.bottom())
+    function = global_scope.get_function(identifier.identifier)
+    return function is not None and function.is_pure
+
+def resolve(scopes: Stack[Scope], identifier: str) -> Optional[VariableMetadata]:
+    for scope in scopes:
+        variable = scope.get_variable(identifier)
+        if variable is not None:
+            return variable
+    return None
+
+def count_temp_uses(code: Code, tables: GlobalScope) -> Dict[Tuple[int, int], int]:
+    "Counts how many times each temp is read, keyed by scope and number"
+    uses: Dict[Tuple[int, int], int] = {}
+    scopes = Stack[Scope]([tables])
+    for item in code:
+        if isinstance(item, Label):
+            continue
+        if item[0] == QuadrupleOperation.OPEN_STACK_FRAME:
+            scopes.push(cast(Scope, item[3]))
+        elif item[0] == QuadrupleOperation.CLOSE_STACK_FRAME:
+            scopes.pop()
+        for operand in item[1:3]:
+            if isinstance(operand, QuadrupleTempVariable):
+                key = (id(scopes.top()), operand.number)
+                uses[key] = uses.get(key, 0) + 1
+    return uses
+
+def find_copy_use(code: Code, i: int, value: Operand) -> Optional[int]:
+    "Finds where the temp copied at `i` is read, if the value can't change before"
+    temp = cast(Quadruple, code[i])[3]
+    for j in range(i + 1, len(code)):
+        item = code[j]
+        if isinstance(item, Label):
+            return None
+        operation, left, right, result = item
+        if left == temp or right == temp:
+            return j
+        if operation in JUMPS or operation in (QuadrupleOperation.FUNCTION_CALL,
+                                               QuadrupleOperation.OPEN_STACK_FRAME,
+                                               QuadrupleOperation.CLOSE_STACK_FRAME):
+            return None
+        if result == value:
+            return None
+    return None
+
+def operand_type(operand: Operand,
+                 scopes: Stack[Scope],
+                 temp_types: Dict[Tuple[int, int], str]) -> Optional[str]:
+    if isinstance(operand, QuadrupleConstVariable):
+        return operand.type
+    if isinstance(operand, QuadrupleIdentifier):
+        variable = resolve(scopes, operand.identifier)
+        return variable.type if variable is not None else None
+    if isinstance(operand, QuadrupleTempVariable):
+        return temp_types.get((id(scopes.top()), operand.number))
+    return None
+
+def constant_value(operand: Operand,
+                   scopes: Stack[Scope],
+                   known_values: Dict[int, QuadrupleConstVariable]) -> Optional[Any]:
+    if isinstance(operand, QuadrupleConstVariable):
+        return operand.value
+    if isinstance(operand, QuadrupleIdentifier):
+        const_var = known_values.get(id(resolve(scopes, operand.identifier)))
+        if const_var is not None:
+            return const_var.value
+    return None
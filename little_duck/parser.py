@@ -1,4 +1,5 @@
-from uuid import uuid4
+from itertools import count
+from typing import Union
 
 from ply import yacc
 
@@ -28,18 +29,38 @@ from .nodes import (
     WhileCycleNode,
 )
 from .quadruples import QuadrupleOperation as Operation
+from .scanner import LittleDuckScanner
+from .tables import build_table, load_table
 
 
 ###
 ### Parser
 ###
 class LittleDuckParser():
-    def __init__(self, **kwargs):
+    def __init__(self, cache_tables: bool = True, **kwargs):
         self.reserved = reserved
         self.tokens = tokens
-        self.parser = yacc.yacc(module=self, **kwargs)
+        self.block_ids = count()
 
-    def parse(self, text: str, lexer: LittleDuckLexer) -> ProgramNode:
+        if not cache_tables:
+            self.parser = yacc.yacc(module=self, **kwargs)
+            return
+
+        # Use tables from a previous run if possible, PLY checks their signature
+        table = load_table('little_duck_parsetab')
+        if table is not None:
+            self.parser = yacc.yacc(module=self, tabmodule=table, debug=False, write_tables=False, **kwargs)
+        else:
+            self.parser = build_table('little_duck_parsetab', lambda directory: yacc.yacc(module=self,
+                                                                                        tabmodule='little_duck_parsetab',
+                                                                                        outputdir=directory,
+                                                                                        debug=False,
+                                                                                        write_tables=directory is not None,
+                                                                                        **kwargs))
+
+    def parse(self, text: str, lexer: Union[LittleDuckLexer, LittleDuckScanner]) -> ProgramNode:
+        lexer.lexer.lineno = 1
+        self.block_ids = count() # Blocks are numbered from 0 in each module
         return self.parser.parse(text, lexer=lexer.lexer)
 
     #
@@ -55,9 +76,13 @@ class LittleDuckParser():
         p[0] = ProgramNode(p[3], p[1], p[5], p[6], main)
         pass
     
+    # Lists are left recursive and appended in place,
+    # so they're built in linear time with a constant parser stack
+
     def p_imports(self, p: yacc.YaccProduction):
-        'IMPORTS : IMPORT IMPORTS'
-        p[0] = p[1] + p[2]
+        'IMPORTS : IMPORTS IMPORT'
+        p[1].append(p[2])
+        p[0] = p[1]
         pass
 
     def p_imports_empty(self, p: yacc.YaccProduction):
@@ -67,17 +92,18 @@ class LittleDuckParser():
 
     def p_import(self, p: yacc.YaccProduction):
         'IMPORT : import ID SEMICOLON'
-        p[0] = [p[2]]
+        p[0] = p[2]
         pass
 
     def p_vars(self, p: yacc.YaccProduction):
         'VARS : VARS VarDeclaration'
-        p[0] = p[1] + p[2]
+        p[1].extend(p[2])
+        p[0] = p[1]
         pass
 
     def p_vars_empty(self, p: yacc.YaccProduction):
         'VARS : epsilon'
-        p[0] = [] # Empty list for combining
+        p[0] = [] # Empty list for appending
         pass
 
     def p_vars_declaration(self, p: yacc.YaccProduction):
@@ -87,7 +113,8 @@ class LittleDuckParser():
 
     def p_lista_vars_multiple(self, p: yacc.YaccProduction):
         'ListaVars : ListaVars COMMA ID'
-        p[0] = p[1] + [p[3]]
+        p[1].append(p[3])
+        p[0] = p[1]
         pass
 
     def p_lista_vars_one(self, p: yacc.YaccProduction):
@@ -104,13 +131,14 @@ class LittleDuckParser():
         pass
 
     def p_funcs(self, p: yacc.YaccProduction):
-        'FUNCS : Funcion FUNCS'
-        p[0] = [p[1]] + p[2] # Combine lists
+        'FUNCS : FUNCS Funcion'
+        p[1].append(p[2])
+        p[0] = p[1]
         pass
 
     def p_funcs_empty(self, p: yacc.YaccProduction):
         '''FUNCS : epsilon'''
-        p[0] = [] # Empty list for combining
+        p[0] = [] # Empty list for appending
         pass
 
     def p_funcion(self, p: yacc.YaccProduction):
@@ -119,19 +147,26 @@ class LittleDuckParser():
         p[0] = FunctionDeclarationNode(p[2], p[1], p[4], body)
         pass
 
-    def p_parametros_multiple(self, p: yacc.YaccProduction):
-        'Parametros : Parametro COMMA Parametros'
-        p[0] = [p[1]] + p[3] # Combine lists
+    def p_parametros(self, p: yacc.YaccProduction):
+        '''Parametros : ListaParametros
+                      | ListaParametros COMMA'''
+        p[0] = p[1] # Passthrough, a trailing comma is allowed
         pass
 
-    def p_parametros_one(self, p: yacc.YaccProduction):
-        'Parametros : Parametro'
-        p[0] = [p[1]] # List of one for combining
+    def p_lista_parametros_multiple(self, p: yacc.YaccProduction):
+        'ListaParametros : ListaParametros COMMA Parametro'
+        p[1].append(p[3])
+        p[0] = p[1]
+        pass
+
+    def p_lista_parametros_one(self, p: yacc.YaccProduction):
+        'ListaParametros : Parametro'
+        p[0] = [p[1]] # List of one for appending
         pass
 
     def p_parametros_empty(self, p: yacc.YaccProduction):
         'Parametros : epsilon'
-        p[0] = [] # Empty list for combining
+        p[0] = [] # Empty list for appending
         pass
 
     def p_parametro(self, p: yacc.YaccProduction):
@@ -151,22 +186,24 @@ class LittleDuckParser():
 
     def p_body(self, p: yacc.YaccProduction):
         'Body : LBRACE Statements RBRACE'
-        p[0] = ScopeNode(uuid4().hex, p[2])
+        p[0] = ScopeNode(str(next(self.block_ids)), p[2])
         pass
 
     def p_statements(self, p: yacc.YaccProduction):
-        'Statements : Statement Statements'
-        p[0] = [p[1]] + p[2] # Combine lists
+        'Statements : Statements Statement'
+        p[1].append(p[2])
+        p[0] = p[1]
         pass
 
     def p_statements_vars(self, p: yacc.YaccProduction):
-        'Statements : VarDeclaration Statements'
-        p[0] = p[1] + p[2] # Combine lists
+        'Statements : Statements VarDeclaration'
+        p[1].extend(p[2])
+        p[0] = p[1]
         pass
 
     def p_statements_empty(self, p: yacc.YaccProduction):
         'Statements : epsilon'
-        p[0] = [] # Empty list for combining
+        p[0] = [] # Empty list for appending
         pass
 
     def p_statement(self, p: yacc.YaccProduction):
@@ -222,19 +259,26 @@ class LittleDuckParser():
         'RETURN : return SEMICOLON'
         p[0] = ReturnStatementNode(value=None)
 
-    def p_expresiones_multiple(self, p: yacc.YaccProduction):
-        'Expresiones : Expresion COMMA Expresiones'
-        p[0] = [p[1]] + p[3] # Combine lists
+    def p_expresiones(self, p: yacc.YaccProduction):
+        '''Expresiones : ListaExpresiones
+                       | ListaExpresiones COMMA'''
+        p[0] = p[1] # Passthrough, a trailing comma is allowed
+        pass
+
+    def p_lista_expresiones_multiple(self, p: yacc.YaccProduction):
+        'ListaExpresiones : ListaExpresiones COMMA Expresion'
+        p[1].append(p[3])
+        p[0] = p[1]
         pass
 
-    def p_expresiones_one(self, p: yacc.YaccProduction):
-        'Expresiones : Expresion'
-        p[0] = [p[1]] # List of one for combining
+    def p_lista_expresiones_one(self, p: yacc.YaccProduction):
+        'ListaExpresiones : Expresion'
+        p[0] = [p[1]] # List of one for appending
         pass
 
     def p_expresiones_empty(self, p: yacc.YaccProduction):
         'Expresiones : epsilon'
-        p[0] = [] # Empty list for combining
+        p[0] = [] # Empty list for appending
         pass
 
     def p_expresion(self, p: yacc.YaccProduction):
@@ -0,0 +1,130 @@
+import os
+import tempfile
+from functools import lru_cache
+from hashlib import sha256
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .cache import cache_directory
+from .errors import BytecodeError
+from .vm_bytecode import dump_bytecode, parse_bytecode
+from .vm_types import GeneratedCode
+
+# Change when the cache key or stored files change
+CACHE_VERSION = 1
+
+
+@lru_cache(maxsize=None)
+def compiler_signature() -> str:
+    "Hash of the compiler source, so a changed compiler never reuses old results"
+    digest = sha256()
+    for path in sorted(Path(__file__).parent.glob('*.py')):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+def write_atomically(path: Path, data: bytes):
+    "Writes to a temp file and renames it, so readers never see partial files"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temp_name = tempfile.mkstemp(prefix='.write-', dir=path.parent)
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(data)
+        os.replace(temp_name, path)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
+
+def evict_least_recently_used(directory: Path, pattern: str, max_size: int) -> List[Path]:
+    "Removes the files used longest ago until the rest fit in `max_size` bytes"
+    entries = []
+    for path in directory.glob(pattern):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue # Removed by another process
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    evicted: List[Path] = []
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total_size <= max_size:
+            break
+        path.unlink(missing_ok=True)
+        total_size -= size
+        evicted.append(path)
+    return evicted
+
+
+class ProgramCache:
+    """
+    Compiled programs stored on disk, keyed by a hash of their source files,
+    the compiler and its options. Least recently used programs are removed
+    once the cache grows over `max_size` bytes.
+    """
+    def __init__(self,
+                 directory: Optional[Path] = None,
+                 max_size: int = 64 * 1024 * 1024,
+                 debug: bool = False):
+        self.directory = directory or cache_directory() / 'programs'
+        self.max_size = max_size
+        self.debug = debug
+
+    def compile(self,
+                file_names: Iterable[str],
+                options: Dict[str, Any],
+                build: Callable[[], GeneratedCode]) -> GeneratedCode:
+        "Returns the stored program, or builds and stores it"
+        key = self.key(file_names, options)
+        code = self.get(key)
+        if code is None:
+            code = build()
+            self.put(key, code)
+        return code
+
+    def key(self, file_names: Iterable[str], options: Dict[str, Any]) -> str:
+        "Hash of everything the generated code depends on"
+        digest = sha256(f"{CACHE_VERSION}:{compiler_signature()}".encode())
+        digest.update(repr(sorted(options.items())).encode())
+        for file_name in file_names:
+            with open(file_name, 'rb') as file:
+                contents = file.read()
+            digest.update(f"{len(contents)}:".encode())
+            digest.update(contents)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[GeneratedCode]:
+        "Returns the stored program, or None if it's not stored"
+        path = self.directory / f"{key}.ldc"
+        try:
+            code = parse_bytecode(path.read_bytes())
+            os.utime(path) # Mark as recently used
+        except FileNotFoundError:
+            self.log("Compilation cache miss:", key)
+            return None
+        except (OSError, BytecodeError):
+            self.log("Compilation cache entry is unreadable:", key)
+            path.unlink(missing_ok=True)
+            return None
+
+        self.log("Compilation cache hit:", key)
+        return code
+
+    def put(self, key: str, code: GeneratedCode):
+        "Stores a program, then evicts the least recently used ones if needed"
+        try:
+            write_atomically(self.directory / f"{key}.ldc", dump_bytecode(code))
+        except OSError as error:
+            self.log("Compilation cache couldn't be written:", error)
+            return
+
+        self.log("Compilation cache stored:", key)
+        for path in evict_least_recently_used(self.directory, '*.ldc', self.max_size):
+            self.log("Compilation cache evicted:", path.stem)
+
+    #
+    # Debug
+    #
+    def log(self, *args):
+        if self.debug:
+            print(*args)
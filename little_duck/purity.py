@@ -0,0 +1,31 @@
+from typing import Set
+
+from .scope import GlobalScope
+
+
+def analyze_purity(tables: GlobalScope) -> Set[str]:
+    """
+    Marks functions whose result only depends on their arguments.
+
+    A function is pure when it doesn't print, doesn't read or write global
+    variables and only calls other pure functions. Returns the pure set.
+    """
+    # Start with every function that is pure on its own
+    pure_functions: Set[str] = set(
+        f.identifier for f in tables.functions.values()
+        if f.identifier != 'main' and not f.has_side_effects and not f.reads_globals)
+
+    # Remove functions calling impure ones until nothing changes
+    changed = True
+    while changed:
+        changed = False
+        for identifier in list(pure_functions):
+            if not tables.functions[identifier].calls.issubset(pure_functions):
+                pure_functions.remove(identifier)
+                changed = True
+
+    # Save result in function metadata
+    for function in tables.functions.values():
+        function.is_pure = function.identifier in pure_functions
+
+    return pure_functions
@@ -1,9 +1,17 @@
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Deque, Optional, Tuple
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
 
+# Most operands repeat, and they can't change, so the same object is shared
+# by every quadruple using it. Caches are bounded for long running compilers.
+INTERNED_OPERANDS = 1 << 16
 
-@dataclass
+# Longer strings are rarely repeated, so they aren't shared
+MAX_INTERNED_STRING = 32
+
+
+@dataclass(frozen=True, slots=True)
 class QuadrupleIdentifier:
     identifier: str
 
@@ -13,7 +21,7 @@ class QuadrupleIdentifier:
     def __repr__(self) -> str:
         return self.identifier
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class QuadrupleLineNumber:
     number: int
 
@@ -23,7 +31,7 @@ class QuadrupleLineNumber:
     def __repr__(self) -> str:
         return f"L_{self.number}"
 
-@dataclass(frozen=True, order=True)
+@dataclass(frozen=True, order=True, slots=True)
 class QuadrupleConstVariable:
     type: str
     value: Any
@@ -37,7 +45,7 @@ class QuadrupleConstVariable:
         else:
             return str(self.value)
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class QuadrupleTempVariable:
     number: int
 
@@ -89,4 +97,26 @@ Result =  QuadrupleTempVariable | QuadrupleIdentifier | QuadrupleLineNumber
 Quadruple = Tuple[QuadrupleOperation, Optional[Operand], Optional[Operand], Optional[Result]]
 
 PolishValue = QuadrupleOperation | Operand
-PolishExpression = Deque[PolishValue]
+PolishExpression = List[PolishValue] # Postfix order
+
+
+#
+# Shared operands
+#
+@lru_cache(maxsize=INTERNED_OPERANDS)
+def identifier_operand(identifier: str) -> QuadrupleIdentifier:
+    return QuadrupleIdentifier(identifier)
+
+@lru_cache(maxsize=INTERNED_OPERANDS)
+def temp_operand(number: int) -> QuadrupleTempVariable:
+    return QuadrupleTempVariable(number)
+
+def const_operand(type: str, value: Any) -> QuadrupleConstVariable:
+    if isinstance(value, str) and len(value) > MAX_INTERNED_STRING:
+        return QuadrupleConstVariable(type, value)
+    return small_const_operand(type, value)
+
+# Typed, so 1 and 1.0 or True aren't mixed up
+@lru_cache(maxsize=INTERNED_OPERANDS, typed=True)
+def small_const_operand(type: str, value: Any) -> QuadrupleConstVariable:
+    return QuadrupleConstVariable(type, value)
@@ -0,0 +1,141 @@
+import re
+from itertools import chain
+from sys import intern
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from .lexer import reserved
+
+# Same rules as LittleDuckLexer, in the order PLY tries them: function rules
+# as they're defined, then string rules from the longest regex.
+# First alternative that matches wins, like in PLY, so 'trueish' starts with
+# CTE_BOOL and '-' followed by a digit is always part of a number.
+TOKEN_PATTERN = re.compile('|'.join([
+    r'(?P<CTE_BOOL>true|false)',
+    r'(?P<ID>[a-zA-Z_][a-zA-Z0-9_]*)',
+    r'(?P<CTE_FLOAT>[-]?\d+\.\d+)',
+    r'(?P<CTE_INT>[-]?\d+)',
+    r'(?P<CTE_STRING>"(?:\\.|[^"\\])*")',
+    r'(?P<NEWLINE>\n+)',
+    r'(?P<COMMENT_BLOCK>/\*(?:\*(?!/)|[^*])*\*/)',
+    r'(?P<COMMENT_INLINE>//.*)',
+    r'(?P<OPERATOR>\|\||&&|==|!=|[:;,+\-*/(){}!<>=])',
+    r'(?P<IGNORE>[ \t]+)',
+]))
+
+OPERATORS = {
+    ':': 'COLON', ';': 'SEMICOLON', ',': 'COMMA',
+    '+': 'PLUS', '-': 'MINUS', '*': 'TIMES', '/': 'DIVIDE',
+    '(': 'LPAREN', ')': 'RPAREN', '{': 'LBRACE', '}': 'RBRACE',
+    '&&': 'AND', '||': 'OR', '!': 'NOT',
+    '==': 'EQUALS', '!=': 'NOTEQUALS', '<': 'LESS', '>': 'GREATER', '=': 'ASSIGN',
+}
+
+
+# Group numbers of the rules
+RULES = TOKEN_PATTERN.groupindex
+CTE_BOOL, ID, CTE_FLOAT, CTE_INT, CTE_STRING, NEWLINE, COMMENT_BLOCK, COMMENT_INLINE, OPERATOR, IGNORE = (
+    RULES[name] for name in ['CTE_BOOL', 'ID', 'CTE_FLOAT', 'CTE_INT', 'CTE_STRING',
+                             'NEWLINE', 'COMMENT_BLOCK', 'COMMENT_INLINE', 'OPERATOR', 'IGNORE'])
+
+
+class Token:
+    "Same as a PLY LexToken, with slots instead of a __dict__"
+    __slots__ = ('type', 'value', 'lineno', 'lexpos', 'lexer') # PLY sets the lexer of the token with an error
+
+    def __init__(self, type: str, value: Any, lineno: int, lexpos: int):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def __str__(self) -> str:
+        return f"LexToken({self.type},{self.value!r},{self.lineno},{self.lexpos})"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+
+###
+### Scanner
+###
+class LittleDuckScanner():
+    """
+    Faster alternative to LittleDuckLexer, with the same tokens and line
+    numbers. The whole text is scanned in one pass when it's input, without
+    calling a function per token, and the parser then takes tokens straight
+    from a list iterator.
+
+    It's its own low level lexer, so it can be used wherever a
+    LittleDuckLexer is: `scanner.lexer` is the scanner itself.
+    """
+    def __init__(self, **kwargs):
+        self.lexer = self
+        self.lineno = 1
+
+        # Next token for the parser, or None at the end
+        self.token: Callable[[], Optional[Token]] = lambda: None
+
+    def input(self, text: str) -> List[Token]:
+        "Scans a text, returns its tokens"
+        self.lineno = 1
+        tokens, error = self.scan(text)
+        # From an iterator, so tokens are freed once the parser is done with them
+        self.token = chain(iter(tokens), end_of_input(error)).__next__
+        return tokens
+
+    def __iter__(self) -> Iterator[Token]:
+        return iter(self.token, None)
+
+    def scan(self, text: str) -> Tuple[List[Token], Optional[SyntaxError]]:
+        "Returns the tokens of a text, and the error that stopped scanning, if any"
+        tokens: List[Token] = []
+        append = tokens.append
+        keywords = reserved.get
+        operators = OPERATORS
+
+        lineno = self.lineno
+        position = 0
+        for found in TOKEN_PATTERN.finditer(text):
+            start = found.start()
+            if start != position:
+                break # Skipped an illegal character
+
+            position = found.end()
+            rule = found.lastindex
+            if rule == ID:
+                value = intern(found.group())
+                token_type = keywords(value, 'ID')
+            elif rule == OPERATOR:
+                value = found.group()
+                token_type = operators[value]
+            elif rule == IGNORE or rule == COMMENT_INLINE:
+                continue
+            elif rule == NEWLINE:
+                lineno += position - start
+                continue
+            elif rule == COMMENT_BLOCK:
+                lineno += found.group().count('\n')
+                continue
+            elif rule == CTE_INT:
+                token_type, value = 'CTE_INT', int(found.group())
+            elif rule == CTE_FLOAT:
+                token_type, value = 'CTE_FLOAT', float(found.group())
+            elif rule == CTE_STRING:
+                token_type, value = 'CTE_STRING', found.group().strip('"')
+            else:
+                token_type, value = 'CTE_BOOL', found.group() == 'true'
+
+            append(Token(token_type, value, lineno, start))
+
+        self.lineno = lineno
+        if position < len(text):
+            return tokens, SyntaxError(f"Illegal character {text[position]} on line {lineno}")
+        return tokens, None
+
+
+def end_of_input(error: Optional[SyntaxError]) -> Iterator[None]:
+    "Ends the tokens, raising illegal characters once the parser gets to them, like PLY"
+    if error is not None:
+        raise error
+    while True:
+        yield None
@@ -1,5 +1,7 @@
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Set, Tuple
+from collections.abc import ItemsView, ValuesView
+from copy import copy
+from dataclasses import dataclass, field
+from typing import Dict, Generic, Iterator, List, MutableMapping, Optional, Set, Tuple, TypeVar, Union
 
 from .quadruples import QuadrupleConstVariable
 
@@ -25,11 +27,62 @@ class FunctionMetadata:
 
     start_index: int
 
+    # Purity tracking
+    calls: Set[str] = field(default_factory=set)
+    has_side_effects: bool = False
+    reads_globals: bool = False
+    is_pure: bool = False
+
+Symbol = TypeVar('Symbol', VariableMetadata, FunctionMetadata)
+
+class ForkedSymbols(MutableMapping[str, Symbol], Generic[Symbol]):
+    """
+    Functions or variables of a forked scope. They're shared with the
+    original scope until they're looked up by name, when they're copied,
+    so the fork can change them. Iterating gives shared ones, only to read.
+    """
+    def __init__(self, shared: Union[Dict[str, Symbol], 'ForkedSymbols[Symbol]']):
+        self.symbols = dict(shared.symbols if isinstance(shared, ForkedSymbols) else shared)
+        self.copied: Set[str] = set()
+
+    def __getitem__(self, identifier: str) -> Symbol:
+        symbol = self.symbols[identifier]
+        if identifier not in self.copied:
+            symbol = self.symbols[identifier] = copy(symbol)
+            self.copied.add(identifier)
+        return symbol
+
+    def __setitem__(self, identifier: str, symbol: Symbol):
+        self.symbols[identifier] = symbol
+        self.copied.add(identifier)
+
+    def __delitem__(self, identifier: str):
+        del self.symbols[identifier]
+        self.copied.discard(identifier)
+
+    def __contains__(self, identifier: object) -> bool:
+        return identifier in self.symbols
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.symbols)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def values(self) -> ValuesView[Symbol]:
+        return self.symbols.values()
+
+    def items(self) -> ItemsView[str, Symbol]:
+        return self.symbols.items()
+
+    def __repr__(self) -> str:
+        return repr(self.symbols)
+
 class Scope:
     def __init__(self, id: int = 0, function_name: Optional[str] = None) -> None:
         self.id = id
         self.function_name = function_name
-        self.variables: Dict[str, VariableMetadata] = {}
+        self.variables: MutableMapping[str, VariableMetadata] = {}
         self.inner_scopes: List[Scope] = []
 
         self.current_temp: int = 0
@@ -65,8 +118,19 @@ class Scope:
 class GlobalScope(Scope):
     def __init__(self) -> None:
         super().__init__(0, None)
-        self.functions: Dict[str, FunctionMetadata] = {}
+        self.functions: MutableMapping[str, FunctionMetadata] = {}
         self.constants: Set[QuadrupleConstVariable] = set()
+
+    def fork(self) -> 'GlobalScope':
+        """
+        Cheap copy to analyze a module in, which never changes this scope.
+        Functions and variables are only copied once they're looked up.
+        """
+        scope = GlobalScope()
+        scope.functions = ForkedSymbols(self.functions)
+        scope.variables = ForkedSymbols(self.variables)
+        scope.constants = set(self.constants)
+        return scope
     
     def has_function(self, identifier: str) -> bool:
         return identifier in self.functions
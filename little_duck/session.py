@@ -0,0 +1,97 @@
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .compiler import LittleDuckCompiler
+from .linker import ModuleObject, import_scope
+from .module_cache import ModuleCache
+from .scope import GlobalScope
+
+# Entries kept by each in-memory cache of a session
+MAX_ENTRIES = 256
+
+
+class MemoryModuleCache(ModuleCache):
+    """
+    Module cache kept in memory, so objects are reused without reading or
+    unpickling them. It may be in front of a cache on disk, which is read
+    on misses and always written.
+
+    Source keys are reused while the size and modification time of their
+    file don't change, so unchanged files aren't read again.
+    """
+    def __init__(self,
+                 disk_cache: Optional[ModuleCache] = None,
+                 max_entries: int = MAX_ENTRIES,
+                 debug: bool = False):
+        super().__init__(debug=debug)
+        self.disk_cache = disk_cache
+        self.max_entries = max_entries
+        self.values: OrderedDict[str, Any] = OrderedDict()
+        self.source_keys: Dict[str, Tuple[int, int, str]] = {}
+
+    def source_key(self, file_name: str) -> str:
+        stat = os.stat(file_name)
+        known = self.source_keys.get(file_name)
+        if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+            return known[2]
+
+        source_key = super().source_key(file_name)
+        self.source_keys[file_name] = (stat.st_mtime_ns, stat.st_size, source_key)
+        return source_key
+
+    def read(self, file_name: str):
+        if file_name in self.values:
+            self.values.move_to_end(file_name) # Mark as recently used
+            return self.values[file_name]
+
+        value = self.disk_cache.read(file_name) if self.disk_cache is not None else None
+        if value is not None:
+            self.store(file_name, value)
+        return value
+
+    def write(self, file_name: str, value):
+        self.store(file_name, value)
+        if self.disk_cache is not None:
+            self.disk_cache.write(file_name, value)
+
+    def store(self, file_name: str, value):
+        self.values[file_name] = value
+        self.values.move_to_end(file_name)
+        while len(self.values) > self.max_entries:
+            self.values.popitem(last=False)
+
+
+class CompilerSession(LittleDuckCompiler):
+    """
+    Compiler for many programs, which keeps warm state between them: its
+    lexer and parser, the imports and objects of dependency modules, and
+    the scopes programs are analyzed in, forked for every program. Once
+    the dependencies were compiled, compiling a program mostly takes the
+    time of its main module.
+
+    Dependency files are still checked for changes on every compilation.
+    Takes the options of LittleDuckCompiler, `module_cache` is kept on disk
+    behind the session's own cache.
+    """
+    def __init__(self,
+                 module_cache: Optional[ModuleCache] = None,
+                 max_entries: int = MAX_ENTRIES,
+                 **options):
+        memory_cache = MemoryModuleCache(module_cache, max_entries, debug=options.get('debug', False))
+        super().__init__(module_cache=memory_cache, **options)
+        self.max_entries = max_entries
+
+        # Objects are kept with their scope, so their ids are never reused
+        self.import_scopes: OrderedDict[Tuple[int, ...], Tuple[List[ModuleObject], GlobalScope]] = OrderedDict()
+
+    def importing_scope(self, objects: List[ModuleObject]) -> GlobalScope:
+        "Fork of the scope importing `objects`, built once while they're cached"
+        key = tuple(map(id, objects))
+        if key not in self.import_scopes:
+            self.import_scopes[key] = objects, import_scope(objects)
+            while len(self.import_scopes) > self.max_entries:
+                self.import_scopes.popitem(last=False)
+
+        self.import_scopes.move_to_end(key)
+        return self.import_scopes[key][1].fork()
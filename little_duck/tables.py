@@ -0,0 +1,81 @@
+import importlib.util
+import os
+import py_compile
+import shutil
+import tempfile
+from hashlib import sha256
+from pathlib import Path
+from types import ModuleType
+from typing import Callable, Optional, TypeVar
+
+import ply
+
+from .cache import cache_directory
+
+# Change when the way tables are stored changes
+TABLES_VERSION = 1
+
+# Files whose contents define the tables
+GRAMMAR_FILES = ('lexer.py', 'parser.py')
+
+T = TypeVar('T')
+
+
+def grammar_signature() -> str:
+    "Hash of everything the generated tables depend on"
+    digest = sha256(f"{TABLES_VERSION}:{ply.__version__}".encode())
+    package = Path(__file__).parent
+    for file_name in GRAMMAR_FILES:
+        digest.update((package / file_name).read_bytes())
+    return digest.hexdigest()[:16]
+
+def tables_directory() -> Path:
+    return cache_directory() / f"tables-{grammar_signature()}"
+
+def load_table(name: str) -> Optional[ModuleType]:
+    """
+    Loads a table module generated by PLY, or returns None if it
+    doesn't exist. Unreadable tables are removed so they are rebuilt.
+    """
+    path = tables_directory() / f"{name}.py"
+    if not path.is_file():
+        return None
+
+    try:
+        # Bytecode makes loading much faster, even if Python won't write it
+        if not Path(importlib.util.cache_from_source(str(path))).is_file():
+            py_compile.compile(str(path), doraise=True)
+
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec) # type: ignore[arg-type]
+        spec.loader.exec_module(module) # type: ignore[union-attr]
+        return module
+    except Exception:
+        path.unlink(missing_ok=True)
+        return None
+
+def build_table(name: str, build: Callable[[Optional[str]], T]) -> T:
+    """
+    Builds a table calling `build` with the directory PLY must write it to,
+    then moves it to the cache atomically so readers never see a partial file.
+    `build` receives None when the cache can't be written.
+    """
+    directory = tables_directory()
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        temp_directory = tempfile.mkdtemp(prefix='.build-', dir=directory)
+    except OSError:
+        return build(None)
+
+    try:
+        result = build(temp_directory)
+        table = Path(temp_directory) / f"{name}.py"
+        if table.is_file():
+            os.replace(table, directory / f"{name}.py")
+            try:
+                py_compile.compile(str(directory / f"{name}.py"), doraise=True)
+            except (OSError, py_compile.PyCompileError):
+                pass
+        return result
+    finally:
+        shutil.rmtree(temp_directory, ignore_errors=True)
@@ -1,14 +1,19 @@
 from operator import add, and_, eq, gt, lt, mul, or_, sub, truediv
-from typing import Any, Callable, List, Optional, cast
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, cast
 
 from .errors import VirtualMachineRuntimeError
 from .errors import VirtualMachineRuntimeErrors as Errors
 from .vm_instructions import VirtualMachineInstruction as Instruction
+from .vm_memo_cache import MemoizationCache
 from .vm_memory import VirtualMachineMemory
 from .vm_memory_scope import MemoryScopeTemplate
 from .vm_stack_frame import ActivationRecordTemplate
 from .vm_types import FunctionDirectoryEntry, Quadruple
 
+# Steps between reads of the clock when running with a deadline
+DEADLINE_CHECK_STEPS = 1024
+
 
 class VirtualMachine:
     def __init__(self,
@@ -16,7 +21,8 @@ class VirtualMachine:
                  memory_scope_templates: List[MemoryScopeTemplate],
                  constants: List[Any],
                  instructions: List[Quadruple],
-                 debug: bool
+                 debug: bool,
+                 memo_size: int = 1024
     ) -> None:
         self.debug = debug
 
@@ -26,9 +32,57 @@ class VirtualMachine:
         self.instructions = instructions
 
         self.memory = VirtualMachineMemory(debug=False)
+        self.memo_cache = MemoizationCache(memo_size)
+        self.i = 0
+
+        # Amount of times each instruction has been executed
+        self.instruction_counts = [0] * (max(i.value for i in Instruction) + 1)
+
+    def run(self, deadline: Optional[float] = None) -> int:
+        """
+        Runs the program and returns its exit code. Execution stops once
+        `monotonic()` reaches `deadline`, if given.
+        """
+        # Allocate constants and global scope
+        self.memory.initialize_global_scope(self.constants, self.memory_scope_templates[0])
+        self.log(f"Initialized global scope with {len(self.constants)} constants, {self.memory_scope_templates[0].size()} global vars")
+
+        # Run the program
         self.i = 0
+        self.execute(deadline=deadline)
+
+        # Get exit code
+        exit_code = cast(int, self.memory.global_scope.get_local(0))
+        print(f"\nProgram ended with exit code: {exit_code}")
+        self.log(self.memo_cache)
+        return exit_code
+
+    def evaluate(self, function_id: int, arguments: List[Any], max_steps: int) -> Any:
+        "Runs a single function call with the given arguments and returns its value"
+        self.memory = VirtualMachineMemory(debug=False)
+        self.memory.initialize_global_scope(self.constants, self.memory_scope_templates[0])
+
+        # Create caller that holds the arguments and the returned value
+        end = len(self.instructions)
+        self.memory.push(ActivationRecordTemplate(identifier=-1,
+                                                  activation_address=end,
+                                                  return_address=end,
+                                                  arguments=[],
+                                                  return_value_address=None))
+        self.memory.top().push(MemoryScopeTemplate(end, 0, 0, 0, 0, len(arguments) + 1))
+
+        for i, value in enumerate(arguments):
+            self.memory.top().allocate(i + 1, value)
+            self.memory.top().parameter_push(self.memory.stack_offsets[-1] + i + 1)
 
-    def run(self):
+        # Call the function so it returns to the end of the program
+        self.i = end - 1
+        self.FUNCTION_CALL(function_id, self.memory.local_scope_offset)
+        self.execute(max_steps)
+
+        return self.memory.top().get(0)
+
+    def execute(self, max_steps: Optional[int] = None, deadline: Optional[float] = None):
         switch = {
             Instruction.OPEN_STACK_FRAME.value: lambda q: self.OPEN(q[1]),
             Instruction.CLOSE_STACK_FRAME.value: lambda q: self.CLOSE(),
@@ -60,14 +114,20 @@ class VirtualMachine:
             Instruction.DIVISION.value: lambda q: self.OP(truediv, q[0], q[1], q[2], q[3]),
         }
 
-        # Allocate constants and global scope
-        self.memory.initialize_global_scope(self.constants, self.memory_scope_templates[0])
-        self.log(f"Initialized global scope with {len(self.constants)} constants, {self.memory_scope_templates[0].size()} global vars")
-
-        # Run the program
-        self.i = 0
+        counts = self.instruction_counts
+        limited = max_steps is not None or deadline is not None
+        steps = 0
         while (self.i < len(self.instructions)):
             instruction = self.instructions[self.i]
+            counts[instruction[0]] += 1
+
+            # Stop runaway executions
+            if limited:
+                if max_steps is not None and steps >= max_steps:
+                    raise self.get_error(Errors.STEP_LIMIT_EXCEEDED)
+                if deadline is not None and steps % DEADLINE_CHECK_STEPS == 0 and monotonic() >= deadline:
+                    raise self.get_error(Errors.TIME_LIMIT_EXCEEDED)
+                steps += 1
 
             # Action depending on instruction
             action = switch.get(instruction[0], self.not_found)
@@ -79,9 +139,10 @@ class VirtualMachine:
             # Go to next instruction
             self.i += 1
 
-        # Get exit code
-        exit_code = cast(int, self.memory.global_scope.get_local(0))
-        print(f"\nProgram ended with exit code: {exit_code}")
+    def instruction_report(self) -> Dict[str, int]:
+        "Returns how many times each instruction was executed"
+        return {i.name: self.instruction_counts[i.value]
+                for i in Instruction if self.instruction_counts[i.value] > 0}
 
     #
     # CPU instructions
@@ -149,12 +210,31 @@ class VirtualMachine:
             # Other function
             parameters = self.memory.top().parameter_pop()
 
+        # Look for result of pure function in cache
+        memo_key = None
+        if function_data.memoize:
+            memo_key = (id, *(self.memory.get_global(addr) for addr in parameters))
+            cached_value = self.memo_cache.get(memo_key)
+
+            if cached_value is not None:
+                self.log(f"Called function {id}; got cached value {cached_value}")
+                self.memory.allocate_relative(cast(int, return_value_address), cached_value)
+
+                # Deallocate temp variables used in arguments
+                for addr in parameters:
+                    if self.memory.is_temp_global_address(addr):
+                        self.memory.deallocate_global(addr)
+
+                self.i += 1
+                return True
+
         # Generate activation record
         activation_record = ActivationRecordTemplate(identifier=id,
                                                      activation_address=self.i,
                                                      return_address=self.i + 1,
                                                      arguments=parameters,
-                                                     return_value_address=return_value_address)
+                                                     return_value_address=return_value_address,
+                                                     memo_key=memo_key)
         
         # Push new activation record into memory
         self.memory.push(activation_record)
@@ -185,6 +265,10 @@ class VirtualMachine:
             if return_value is not None:
                 # Allocate value to where it was supposed to be returned
                 self.memory.allocate_relative(activation_record.return_value_address, return_value)
+
+                # Save value of pure function for future calls
+                if activation_record.memo_key is not None:
+                    self.memo_cache.put(activation_record.memo_key, return_value)
             else:
                 # Function needs value to return, but return statement doesn't have one
                 raise self.get_error(Errors.RETURN_VALUE_NOT_FOUND)
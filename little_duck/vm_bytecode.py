@@ -0,0 +1,268 @@
+"""
+Binary format of compiled programs (.ldc files).
+
+All numbers are little endian. The file starts with a header and a table
+with the offset and size of every section, so sections can be read
+independently of each other:
+
+    header:   magic "LDC\\0", version u16, section count u16
+    sections: kind u16, item count u32, offset u64, byte size u64 (each)
+
+Sections hold the function directory, the memory scope templates,
+the constant pool and the quadruples. They're usually written in that
+order, but BytecodeWriter writes quadruples first, as they're generated.
+"""
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+
+from .errors import BytecodeError
+from .errors import BytecodeErrors as Errors
+from .vm_memory_scope import MemoryScopeTemplate
+from .vm_types import Constant, FunctionDirectoryEntry, GeneratedCode, Quadruple
+
+MAGIC = b'LDC\0'
+VERSION = 1
+
+HEADER = struct.Struct('<4sHH')
+SECTION = struct.Struct('<HIQQ')
+
+# Section kinds
+FUNCTIONS_SECTION = 0
+MEMORY_SECTION = 1
+CONSTANTS_SECTION = 2
+CODE_SECTION = 3
+SECTION_COUNT = 4
+
+FUNCTION = struct.Struct('<iiB')
+MEMORY_TEMPLATE = struct.Struct('<6i')
+QUADRUPLE = struct.Struct('<4i')
+
+# Quadruples store None as the smallest int
+NONE_OPERAND = -2**31
+
+# Constants are their type ID, how the value is stored and the value
+CONSTANT = struct.Struct('<BB')
+INT_VALUE = 0
+BOOL_VALUE = 1
+FLOAT_VALUE = 2
+TEXT_VALUE = 3
+BIG_INT_VALUE = 4 # Ints outside 64 bits are stored as text
+
+INT64 = struct.Struct('<q')
+FLOAT64 = struct.Struct('<d')
+LENGTH = struct.Struct('<I')
+
+Sections = Dict[int, Tuple[int, memoryview]]
+
+
+#
+# Writing
+#
+def dump_bytecode(code: GeneratedCode) -> bytes:
+    "Serializes generated code"
+    func_dir, mem_list, constants, quadruples = code
+
+    sections = table_sections(func_dir, mem_list, constants)
+    sections.append((CODE_SECTION, len(quadruples), b''.join(map(pack_quadruple, quadruples))))
+
+    # Sections go right after the section table
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = b''
+    for kind, count, data in sections:
+        table += SECTION.pack(kind, count, offset, len(data))
+        offset += len(data)
+
+    header = HEADER.pack(MAGIC, VERSION, len(sections))
+    return header + table + b''.join(data for _, _, data in sections)
+
+def save_bytecode(code: GeneratedCode, file: Union[str, Path, BinaryIO]):
+    "Writes generated code to a file name or binary file"
+    data = dump_bytecode(code)
+    if isinstance(file, (str, Path)):
+        with open(file, 'wb') as output:
+            output.write(data)
+    else:
+        file.write(data)
+
+class BytecodeWriter:
+    """
+    Writes bytecode while code is being generated, to a seekable file.
+    Quadruples are written as they come, right after the section table,
+    and the other sections after them once the writer is closed, when
+    the header and section table are filled in.
+    """
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.start = file.tell()
+        self.code_offset = HEADER.size + SECTION.size * SECTION_COUNT
+        self.count = 0
+        file.write(bytes(self.code_offset)) # Filled in when closed
+
+    def write(self, quadruples: Iterable[Quadruple]):
+        data = b''.join(map(pack_quadruple, quadruples))
+        self.file.write(data)
+        self.count += len(data) // QUADRUPLE.size
+
+    def patch(self, index: int, quadruple: Quadruple):
+        "Replaces a quadruple that was already written"
+        position = self.file.tell()
+        self.file.seek(self.start + self.code_offset + index * QUADRUPLE.size)
+        self.file.write(pack_quadruple(quadruple))
+        self.file.seek(position)
+
+    def close(self,
+              func_dir: List[FunctionDirectoryEntry],
+              mem_list: List[MemoryScopeTemplate],
+              constants: List[Constant]):
+        code_size = self.count * QUADRUPLE.size
+        table = SECTION.pack(CODE_SECTION, self.count, self.code_offset, code_size)
+
+        offset = self.code_offset + code_size
+        for kind, count, data in table_sections(func_dir, mem_list, constants):
+            table += SECTION.pack(kind, count, offset, len(data))
+            self.file.write(data)
+            offset += len(data)
+
+        end = self.file.tell()
+        self.file.seek(self.start)
+        self.file.write(HEADER.pack(MAGIC, VERSION, SECTION_COUNT) + table)
+        self.file.seek(end)
+
+def table_sections(func_dir: List[FunctionDirectoryEntry],
+                   mem_list: List[MemoryScopeTemplate],
+                   constants: List[Constant]) -> List[Tuple[int, int, bytes]]:
+    "Kind, item count and contents of every section but the quadruples"
+    return [
+        (FUNCTIONS_SECTION, len(func_dir), b''.join(
+            FUNCTION.pack(f.identifier, f.address, f.memoize) for f in func_dir)),
+        (MEMORY_SECTION, len(mem_list), b''.join(
+            MEMORY_TEMPLATE.pack(t.activation_address, t.int_count, t.bool_count,
+                                 t.float_count, t.str_count, t.temp_count) for t in mem_list)),
+        (CONSTANTS_SECTION, len(constants), b''.join(map(pack_constant, constants))),
+    ]
+
+def pack_quadruple(quadruple: Quadruple) -> bytes:
+    return QUADRUPLE.pack(*(NONE_OPERAND if v is None else v for v in quadruple))
+
+def pack_constant(constant: Constant) -> bytes:
+    type_id, value = constant
+    if isinstance(value, bool):
+        return CONSTANT.pack(type_id, BOOL_VALUE) + bytes([value])
+    if isinstance(value, int) and -2**63 <= value < 2**63:
+        return CONSTANT.pack(type_id, INT_VALUE) + INT64.pack(value)
+    if isinstance(value, int):
+        return CONSTANT.pack(type_id, BIG_INT_VALUE) + pack_text(str(value))
+    if isinstance(value, float):
+        return CONSTANT.pack(type_id, FLOAT_VALUE) + FLOAT64.pack(value)
+    if isinstance(value, str):
+        return CONSTANT.pack(type_id, TEXT_VALUE) + pack_text(value)
+    raise BytecodeError(Errors.UNSUPPORTED_CONSTANT, constant)
+
+def pack_text(text: str) -> bytes:
+    data = text.encode()
+    return LENGTH.pack(len(data)) + data
+
+
+#
+# Reading
+#
+def is_bytecode(file_name: Union[str, Path]) -> bool:
+    "Checks if a file starts like bytecode"
+    with open(file_name, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+def parse_bytecode(data: bytes) -> GeneratedCode:
+    "Deserializes generated code"
+    sections = read_section_table(memoryview(data))
+
+    try:
+        func_dir = [FunctionDirectoryEntry(identifier, address, bool(memoize))
+                    for identifier, address, memoize in read_section(sections, FUNCTIONS_SECTION, FUNCTION)]
+        mem_list = [MemoryScopeTemplate(*values)
+                    for values in read_section(sections, MEMORY_SECTION, MEMORY_TEMPLATE)]
+        constants = unpack_constants(*sections[CONSTANTS_SECTION])
+        quadruples: List[Quadruple] = [
+            unpack_quadruple(q) if NONE_OPERAND in q else q # type: ignore[misc]
+            for q in read_section(sections, CODE_SECTION, QUADRUPLE)]
+    except (KeyError, struct.error, UnicodeDecodeError, ValueError) as error:
+        raise BytecodeError(Errors.CORRUPTED_FILE, error)
+
+    return func_dir, mem_list, constants, quadruples
+
+def load_bytecode(file: Union[str, Path, BinaryIO]) -> GeneratedCode:
+    "Reads generated code from a file name or binary file"
+    if isinstance(file, (str, Path)):
+        with open(file, 'rb') as input:
+            return parse_bytecode(input.read())
+    return parse_bytecode(file.read())
+
+def read_section_table(view: memoryview) -> Sections:
+    "Returns the item count and contents of every section, by kind"
+    if len(view) < HEADER.size:
+        raise BytecodeError(Errors.NOT_BYTECODE)
+    magic, version, section_count = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise BytecodeError(Errors.NOT_BYTECODE)
+    if version != VERSION:
+        raise BytecodeError(Errors.UNSUPPORTED_VERSION, version)
+
+    sections: Sections = {}
+    for i in range(section_count):
+        position = HEADER.size + i * SECTION.size
+        if position + SECTION.size > len(view):
+            raise BytecodeError(Errors.CORRUPTED_FILE)
+        kind, count, offset, size = SECTION.unpack_from(view, position)
+        if offset + size > len(view):
+            raise BytecodeError(Errors.CORRUPTED_FILE)
+        sections[kind] = (count, view[offset:offset + size])
+    return sections
+
+def read_section(sections: Sections, kind: int, item: struct.Struct):
+    "Unpacks every item of a section made of fixed size items"
+    count, section = sections[kind]
+    if count * item.size != len(section):
+        raise BytecodeError(Errors.CORRUPTED_FILE)
+    return item.iter_unpack(section)
+
+def unpack_constants(count: int, section: memoryview) -> List[Constant]:
+    constants: List[Constant] = []
+    offset = 0
+    for _ in range(count):
+        type_id, kind = CONSTANT.unpack_from(section, offset)
+        offset += CONSTANT.size
+
+        value: Union[int, bool, float, str]
+        if kind == INT_VALUE:
+            value = INT64.unpack_from(section, offset)[0]
+            offset += INT64.size
+        elif kind == BOOL_VALUE:
+            if offset >= len(section):
+                raise BytecodeError(Errors.CORRUPTED_FILE)
+            value = bool(section[offset])
+            offset += 1
+        elif kind == FLOAT_VALUE:
+            value = FLOAT64.unpack_from(section, offset)[0]
+            offset += FLOAT64.size
+        elif kind in (TEXT_VALUE, BIG_INT_VALUE):
+            length = LENGTH.unpack_from(section, offset)[0]
+            offset += LENGTH.size
+            if offset + length > len(section):
+                raise BytecodeError(Errors.CORRUPTED_FILE)
+            text = bytes(section[offset:offset + length]).decode()
+            value = text if kind == TEXT_VALUE else int(text)
+            offset += length
+        else:
+            raise BytecodeError(Errors.CORRUPTED_FILE, kind)
+        constants.append((type_id, value))
+
+    if offset != len(section):
+        raise BytecodeError(Errors.CORRUPTED_FILE)
+    return constants
+
+def unpack_quadruple(quadruple: Tuple[int, int, int, int]) -> Quadruple:
+    return unpack_operand(quadruple[0]), unpack_operand(quadruple[1]), \
+           unpack_operand(quadruple[2]), unpack_operand(quadruple[3]) # type: ignore[return-value]
+
+def unpack_operand(value: int) -> Optional[int]:
+    return None if value == NONE_OPERAND else value
@@ -0,0 +1,39 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class MemoizationCache:
+    """Bounded LRU table of function results keyed by argument tuple"""
+    def __init__(self, size: int = 1024) -> None:
+        self.size = size
+        self.entries: OrderedDict[Hashable, Any] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        "Returns the cached value, or None if it's not stored"
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        "Stores a value, evicting the least recently used one if full"
+        if self.size <= 0:
+            return
+
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __str__(self) -> str:
+        return f"MemoizationCache({len(self)}/{self.size} entries, {self.hits} hits, {self.misses} misses)"
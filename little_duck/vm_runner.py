@@ -1,13 +1,20 @@
+from typing import Optional
+
 from .vm import VirtualMachine
 from .vm_types import GeneratedCode
 
 
 class VirtualMachineRunner:
     def __init__(self,
-                 debug: bool = False):
+                 debug: bool = False,
+                 memo_size: int = 1024,
+                 stats: bool = False):
         self.debug = debug
+        self.memo_size = memo_size
+        self.stats = stats
 
-    def run_from_code(self, code: GeneratedCode):
+    def run_from_code(self, code: GeneratedCode, deadline: Optional[float] = None) -> int:
+        "Runs generated code and returns its exit code, see `VirtualMachine.run`"
         func_dir, mem_list, constants, quadruples = code
 
         const_list = [t[1] for t in constants]
@@ -16,7 +23,15 @@ class VirtualMachineRunner:
                                          memory_scope_templates=mem_list,
                                          constants=const_list,
                                          instructions=quadruples,
-                                         debug=self.debug)
+                                         debug=self.debug,
+                                         memo_size=self.memo_size)
+
+        exit_code = virtual_machine.run(deadline)
 
-        virtual_machine.run()
+        if self.stats:
+            report = virtual_machine.instruction_report()
+            print("Executed instructions:", sum(report.values()))
+            for name, count in sorted(report.items(), key=lambda item: -item[1]):
+                print(f"  {name}: {count}")
 
+        return exit_code
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Tuple
 
 from .errors import VirtualMachineMemoryError as MemoryError
 from .errors import VirtualMachineMemoryErrors as Errors
@@ -14,6 +14,7 @@ class ActivationRecordTemplate:
     return_address: int # Instruction to go back after returning
     arguments: List[int] # Global addresses for arguments
     return_value_address: Optional[int] # Global address to return
+    memo_key: Optional[Tuple] = None # Key to cache the returned value
 
 class ActivationRecord:
     def __init__(self, template: ActivationRecordTemplate, debug: bool) -> None:
@@ -24,6 +25,7 @@ class ActivationRecord:
         self.return_address = template.return_address
         self.arguments = template.arguments
         self.return_value_address = template.return_value_address
+        self.memo_key = template.memo_key
 
         self.arguments_to_load = template.arguments
         self.memory_scopes: List[MemoryScope] = []
@@ -9,6 +9,7 @@ Quadruple = Tuple[int, Optional[int], Optional[int], Optional[int]]
 class FunctionDirectoryEntry:
     identifier: int # Function ID
     address: int # Intruction where func starts
+    memoize: bool = False # Cache results by argument tuple
 
 Constant = Tuple[int, Any]
 GeneratedCode = Tuple[List[FunctionDirectoryEntry], List[MemoryScopeTemplate],
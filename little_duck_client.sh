@@ -0,0 +1 @@
+python client.py $@
\ No newline at end of file
@@ -1,26 +1,189 @@
 import argparse
+import os
+import sys
+from pathlib import Path
 
-from little_duck import LittleDuckCompiler, LittleDuckVirtualMachineRunner
+from little_duck import LittleDuckVirtualMachineRunner
 from little_duck.errors import CompileError, SemanticError, VirtualMachineError
+from little_duck.module_index import ModuleIndex
+from little_duck.program_cache import ProgramCache
+from little_duck.vm_bytecode import is_bytecode, load_bytecode, save_bytecode
 
 
-def main():
+def add_compiler_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("-deps", "--dependencies", type=str, nargs='*', default=[], help="Dependency files")
+    parser.add_argument("-I", "--search_path", type=str, action='append', default=[], help="Directory to look for imported modules in, can be repeated")
+    parser.add_argument("-m", "--memoize", action="store_true", help="Cache results of pure functions")
+    parser.add_argument("-O", "--optimize", action="store_true", help="Optimize generated code")
+    parser.add_argument("--evaluation_steps", type=int, default=10000, help="Max VM steps to evaluate a call at compile time")
+    parser.add_argument("--unroll_factor", type=int, default=4, help="Times the body of small counted loops is repeated")
+    parser.add_argument("--no_cache", action="store_true", help="Always compile, without reading or writing the compilation caches")
+    parser.add_argument("--cache_size", type=int, default=64, help="Max size of each compilation cache in MB")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Processes used to parse dependency modules")
+    parser.add_argument("--scanner", type=str, choices=['ply', 'fast'], default='ply', help="Lexer used to read source files")
+    parser.add_argument("--parser", type=str, choices=['ply', 'descent'], default='ply', help="Parser used to build syntax trees")
+
+def add_runner_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--memo_size", type=int, default=1024, help="Max amount of cached results")
+    parser.add_argument("-s", "--stats", action="store_true", help="Show executed instruction counters")
+
+def compiler_options(args):
+    "Options that change the generated code"
+    return {
+        'memoize': args.memoize,
+        'optimize': args.optimize,
+        'evaluation_steps': args.evaluation_steps,
+        'unroll_factor': args.unroll_factor,
+    }
+
+def compiler_arguments(args):
+    "Keyword arguments of the compiler"
+    # Imported here so running bytecode or cached programs never loads the compiler
+    from little_duck.module_cache import ModuleCache
+
+    module_cache = None
+    if not args.no_cache:
+        module_cache = ModuleCache(max_size=args.cache_size * 1024 * 1024, debug=args.verbose)
+
+    return {
+        'debug': args.verbose,
+        'module_cache': module_cache,
+        'workers': args.jobs,
+        'search_paths': args.search_path,
+        'scanner': args.scanner,
+        'parser_backend': args.parser,
+        **compiler_options(args),
+    }
+
+def create_compiler(args):
+    from little_duck import LittleDuckCompiler
+    return LittleDuckCompiler(**compiler_arguments(args))
+
+def compile_program(args):
+    def build():
+        return create_compiler(args).compile(args.input_file, args.dependencies)
+
+    if args.no_cache:
+        return build()
+
+    # Any module in the search paths may be imported
+    module_files = ModuleIndex(args.dependencies, args.search_path).search_path_files()
+
+    program_cache = ProgramCache(max_size=args.cache_size * 1024 * 1024, debug=args.verbose)
+    return program_cache.compile([args.input_file] + args.dependencies + module_files, compiler_options(args), build)
+
+def run_program(args, generated_code):
+    runner = LittleDuckVirtualMachineRunner(debug=args.verbose,
+                                            memo_size=args.memo_size,
+                                            stats=args.stats)
+    runner.run_from_code(generated_code)
+
+#
+# Commands
+#
+def compile_command(argv):
+    parser = argparse.ArgumentParser(prog="run.py compile", description="Compile Little Duck code to bytecode")
+    parser.add_argument("input_file", type=str, help="Input source file to compile")
+    parser.add_argument("-o", "--output", type=str, help="Bytecode file to write, defaults to the input with .ldc extension")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Increase output verbosity")
+    parser.add_argument("--stream", action="store_true", help="Write each function as soon as it's generated, to compile very large programs in less memory")
+    add_compiler_arguments(parser)
+    args = parser.parse_args(argv)
+
+    output = args.output or str(Path(args.input_file).with_suffix('.ldc'))
+    if args.stream:
+        create_compiler(args).compile_to_file(args.input_file, args.dependencies, output)
+    else:
+        save_bytecode(compile_program(args), output)
+    print("Compiled", args.input_file, "to", output)
+
+def run_command(argv):
+    parser = argparse.ArgumentParser(prog="run.py run", description="Run Little Duck bytecode")
+    parser.add_argument("input_file", type=str, help="Bytecode file, or source file to compile first")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Increase output verbosity")
+    add_runner_arguments(parser)
+    add_compiler_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if is_bytecode(args.input_file):
+        generated_code = load_bytecode(args.input_file)
+    else:
+        generated_code = compile_program(args)
+    run_program(args, generated_code)
+
+def batch_command(argv):
+    parser = argparse.ArgumentParser(prog="run.py batch", description="Compile and run many Little Duck programs, reporting each one as a JSON line")
+    parser.add_argument("inputs", type=str, nargs='+', help="Source files to run, or directories with them")
+    parser.add_argument("-o", "--output", type=str, help="Report file to write, defaults to standard output")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Processes compiling and running programs")
+    parser.add_argument("-t", "--timeout", type=float, help="Seconds each program may take, compilation included")
+    parser.add_argument("--memo_size", type=int, default=1024, help="Max amount of cached results")
+    add_compiler_arguments(parser)
+    parser.set_defaults(verbose=False)
+    args = parser.parse_args(argv)
+
+    from little_duck.batch import program_files, run_batch, write_report
+
+    programs = program_files(args.inputs)
+    results = run_batch(programs, args.dependencies,
+                        workers=args.workers,
+                        timeout=args.timeout,
+                        memo_size=args.memo_size,
+                        compiler_options=compiler_arguments(args))
+    if args.output:
+        with open(args.output, 'w') as report:
+            statuses = write_report(results, report)
+    else:
+        statuses = write_report(results, sys.stdout)
+
+    counts = ', '.join(f"{count} {status}" for status, count in sorted(statuses.items()))
+    print(f"Ran {len(programs)} programs: {counts or 'none'}", file=sys.stderr)
+
+def daemon_command(argv):
+    from little_duck.daemon_client import default_socket_path
+
+    parser = argparse.ArgumentParser(prog="run.py daemon", description="Compile and run Little Duck programs for clients of a Unix socket, see client.py")
+    parser.add_argument("--socket", type=str, default=default_socket_path(), help="Unix socket to listen on")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Processes compiling and running programs")
+    parser.add_argument("-t", "--timeout", type=float, help="Seconds each program may take when clients don't say, compilation included")
+    parser.add_argument("--memo_size", type=int, default=1024, help="Max amount of cached results")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log workers and requests")
+    add_compiler_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from little_duck.daemon import CompilerDaemon
+
+    daemon = CompilerDaemon(args.socket,
+                            workers=args.workers,
+                            timeout=args.timeout,
+                            memo_size=args.memo_size,
+                            compiler_options=compiler_arguments(args),
+                            debug=args.verbose)
+    try:
+        listener = daemon.listen()
+    except OSError as error:
+        print("Can't start daemon:", error)
+        return
+
+    print("Listening on", args.socket, flush=True)
+    daemon.serve(listener)
+
+def compile_and_run_command(argv):
     # Create the parser
-    parser = argparse.ArgumentParser(description="Little Duck code compiler")
-    
+    parser = argparse.ArgumentParser(description="Little Duck code compiler",
+                                     epilog="Use 'run.py compile' and 'run.py run' to work with bytecode files, 'run.py batch' to run many programs and 'run.py daemon' to serve client.py.")
+
     # Add arguments
     parser.add_argument("input_file", type=str, help="Input source file to compile")
-    parser.add_argument("-deps", "--dependencies", type=str, nargs='*', help="Dependency files")
     parser.add_argument("-o","--output_dir", type=str, default=".", help="Directory to place output files")
     parser.add_argument("-w", "--no_warnings", action="store_true", help="Hide warnings during compilation")
     parser.add_argument("-d", "--debug", action="store_true", help="Enable debug mode")
     parser.add_argument("-v", "--verbose", action="store_true", help="Increase output verbosity")
+    add_compiler_arguments(parser)
+    add_runner_arguments(parser)
 
     # Parse the arguments
-    args = parser.parse_args()
-
-    if args.dependencies is None:
-        args.dependencies = []
+    args = parser.parse_args(argv)
 
     # Use the arguments
     if args.debug or args.verbose:
@@ -30,25 +193,36 @@ def main():
         print("no_warnings:", args.no_warnings)
         print("debug:", args.debug)
         print("verbose:", args.verbose)
+        print("memoize:", args.memoize)
+        print("optimize:", args.optimize)
 
-    try:
-        # Run the compiler
-        compiler = LittleDuckCompiler(debug=args.verbose)
-        generated_code = compiler.compile(args.input_file, args.dependencies)
+    # Run the compiler, then the code
+    run_program(args, compile_program(args))
 
-        # Run the code
-        runner = LittleDuckVirtualMachineRunner(debug=args.verbose)
-        runner.run_from_code(generated_code)
+
+def main():
+    argv = sys.argv[1:]
+    try:
+        if argv and argv[0] == 'compile':
+            compile_command(argv[1:])
+        elif argv and argv[0] == 'run':
+            run_command(argv[1:])
+        elif argv and argv[0] == 'batch':
+            batch_command(argv[1:])
+        elif argv and argv[0] == 'daemon':
+            daemon_command(argv[1:])
+        else:
+            compile_and_run_command(argv)
 
     except SyntaxError as error:
         print("SyntaxError:", error)
 
     except SemanticError as error:
         print("SemanticError:", error.message)
-    
+
     except CompileError as error:
         print("CompileError:", error.message)
-    
+
     except VirtualMachineError as error:
         print("VirtualMachineError:", error.message)
 
@@ -1,11 +1,72 @@
+import io
+import json
+import os
+import subprocess
 import sys
+import time
 from pathlib import Path
+from typing import Dict, Optional, Tuple
 
 # Add the project root directory to sys.path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 import pytest
-from little_duck import LittleDuckLexer, LittleDuckParser
+from little_duck import LittleDuckCompiler, LittleDuckCompilerSession, LittleDuckDescentParser, LittleDuckLexer, LittleDuckParser, LittleDuckScanner
+from little_duck import analyzer
+from little_duck.analyzer import LittleDuckAnalyzer, qstr
+from little_duck.batch import program_files, run_batch
+from little_duck.daemon import CompilerDaemon
+from little_duck.daemon_client import default_socket_path, request
+from little_duck.tables import tables_directory
+from little_duck.dependency_analyzer import LittleDuckDependencyAnalyzer
+from little_duck.dependency_graph import DependencyGraph
+from little_duck.errors import BytecodeError, CompileError, SemanticError, VirtualMachineError
+from little_duck.linker import import_scope, link, reachable_functions
+from little_duck.module_cache import ModuleCache
+from little_duck.nodes import ValueNode
+from little_duck.program_cache import ProgramCache
+from little_duck.quadruples import QuadrupleIdentifier
+from little_duck.vm import VirtualMachine
+from little_duck.vm_bytecode import CONSTANTS_SECTION, HEADER, SECTION, SECTION_COUNT, dump_bytecode, load_bytecode, parse_bytecode, save_bytecode
+from little_duck.vm_instructions import VirtualMachineInstruction
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Every Little Duck file in the repo
+SOURCE_FILES = sorted(str(file.relative_to(ROOT)) for file in ROOT.glob('**/*.ld'))
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    "Every test has its own cache directory, so the real caches are never read or written"
+    monkeypatch.setenv('LITTLE_DUCK_CACHE_DIR', str(tmp_path / 'cache'))
+
+def compile_code(tmp_path: Path, code: str, **options):
+    file = tmp_path / 'test.ld'
+    file.write_text(code)
+    compiler = LittleDuckCompiler(**options)
+    return compiler.compile(str(file), [])
+
+def build_vm(generated_code, **options) -> VirtualMachine:
+    func_dir, mem_list, constants, quadruples = generated_code
+    return VirtualMachine(function_directory=func_dir,
+                          memory_scope_templates=mem_list,
+                          constants=[t[1] for t in constants],
+                          instructions=quadruples,
+                          debug=False,
+                          **options)
+
+def run_vm(generated_code, capsys) -> Tuple[str, Dict[str, int]]:
+    "Runs generated code, returns what it printed and its instruction counts"
+    vm = build_vm(generated_code)
+    vm.run()
+    return capsys.readouterr().out, vm.instruction_report()
+
+def optimizer_log(tmp_path: Path, code: str, capsys, **options) -> str:
+    "Output of compiling optimized code in debug mode"
+    compile_code(tmp_path, code, optimize=True, debug=True, **options)
+    return capsys.readouterr().out
+
 
 class TestLexer:
     def test_lexer1(self):
@@ -68,6 +129,55 @@ class TestLexer:
         tokens = list(map(lambda x: x.type, tokens))
         assert tokens == expected
 
+class TestScanner:
+    snippets = [
+        "x-1 x - 1 x -1.5 y-z",
+        "truex falsey true_ false",
+        "a/b // comment /* not a block\n/* block\n comment */ c/ /d",
+        '"escaped \\" quote" "" "multi\nline" after',
+        "1.5.2 12abc 3. 007",
+        "a && b || !c == d != e < f > g = h",
+        "program import main if else while do end print var void int float string bool return",
+        "\t\t  \n\n\nfoo",
+        "x $ y",
+        "x\r\ny",
+        'x "unterminated',
+        "ok /* unterminated",
+    ]
+
+    def tokens(self, lexer, text: str):
+        "Tokens as the parser gets them, and the error that stopped them"
+        lexer = lexer.lexer
+        lexer.lineno = 1
+        lexer.input(text)
+        tokens = []
+        try:
+            for token in iter(lexer.token, None):
+                tokens.append((token.type, token.value, token.lineno, token.lexpos))
+        except SyntaxError as error:
+            return tokens, str(error)
+        return tokens, None
+
+    @pytest.mark.parametrize('file', SOURCE_FILES)
+    def test_files_match_ply_lexer(self, file):
+        text = (ROOT / file).read_text()
+        assert self.tokens(LittleDuckScanner(), text) == self.tokens(LittleDuckLexer(), text)
+
+    @pytest.mark.parametrize('text', snippets)
+    def test_snippets_match_ply_lexer(self, text):
+        assert self.tokens(LittleDuckScanner(), text) == self.tokens(LittleDuckLexer(), text)
+
+    def test_errors_are_raised_when_reached(self):
+        scanner = LittleDuckScanner()
+        tokens = scanner.input("program $")
+        assert [t.type for t in tokens] == ['PROGRAM']
+        with pytest.raises(SyntaxError, match="Syntax error"):
+            LittleDuckParser().parse("program ; $", scanner)
+
+    def test_compiler_option(self, tmp_path):
+        code = (ROOT / 'algorithms.ld').read_text()
+        assert tuple(compile_code(tmp_path, code, scanner='fast')) == tuple(compile_code(tmp_path, code))
+
 class TestParser:
     def test_parser1(self):
         lexer = LittleDuckLexer()
@@ -117,4 +227,1237 @@ class TestParser:
         with open('code.ld', 'r') as file:
             file_contents = file.read()
         parser.parse(file_contents, lexer)
-        
+
+    def test_lists_keep_source_order(self):
+        code = \
+        """
+        import First; import Second;
+        program Lists;
+        var a, b: int;
+        var c: float;
+        int f(x: int, y: int,) : { var p: int; p = x; var q: int; return y; }
+        void g() : { return; }
+        main { print(f(1, 2,), 3); return 0; }
+        end;
+        """
+        tree = LittleDuckParser().parse(code, LittleDuckLexer())
+        assert tree.dependencies == ['First', 'Second']
+        assert [v.identifier for v in tree.global_vars] == ['a', 'b', 'c']
+        assert [f.identifier for f in tree.global_funcs] == ['f', 'g']
+        assert [p.identifier for p in tree.global_funcs[0].parameters] == ['x', 'y']
+        assert [type(s).__name__ for s in tree.global_funcs[0].body.statements] == \
+            ['DeclareVariableNode', 'AssignmentNode', 'DeclareVariableNode', 'ReturnStatementNode']
+        assert len(tree.main_func.body.statements[0].arguments) == 2
+
+    def test_long_bodies(self):
+        body = '\n'.join(f"x = x + {i};" for i in range(20000))
+        code = f"program Long; main {{ var x: int; x = 0; {body} return 0; }} end;"
+        tree = LittleDuckParser().parse(code, LittleDuckLexer())
+        assert len(tree.main_func.body.statements) == 20003
+        assert tree.main_func.body.statements[-2].value.right_side.value.value == 19999
+
+class TestDescentParser:
+    snippets = [
+        "program P; main { x = 1 + 2 * 3 - 4 / 5 < 6 && 7 == 8 || !a != -b > c; return 0; } end;",
+        "program P; main { x = -(1); } end;",
+        "program P; main { x = ((a)); y = f(g(1,), h()); } end;",
+        "program P; main { x = -f(1, (2 + 3) * 4,) * (a - b - c) / -g() || !h(-x, (y)); } end;",
+        "program P; main { x = f(1 2); y = (1 + 2; } end;",
+        "program P; main { x = f(1,,); } end;",
+        "import A; import B; program P; var a, b: int; var c: float; void g() : { return; } main { g(); return 0; } end;",
+        "program P; int f(a: int, b: bool,) : { var q: int; q = 1; var r: int; return a; } main { return 0; } end;",
+        "program P; main { if (x) { } else { do { y = 1; } while (y < 2); } while (z) { print(\"s\", 1.5, true,); } } end;",
+        "program P; main { x = 1 } end;",
+        "program P; main { return; } end; extra",
+        "program P; main { x = a < ; } end;",
+        "program P; main { x = $; } end;",
+        "program P; main {",
+        "program P; void f() { } main { } end;",
+        "",
+    ]
+
+    def parse(self, parser, code: str):
+        "Tree of the code, or the error message"
+        try:
+            return parser.parse(code, LittleDuckLexer())
+        except SyntaxError as error:
+            return str(error)
+
+    @pytest.mark.parametrize('file', SOURCE_FILES)
+    def test_files_match_ply_parser(self, file):
+        code = (ROOT / file).read_text()
+        assert self.parse(LittleDuckDescentParser(), code) == self.parse(LittleDuckParser(), code)
+
+    @pytest.mark.parametrize('code', snippets)
+    def test_snippets_match_ply_parser(self, code):
+        assert self.parse(LittleDuckDescentParser(), code) == self.parse(LittleDuckParser(), code)
+
+    def test_long_bodies(self):
+        body = '\n'.join(f"x = x + {i};" for i in range(20000))
+        code = f"program Long; main {{ var x: int; x = 0; {body} return 0; }} end;"
+        tree = LittleDuckDescentParser().parse(code, LittleDuckScanner())
+        assert len(tree.main_func.body.statements) == 20003
+
+    def test_deeply_nested_expressions(self, tmp_path, capsys):
+        depth = 5000
+        code = f"program Deep; main {{ var x: int; x = {'(' * depth}1 + 2{')' * depth} * 3; print(x); return 0; }} end;"
+        assert self.parse(LittleDuckDescentParser(), code) == self.parse(LittleDuckParser(), code)
+        build_vm(compile_code(tmp_path, code, parser_backend='descent')).run()
+        assert capsys.readouterr().out.startswith("9\n")
+
+        code = f"program Deep; main {{ x = {'f(' * depth}1{')' * depth}; }} end;"
+        call = LittleDuckDescentParser().parse(code, LittleDuckScanner()).main_func.body.statements[0].value
+        for _ in range(depth):
+            call = call.arguments[0]
+        assert isinstance(call, ValueNode)
+
+    def test_compiler_option(self, tmp_path):
+        code = (ROOT / 'algorithms.ld').read_text()
+        assert tuple(compile_code(tmp_path, code, parser_backend='descent')) == tuple(compile_code(tmp_path, code))
+
+class TestMemoization:
+    code = \
+    """
+    program Memo;
+    var calls: int;
+    int fibonacci(n: int) :
+    {
+        if (n < 2) {
+            return n;
+        }
+        return fibonacci(n - 1) + fibonacci(n - 2);
+    }
+    int counted(n: int) :
+    {
+        calls = n;
+        return n;
+    }
+    main {
+        calls = 0;
+        print(fibonacci(20), counted(1), counted(1), calls);
+        return 0;
+    }
+    end;
+    """
+
+    def test_pure_functions_are_memoized(self, tmp_path, capsys):
+        code = compile_code(tmp_path, self.code, memoize=True)
+        func_dir = code[0]
+        assert [f.memoize for f in func_dir] == [True, False, False]
+
+        vm = build_vm(code, memo_size=64)
+        vm.run()
+        assert capsys.readouterr().out.startswith("6765 1 1 1")
+        assert vm.memo_cache.hits > 0
+        assert len(vm.memo_cache) <= 64
+
+    def test_memoization_is_opt_in(self, tmp_path):
+        code = compile_code(tmp_path, self.code)
+        assert not any(f.memoize for f in code[0])
+
+class TestPartialEvaluation:
+    code = \
+    """
+    program Partial;
+    int factorial(n: int) :
+    {
+        if (n == 0) {
+            return 1;
+        }
+        return n * factorial(n - 1);
+    }
+    int spin(n: int) :
+    {
+        var i: int;
+        i = 0;
+        while (i < n) {
+            i = i + 1;
+        }
+        return i;
+    }
+    main {
+        var x: int;
+        x = 8;
+        print(factorial(x), spin(500));
+        return 0;
+    }
+    end;
+    """
+
+    def count_calls(self, generated_code) -> int:
+        call = VirtualMachineInstruction.FUNCTION_CALL.value
+        return sum(1 for q in generated_code[3] if q[0] == call)
+
+    def test_constant_calls_are_evaluated(self, tmp_path, capsys):
+        plain = compile_code(tmp_path, self.code)
+        optimized = compile_code(tmp_path, self.code, optimize=True)
+        assert self.count_calls(plain) == 4
+        assert self.count_calls(optimized) == 2
+        assert (0, 40320) in optimized[2]
+
+        build_vm(optimized).run()
+        assert capsys.readouterr().out.startswith("40320 500")
+
+    def test_evaluation_is_step_bounded(self, tmp_path, capsys):
+        optimized = compile_code(tmp_path, self.code, optimize=True, evaluation_steps=100)
+        assert self.count_calls(optimized) == 3
+
+        build_vm(optimized).run()
+        assert capsys.readouterr().out.startswith("40320 500")
+
+class TestLoopUnrolling:
+    code = \
+    """
+    program Unroll;
+    int sum(n: int) :
+    {
+        var i, total: int;
+        i = 0;
+        total = 0;
+        while (i < n) {
+            if (i > 2) {
+                total = total + i;
+            }
+            i = i + 1;
+        }
+        return total;
+    }
+    main {
+        var n: int;
+        n = 0;
+        while (n < 11) {
+            print(sum(n));
+            n = n + 2;
+        }
+        while (n > 0) {
+            n = n - 3;
+        }
+        return n;
+    }
+    end;
+    """
+
+    def test_unrolled_loops_keep_results(self, tmp_path, capsys):
+        plain = compile_code(tmp_path, self.code)
+        expected, _ = run_vm(plain, capsys)
+
+        for factor in (2, 3, 4):
+            unrolled = compile_code(tmp_path, self.code, optimize=True, unroll_factor=factor)
+            assert len(unrolled[3]) > len(plain[3])
+            assert run_vm(unrolled, capsys)[0] == expected
+
+    def test_unrolled_loops_are_reported(self, tmp_path, capsys):
+        output = optimizer_log(tmp_path, self.code, capsys, unroll_factor=2)
+        assert output.count("Unrolled loop over 'i' by a factor of 2") == 1
+        assert output.count("Unrolled loop over 'n' by a factor of 2") == 1
+
+class TestStrengthReduction:
+    code = \
+    """
+    program Strength;
+    main {
+        var i, n, s: int;
+        var f: float;
+        i = 0;
+        n = 10;
+        s = 0;
+        f = 1.5;
+        while (i < n) {
+            s = s + i * 3 + i * 5;
+            print(i * 3, s * 1, s * 2, f * 1, f * 2, s * -1, i * 0);
+            i = i + 2;
+            print(i * 3);
+        }
+        print(s * 4, f * 0);
+        return 0;
+    }
+    end;
+    """
+
+    def test_reduced_code_keeps_results(self, tmp_path, capsys):
+        expected, plain_report = run_vm(compile_code(tmp_path, self.code), capsys)
+        output, reduced_report = run_vm(compile_code(tmp_path, self.code, optimize=True, unroll_factor=1), capsys)
+
+        assert output == expected
+        assert reduced_report['MULTIPLICATION'] < plain_report['MULTIPLICATION']
+        assert sum(reduced_report.values()) < sum(plain_report.values())
+
+    def test_induction_variables_are_reported(self, tmp_path, capsys):
+        output = optimizer_log(tmp_path, self.code, capsys)
+        assert "Reduced 'i * 3' into induction variable 'i*3'" in output
+        assert "Reduced 'i * 5' into induction variable 'i*5'" in output
+
+class TestCopyPropagation:
+    code = \
+    """
+    program Copies;
+    var total: int;
+    int twice(n: int) :
+    {
+        return n + n;
+    }
+    main {
+        var a, b, c: int;
+        a = 3;
+        b = a * 1;
+        c = twice(b);
+        total = c;
+        a = a + b * c;
+        print(a, b, c * 1, total);
+        return 0;
+    }
+    end;
+    """
+
+    def test_copies_are_removed(self, tmp_path, capsys):
+        expected, plain_report = run_vm(compile_code(tmp_path, self.code), capsys)
+        output, optimized_report = run_vm(compile_code(tmp_path, self.code, optimize=True), capsys)
+
+        assert output == expected
+        assert optimized_report['ASSIGN'] < plain_report['ASSIGN']
+        assert sum(optimized_report.values()) < sum(plain_report.values())
+
+    def test_results_are_forwarded(self, tmp_path, capsys):
+        output = optimizer_log(tmp_path, self.code, capsys)
+        assert "Forwarded t_1 to c" in output
+        assert "Propagated c into t_4" in output
+
+class TestParserTables:
+    code = \
+    """
+    program Tables;
+    main {
+        print(1);
+        return 0;
+    }
+    end;
+    """
+
+    def parse(self):
+        return LittleDuckParser().parse(self.code, LittleDuckLexer())
+
+    def test_tables_are_persisted(self):
+        tree = self.parse()
+        assert (tables_directory() / 'little_duck_lextab.py').is_file()
+        assert (tables_directory() / 'little_duck_parsetab.py').is_file()
+        assert self.parse() == tree
+
+    def test_broken_tables_are_rebuilt(self):
+        tree = self.parse()
+        for table in ('little_duck_lextab.py', 'little_duck_parsetab.py'):
+            (tables_directory() / table).write_text("_tabversion = (")
+
+        assert self.parse() == tree
+        assert "_tabversion = (" not in (tables_directory() / 'little_duck_parsetab.py').read_text()
+
+    def test_modules_share_lexer_and_parser(self, tmp_path):
+        valid = tmp_path / 'valid.ld'
+        valid.write_text(self.code)
+        invalid = tmp_path / 'invalid.ld'
+        invalid.write_text("program Invalid;\nmain {\n    print(;\n}\nend;\n")
+
+        compiler = LittleDuckCompiler()
+        compiler.parse_module(str(valid))
+        lexer, parser = compiler.lexer, compiler.parser
+        with pytest.raises(SyntaxError, match="on line 3"):
+            compiler.parse_module(str(invalid))
+        assert compiler.lexer is lexer and compiler.parser is parser
+
+class TestLazyImports:
+    def loaded_modules(self, statement: str):
+        script = f"import sys\n{statement}\nprint(' '.join(sorted(sys.modules)))"
+        output = subprocess.run([sys.executable, '-c', script],
+                                cwd=Path(__file__).resolve().parent.parent,
+                                check=True, capture_output=True, text=True).stdout
+        return output.split()
+
+    def test_vm_is_imported_alone(self):
+        modules = self.loaded_modules("from little_duck import LittleDuckVirtualMachineRunner")
+        assert 'little_duck.vm' in modules
+        for front_end in ('ply', 'little_duck.compiler', 'little_duck.parser', 'little_duck.nodes'):
+            assert front_end not in modules
+
+    def test_running_bytecode_never_imports_front_end(self, tmp_path):
+        bytecode = tmp_path / 'program.ldc'
+        save_bytecode(compile_code(tmp_path, "program P; main { print(1); return 0; } end;"), bytecode)
+        modules = self.loaded_modules(f"sys.argv = ['run.py', 'run', {str(bytecode)!r}]\nimport run\nrun.main()")
+        assert 'little_duck.vm' in modules
+        for front_end in ('ply', 'little_duck.compiler', 'little_duck.tables'):
+            assert front_end not in modules
+
+    def test_compiler_is_imported_on_use(self):
+        modules = self.loaded_modules("import little_duck\nlittle_duck.LittleDuckCompiler")
+        assert 'little_duck.compiler' in modules
+        assert 'little_duck.parser' in modules
+
+class TestBytecode:
+    code = \
+    """
+    program Bytecode;
+    var message: string;
+    int square(n: int) :
+    {
+        return n * n;
+    }
+    main {
+        var ratio: float;
+        var big: int;
+        message = "Squares: \\"ok\\"";
+        ratio = 0.5;
+        big = 9223372036854775807;
+        print(message, square(3), ratio, true, big * 4);
+        return 0;
+    }
+    end;
+    """
+
+    def test_bytecode_round_trip(self, tmp_path, capsys):
+        generated_code = compile_code(tmp_path, self.code, memoize=True)
+        path = tmp_path / 'test.ldc'
+        save_bytecode(generated_code, path)
+        loaded = load_bytecode(path)
+        assert tuple(loaded) == tuple(generated_code)
+
+        build_vm(generated_code).run()
+        expected = capsys.readouterr().out
+        build_vm(loaded).run()
+        assert capsys.readouterr().out == expected
+
+    def test_big_constants_are_kept(self, tmp_path):
+        func_dir, mem_list, constants, quadruples = compile_code(tmp_path, self.code)
+        constants = constants + [(0, 2**70), (0, -2**63)]
+        loaded = parse_bytecode(dump_bytecode((func_dir, mem_list, constants, quadruples)))
+        assert loaded[2] == constants
+
+    def test_invalid_files_are_rejected(self, tmp_path):
+        data = dump_bytecode(compile_code(tmp_path, self.code))
+        with pytest.raises(BytecodeError, match="not Little Duck bytecode"):
+            parse_bytecode(b"program Test;")
+        with pytest.raises(BytecodeError, match="version"):
+            parse_bytecode(data[:4] + b"\x63\x00" + data[6:])
+        with pytest.raises(BytecodeError, match="corrupted"):
+            parse_bytecode(data[:-3])
+
+        # Constants section ending right after the header of a bool
+        data = bytearray(dump_bytecode(([], [], [(1, True)], [])))
+        for position in range(HEADER.size, HEADER.size + SECTION.size * SECTION_COUNT, SECTION.size):
+            kind, count, offset, size = SECTION.unpack_from(data, position)
+            if kind == CONSTANTS_SECTION:
+                SECTION.pack_into(data, position, kind, count, offset, size - 1)
+        with pytest.raises(BytecodeError, match="corrupted"):
+            parse_bytecode(bytes(data))
+
+    def test_cli_compiles_and_runs_bytecode(self, tmp_path):
+        source = tmp_path / 'test.ld'
+        source.write_text(self.code)
+        bytecode = tmp_path / 'program.ldc'
+        root = Path(__file__).resolve().parent.parent
+
+        def run(*args):
+            return subprocess.run([sys.executable, str(root / 'run.py'), *args], cwd=root,
+                                  check=True, capture_output=True, text=True).stdout
+
+        run('compile', str(source), '-o', str(bytecode), '-O', '--no_cache')
+        assert bytecode.is_file()
+        assert run('run', str(bytecode)) == run(str(source), '--no_cache')
+
+class TestProgramCache:
+    code = \
+    """
+    program Cached;
+    main {
+        print(1 + 2);
+        return 0;
+    }
+    end;
+    """
+
+    def compile(self, tmp_path, cache: ProgramCache, **options):
+        file = tmp_path / 'test.ld'
+        if not file.exists():
+            file.write_text(self.code)
+        compiler = LittleDuckCompiler(program_cache=cache, **options)
+        return compiler.compile(str(file), [])
+
+    def test_same_inputs_hit_the_cache(self, tmp_path, capsys):
+        cache = ProgramCache(directory=tmp_path / 'programs', debug=True)
+        generated_code = self.compile(tmp_path, cache)
+        assert "Compilation cache miss" in capsys.readouterr().out
+
+        assert tuple(self.compile(tmp_path, cache)) == tuple(generated_code)
+        assert "Compilation cache hit" in capsys.readouterr().out
+
+    def test_changed_inputs_miss_the_cache(self, tmp_path, capsys):
+        cache = ProgramCache(directory=tmp_path / 'programs', debug=True)
+        self.compile(tmp_path, cache)
+        self.compile(tmp_path, cache, optimize=True)
+        (tmp_path / 'test.ld').write_text(self.code.replace("1 + 2", "3 + 4"))
+        self.compile(tmp_path, cache)
+
+        output = capsys.readouterr().out
+        assert output.count("Compilation cache miss") == 3
+        assert len(list((tmp_path / 'programs').glob('*.ldc'))) == 3
+
+    def test_least_recently_used_programs_are_evicted(self, tmp_path):
+        cache = ProgramCache(directory=tmp_path / 'programs')
+        generated_code = self.compile(tmp_path, ProgramCache(directory=tmp_path / 'unused'))
+        for i, key in enumerate(['first', 'second', 'third']):
+            cache.put(key, generated_code)
+            os.utime(tmp_path / 'programs' / f"{key}.ldc", (i, i))
+
+        cache.max_size = (tmp_path / 'programs' / 'first.ldc').stat().st_size * 2
+        assert cache.get('first') is not None # Now the most recently used
+        cache.put('fourth', generated_code)
+        assert sorted(p.stem for p in (tmp_path / 'programs').glob('*.ldc')) == ['first', 'fourth']
+
+    def test_broken_entries_are_rebuilt(self, tmp_path):
+        cache = ProgramCache(directory=tmp_path / 'programs')
+        generated_code = self.compile(tmp_path, cache)
+        for entry in (tmp_path / 'programs').glob('*.ldc'):
+            entry.write_bytes(b"LDC\0broken")
+
+        assert tuple(self.compile(tmp_path, cache)) == tuple(generated_code)
+
+class TestModuleCache:
+    modules = {
+        'main.ld': """
+            import Shapes;
+            import Numbers;
+            program Main;
+            main {
+                print(square(3), area(2));
+                return 0;
+            }
+            end;
+        """,
+        'shapes.ld': """
+            import Numbers;
+            program Shapes;
+            int area(side: int) :
+            {
+                return square(side);
+            }
+            main {
+                return 0;
+            }
+            end;
+        """,
+        'numbers.ld': """
+            program Numbers;
+            int square(n: int) :
+            {
+                return n * n;
+            }
+            main {
+                return 0;
+            }
+            end;
+        """,
+    }
+
+    def compile(self, tmp_path, cache: Optional[ModuleCache]):
+        for name, code in self.modules.items():
+            if not (tmp_path / name).exists():
+                (tmp_path / name).write_text(code)
+        compiler = LittleDuckCompiler(module_cache=cache)
+        return compiler.compile(str(tmp_path / 'main.ld'), [str(tmp_path / 'shapes.ld'), str(tmp_path / 'numbers.ld')])
+
+    def test_unchanged_modules_are_not_analyzed(self, tmp_path, capsys):
+        cache = ModuleCache(directory=tmp_path / 'modules', debug=True)
+        generated_code = self.compile(tmp_path, cache)
+        assert capsys.readouterr().out.count("Module cache miss") == 2
+
+        (tmp_path / 'main.ld').write_text(self.modules['main.ld'].replace("area(2)", "area(4)"))
+        cached_code = self.compile(tmp_path, cache)
+        output = capsys.readouterr().out
+        assert output.count("Module cache hit") == 2
+        assert output.count("Module cache knows") == 2
+        assert tuple(cached_code) == tuple(self.compile(tmp_path, None))
+        assert cached_code[2] != generated_code[2]
+
+    def test_only_changed_modules_and_dependents_are_analyzed(self, tmp_path, capsys):
+        cache = ModuleCache(directory=tmp_path / 'modules', debug=True)
+        self.compile(tmp_path, cache)
+        capsys.readouterr()
+
+        (tmp_path / 'shapes.ld').write_text(self.modules['shapes.ld'].replace("square(side)", "square(side) + 1"))
+        cached_code = self.compile(tmp_path, cache)
+        output = capsys.readouterr().out
+        assert output.count("Module cache hit") == 1
+        assert output.count("Module cache miss") == 1
+        assert tuple(cached_code) == tuple(self.compile(tmp_path, None))
+
+    def test_changed_modules_and_their_dependents_are_analyzed(self, tmp_path, capsys):
+        cache = ModuleCache(directory=tmp_path / 'modules', debug=True)
+        self.compile(tmp_path, cache)
+        capsys.readouterr()
+
+        (tmp_path / 'numbers.ld').write_text(self.modules['numbers.ld'].replace("n * n", "n * n * n"))
+        cached_code = self.compile(tmp_path, cache)
+        assert capsys.readouterr().out.count("Module cache miss") == 2
+        assert tuple(cached_code) == tuple(self.compile(tmp_path, None))
+
+class TestParallelParsing:
+    def write_modules(self, tmp_path, count: int):
+        "Main module imports every dependency, and each one calls a function of the previous one"
+        files = []
+        for i in range(count):
+            previous = f"value{i - 1}(n) + " if i > 0 else ""
+            imports = f"import Module{i - 1};" if i > 0 else ""
+            (tmp_path / f'module{i}.ld').write_text(f"""
+                {imports}
+                program Module{i};
+                int value{i}(n: int) :
+                {{
+                    return {previous}n * {i};
+                }}
+                main {{
+                    return 0;
+                }}
+                end;
+            """)
+            files.append(str(tmp_path / f'module{i}.ld'))
+
+        imports = ' '.join(f"import Module{i};" for i in range(count))
+        (tmp_path / 'main.ld').write_text(f"""
+            {imports}
+            program Main;
+            main {{
+                print(value{count - 1}(2));
+                return 0;
+            }}
+            end;
+        """)
+        return str(tmp_path / 'main.ld'), files
+
+    def test_parallel_parsing_generates_same_code(self, tmp_path, capsys):
+        main_file, files = self.write_modules(tmp_path, 5)
+        generated_code = LittleDuckCompiler(workers=2, debug=True).compile(main_file, files)
+        assert "Parsing 5 modules in 2 processes" in capsys.readouterr().out
+        assert tuple(generated_code) == tuple(LittleDuckCompiler().compile(main_file, files))
+
+        build_vm(generated_code).run()
+        assert capsys.readouterr().out.startswith("20")
+
+    def test_small_builds_are_parsed_sequentially(self, tmp_path, capsys):
+        main_file, files = self.write_modules(tmp_path, 2)
+        LittleDuckCompiler(workers=4, debug=True).compile(main_file, files)
+        assert "processes" not in capsys.readouterr().out
+
+    def test_syntax_errors_reach_the_compiler(self, tmp_path):
+        main_file, files = self.write_modules(tmp_path, 4)
+        (tmp_path / 'module2.ld').write_text("program Module2; main { return 0 } end;")
+        with pytest.raises(SyntaxError):
+            LittleDuckCompiler(workers=2).compile(main_file, files)
+
+class TestTwoPassAnalysis:
+    code = \
+    """
+    program Parity;
+    var checks: int;
+    bool isEven(n: int) :
+    {
+        checks = checks + 1;
+        if (n == 0) {
+            return true;
+        }
+        return isOdd(n - 1);
+    }
+    bool isOdd(n: int) :
+    {
+        if (n == 0) {
+            return false;
+        }
+        return isEven(n - 1);
+    }
+    void reset() :
+    {
+        checks = 0;
+        return;
+    }
+    main {
+        reset();
+        print(isEven(10), isOdd(7), isEven(3), checks);
+        return 0;
+    }
+    end;
+    """
+
+    def test_functions_can_call_later_ones(self, tmp_path, capsys):
+        build_vm(compile_code(tmp_path, self.code)).run()
+        assert capsys.readouterr().out.startswith("True True False 12")
+
+    def test_locals_must_be_initialized_before_use(self, tmp_path):
+        code = self.code.replace("reset();", "var count: int; print(count);")
+        with pytest.raises(SemanticError, match="'count' was used before being initialized"):
+            compile_code(tmp_path, code)
+
+    def test_globals_only_main_assigns_must_be_initialized_before_use(self, tmp_path):
+        code = "program P3; var g: int; main { print(g); g = 1; return 0; } end;"
+        with pytest.raises(SemanticError, match="'g' was used before being initialized"):
+            compile_code(tmp_path, code)
+
+    def test_globals_only_a_function_assigns_must_be_initialized_before_use(self, tmp_path):
+        code = self.code.replace("checks = 0;", "print(checks); checks = 0;").replace("checks = checks + 1;", "")
+        with pytest.raises(SemanticError, match="'checks' was used before being initialized"):
+            compile_code(tmp_path, code)
+
+    def test_parallel_analysis_matches_sequential(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.setattr(analyzer, 'MIN_PARALLEL_FUNCTIONS', 2)
+        tree = LittleDuckParser().parse(self.code, LittleDuckLexer())
+
+        sequential = LittleDuckAnalyzer().analyze(tree)
+        parallel = LittleDuckAnalyzer(workers=2, debug=True).analyze(tree)
+        assert "Analyzing 4 functions in 2 processes" in capsys.readouterr().out
+        assert parallel.quadruples == sequential.quadruples
+        assert parallel.tables.functions == sequential.tables.functions
+        assert parallel.tables.variables == sequential.tables.variables
+        assert parallel.tables.constants == sequential.tables.constants
+        assert repr(parallel.tables.inner_scopes) == repr(sequential.tables.inner_scopes)
+        assert parallel.tables.functions['isOdd'].is_used
+
+    def test_parallel_analysis_reports_errors(self, monkeypatch):
+        monkeypatch.setattr(analyzer, 'MIN_PARALLEL_FUNCTIONS', 2)
+        tree = LittleDuckParser().parse(self.code.replace("return isOdd(n - 1);", "return n;"), LittleDuckLexer())
+        with pytest.raises(SemanticError, match="Trying to return int in bool function isEven"):
+            LittleDuckAnalyzer(workers=2).analyze(tree)
+
+class TestModuleSearchPaths:
+    modules = TestModuleCache.modules
+
+    def write_modules(self, directory: Path):
+        directory.mkdir()
+        for name, code in self.modules.items():
+            (directory / name).write_text(code)
+        (directory / 'broken.ld').write_text("program Broken; main { this is not Little Duck } end;")
+
+    def test_imports_are_found_in_search_paths(self, tmp_path, capsys):
+        self.write_modules(tmp_path / 'modules')
+        main_file = tmp_path / 'main.ld'
+        main_file.write_text(self.modules['main.ld'])
+
+        # Broken module is never parsed, as nothing imports it
+        generated_code = LittleDuckCompiler(search_paths=[str(tmp_path / 'modules')]).compile(str(main_file), [])
+        build_vm(generated_code).run()
+        assert capsys.readouterr().out.startswith("9 4")
+
+    def test_explicit_files_come_before_search_paths(self, tmp_path, capsys):
+        self.write_modules(tmp_path / 'modules')
+        (tmp_path / 'numbers.ld').write_text(self.modules['numbers.ld'].replace("n * n", "n + n"))
+        compiler = LittleDuckCompiler(search_paths=[str(tmp_path / 'modules')])
+        generated_code = compiler.compile(str(tmp_path / 'modules' / 'main.ld'), [str(tmp_path / 'numbers.ld')])
+        build_vm(generated_code).run()
+        assert capsys.readouterr().out.startswith("6 4")
+
+    def test_missing_modules_are_reported(self, tmp_path):
+        main_file = tmp_path / 'main.ld'
+        main_file.write_text(self.modules['main.ld'])
+        with pytest.raises(CompileError, match="Module Numbers not found; imported on Main"):
+            LittleDuckCompiler(search_paths=[str(tmp_path)]).compile(str(main_file), [])
+
+    def test_unused_dependency_files_are_rejected(self, tmp_path):
+        self.write_modules(tmp_path / 'modules')
+        (tmp_path / 'extra.ld').write_text("/* program Commented; */ program Extra; main { return 0; } end;")
+        with pytest.raises(CompileError, match="Modules Extra are never imported by main module"):
+            LittleDuckCompiler(search_paths=[str(tmp_path / 'modules')]).compile(
+                str(tmp_path / 'modules' / 'main.ld'), [str(tmp_path / 'extra.ld')])
+
+    def test_long_import_chains_are_sorted(self):
+        modules = {f'module{i}': [f'module{i + 1}'] for i in range(5000)}
+        graph = DependencyGraph()
+        graph.build_graph(modules)
+        assert graph.remove_unused_modules('module0') == set()
+        graph.detect_cycles()
+        assert graph.topological_sort() == [f'module{i}' for i in range(5001)]
+
+    def test_cycles_are_detected_without_recursion(self):
+        modules = {f'module{i}': [f'module{(i + 1) % 5000}'] for i in range(5000)}
+        graph = DependencyGraph()
+        graph.build_graph(modules)
+        with pytest.raises(CompileError, match="Circular dependency detected: module0"):
+            graph.detect_cycles()
+
+    def test_modules_only_imported_by_unused_ones_are_unused(self):
+        graph = DependencyGraph()
+        graph.build_graph({'main': ['used'], 'used': [], 'unused': ['also_unused'], 'also_unused': []})
+        assert graph.remove_unused_modules('main') == {'unused', 'also_unused'}
+
+class TestLinker:
+    library = \
+    """
+    program Library;
+    var calls: int;
+    int twice(n: int) :
+    {
+        if (n > 0) {
+            return n + n;
+        }
+        return 0;
+    }
+    main {
+        return 0;
+    }
+    end;
+    """
+
+    program = \
+    """
+    import Library;
+    program Program;
+    main {
+        calls = 1;
+        while (calls < 4) {
+            print(twice(calls));
+            calls = calls + 1;
+        }
+        return 0;
+    }
+    end;
+    """
+
+    def analyze(self, code: str, analyzer, imports=None):
+        tree = LittleDuckParser().parse(code, LittleDuckLexer())
+        return analyzer.analyze(tree, imports)
+
+    def test_objects_are_relative_to_their_start(self):
+        library = self.analyze(self.library, LittleDuckDependencyAnalyzer())
+        assert library.tables.functions['twice'].start_index == 0
+        assert library.tables.inner_scopes[0].id == 0
+        jumps = [q[3].number for q in library.quadruples if q[0].value.startswith('GOTO')]
+        assert jumps and all(0 <= line <= len(library.quadruples) for line in jumps)
+
+    def test_linked_program_matches_compiler(self, tmp_path, capsys):
+        library = self.analyze(self.library, LittleDuckDependencyAnalyzer())
+        program = self.analyze(self.program, LittleDuckAnalyzer(), import_scope([library]))
+        raw_quadruples, tables = link([library, program])
+
+        # Library is placed after the jump to main
+        assert tables.functions['twice'].start_index == 1
+        assert raw_quadruples[0][3].number == len(raw_quadruples) - 1
+
+        (tmp_path / 'library.ld').write_text(self.library)
+        (tmp_path / 'program.ld').write_text(self.program)
+        generated_code = LittleDuckCompiler().compile(str(tmp_path / 'program.ld'), [str(tmp_path / 'library.ld')])
+        build_vm(generated_code).run()
+        assert capsys.readouterr().out.split() == ['2', '4', '6', 'Program', 'ended', 'with', 'exit', 'code:', '0']
+
+    def test_analysis_does_not_change_objects(self):
+        library = self.analyze(self.library, LittleDuckDependencyAnalyzer())
+        self.analyze(self.program, LittleDuckAnalyzer(), import_scope([library]))
+        assert not library.tables.variables['calls'].is_initialized
+
+    def test_unreachable_functions_are_removed(self):
+        library = self.analyze(self.library.replace("main {", """
+        void unused() :
+        {
+            calls = 42;
+            print("never printed");
+            return;
+        }
+        main {"""), LittleDuckDependencyAnalyzer())
+        program = self.analyze(self.program.replace("twice(calls)", "calls"), LittleDuckAnalyzer(), import_scope([library]))
+        assert reachable_functions([library, program]) == {'main'}
+
+        raw_quadruples, tables = link([library, program], reachable_functions([library, program]))
+        assert list(tables.functions) == ['main']
+        assert tables.functions['main'].start_index == 1
+        assert [scope.id for scope in tables.inner_scopes] == [1]
+        assert not any(c.value in (42, "never printed") for c in tables.constants)
+        assert 'calls' in tables.variables
+
+    def test_function_directory_is_renumbered(self, tmp_path, capsys):
+        (tmp_path / 'library.ld').write_text(self.library.replace("int twice", """
+        int unused(n: int) :
+        {
+            return n;
+        }
+        int twice"""))
+        (tmp_path / 'program.ld').write_text(self.program)
+        generated_code = LittleDuckCompiler().compile(str(tmp_path / 'program.ld'), [str(tmp_path / 'library.ld')])
+        assert [f.identifier for f in generated_code[0]] == [0, 1]
+
+        build_vm(generated_code).run()
+        assert capsys.readouterr().out.split()[:3] == ['2', '4', '6']
+
+    def test_duplicate_symbols_are_rejected(self):
+        library = self.analyze(self.library, LittleDuckDependencyAnalyzer())
+        copy = self.analyze(self.library.replace("Library", "Copy"), LittleDuckDependencyAnalyzer())
+        with pytest.raises(CompileError, match="declared in modules Library and Copy"):
+            link([library, copy])
+
+class TestLongExpressions:
+    def test_long_expression(self, tmp_path, capsys):
+        expression = ' + '.join(['x * 2 - 1'] * 5000)
+        code = f"program Long; main {{ var x: int; x = 1; x = {expression}; print(x); return 0; }} end;"
+        build_vm(compile_code(tmp_path, code, parser_backend='descent')).run()
+        assert capsys.readouterr().out.startswith("5000")
+
+    def test_deeply_nested_expression(self, tmp_path, capsys):
+        expression = '(' * 2000 + 'x' + ' - 1)' * 2000
+        code = f"program Nested; main {{ var x: int; x = 1; print({expression}); return 0; }} end;"
+        build_vm(compile_code(tmp_path, code)).run()
+        assert capsys.readouterr().out.startswith("-1999")
+
+    def test_calls_are_generated_before_operations(self):
+        code = \
+        """
+        program Calls;
+        int f(a: int, b: int) : { return a; }
+        main { var a, b: int; var c: bool; a = 1; b = 2; c = a * b != f(1 + 2, -b); return 0; }
+        end;
+        """
+        tree = LittleDuckParser().parse(code, LittleDuckLexer())
+        quadruples = LittleDuckAnalyzer().analyze(tree).quadruples
+        end = next(i for i, q in enumerate(quadruples) if q[3] == QuadrupleIdentifier('c')) + 1
+        assert [' '.join(qstr(v) for v in q if v is not None) for q in quadruples[end - 9:end]] == [
+            "+ 1 2 t_0", "* b -1 t_1", "PARAM t_0", "PARAM t_1", "CALL f t_2",
+            "* a b t_3", "== t_3 t_2 t_4", "== t_4 False t_5", "ASSIGN t_5 c",
+        ]
+
+class TestCompactNodes:
+    code = \
+    """
+    program Compact;
+    var total: int;
+    int add(a: int, b: int) : { return a + b; }
+    main {
+        total = 0;
+        while (total < 10) { total = add(total, 2); }
+        if (total > 5) { print(total); } else { print("small"); }
+        return 0;
+    }
+    end;
+    """
+
+    def test_nodes_and_operands_have_slots(self):
+        tree = LittleDuckParser().parse(self.code, LittleDuckScanner())
+        quadruples = LittleDuckAnalyzer().analyze(tree).quadruples
+        assert not hasattr(tree, '__dict__')
+        assert not hasattr(tree.main_func.body.statements[1].condition, '__dict__')
+        assert all(not hasattr(value, '__dict__') for quadruple in quadruples for value in quadruple[1:])
+
+    def test_operands_are_shared(self):
+        tree = LittleDuckParser().parse(self.code, LittleDuckScanner())
+        quadruples = LittleDuckAnalyzer().analyze(tree).quadruples
+        totals = [value for quadruple in quadruples for value in quadruple if value == QuadrupleIdentifier('total')]
+        assert len(totals) > 3
+        assert all(total is totals[0] for total in totals)
+
+    @pytest.mark.parametrize('parser', [LittleDuckParser, LittleDuckDescentParser])
+    def test_block_ids_are_numbered_per_module(self, parser):
+        first, second = parser().parse(self.code, LittleDuckScanner()), parser().parse(self.code, LittleDuckScanner())
+        assert first == second
+
+        # Blocks are numbered as they end, starting with the body of add
+        loop, condition = first.main_func.body.statements[1:3]
+        assert [loop.body.identifier, condition.body.identifier, condition.else_body.identifier] == ['1', '2', '3']
+
+class TestCodeGeneratorIndexes:
+    def test_inner_variables_hide_outer_ones(self, tmp_path, capsys):
+        code = \
+        """
+        program Shadow;
+        var x: int;
+        int f(x: int) : { var y: int; y = x * 10; return y; }
+        main {
+            x = 1;
+            if (x == 1) { var y: int; y = 5; x = x + y; }
+            print(f(2), x);
+            return 0;
+        }
+        end;
+        """
+        build_vm(compile_code(tmp_path, code)).run()
+        assert capsys.readouterr().out.startswith("20 6")
+
+    def test_equal_values_of_different_types_are_different_constants(self, tmp_path, capsys):
+        code = 'program Constants; main { print(1, 1.0, true, "1", 0, false, 1); return 0; } end;'
+        generated_code = compile_code(tmp_path, code)
+        build_vm(generated_code).run()
+        assert capsys.readouterr().out.startswith("1 1.0 True 1 0 False 1")
+        assert len(generated_code[2]) == 6
+
+class TestStreamingCompilation:
+    code = \
+    """
+    program Streaming;
+    var total: int;
+    int add(n: int) :
+    {
+        total = total + n;
+        return total;
+    }
+    void unused() :
+    {
+        print("never printed");
+        return;
+    }
+    main {
+        var i: int;
+        var big: bool;
+        total = 0;
+        i = 0;
+        while (i != 3) {
+            big = i > 1;
+            print(add(i * 2), -i, !big, 1.5);
+            i = i + 1;
+        }
+        return 0;
+    }
+    end;
+    """
+
+    def test_streamed_program_runs_like_whole_program(self, tmp_path, capsys):
+        source = tmp_path / 'test.ld'
+        source.write_text(self.code)
+        buffer = io.BytesIO()
+        LittleDuckCompiler().compile_to_file(str(source), [], buffer)
+        buffer.seek(0)
+        streamed = load_bytecode(buffer)
+
+        # Unreachable functions are kept
+        assert len(streamed[0]) == 3
+
+        build_vm(compile_code(tmp_path, self.code)).run()
+        expected = capsys.readouterr().out
+        build_vm(streamed).run()
+        assert capsys.readouterr().out == expected
+
+    def test_streamed_bytecode_matches_whole_program(self, tmp_path):
+        # Every function is reachable, so both place the same ones
+        (tmp_path / 'library.ld').write_text(TestLinker.library)
+        (tmp_path / 'program.ld').write_text(TestLinker.program)
+        files = str(tmp_path / 'program.ld'), [str(tmp_path / 'library.ld')]
+
+        generated_code = LittleDuckCompiler(memoize=True).compile(*files)
+        LittleDuckCompiler(memoize=True).compile_to_file(*files, tmp_path / 'program.ldc')
+        assert tuple(load_bytecode(tmp_path / 'program.ldc')) == tuple(generated_code)
+
+    def test_program_constants_match_analysis(self):
+        tree = LittleDuckParser().parse(self.code, LittleDuckLexer())
+        constants = analyzer.program_constants(tree)
+        assert constants == LittleDuckAnalyzer().analyze(tree).tables.constants
+
+    def test_failed_compilation_leaves_no_file(self, tmp_path):
+        source = tmp_path / 'test.ld'
+        source.write_text(self.code.replace("return total;", ""))
+        output = tmp_path / 'test.ldc'
+        with pytest.raises(SemanticError, match="never returns"):
+            LittleDuckCompiler().compile_to_file(str(source), [], output)
+        assert not output.exists()
+
+        source.write_text(self.code)
+        with pytest.raises(CompileError, match="optimized"):
+            LittleDuckCompiler(optimize=True).compile_to_file(str(source), [], output)
+        assert not output.exists()
+
+class TestCompilerSession:
+    library = TestLinker.library
+    program = TestLinker.program
+
+    def write_files(self, tmp_path: Path):
+        (tmp_path / 'library.ld').write_text(self.library)
+        (tmp_path / 'program.ld').write_text(self.program)
+        (tmp_path / 'other.ld').write_text(self.program.replace("Program", "Other").replace("calls < 4", "calls < 3"))
+        return str(tmp_path / 'library.ld'), str(tmp_path / 'program.ld'), str(tmp_path / 'other.ld')
+
+    def test_forked_scope_never_changes_original(self):
+        library = LittleDuckDependencyAnalyzer().analyze(LittleDuckParser().parse(self.library, LittleDuckLexer()))
+        scope = import_scope([library])
+        fork = scope.fork()
+        fork.variables['calls'].is_initialized = True
+        fork.get_function('twice').is_used = True
+
+        assert not scope.variables['calls'].is_initialized
+        assert not scope.functions['twice'].is_used
+        assert fork.variables['calls'].is_initialized and fork.functions['twice'].is_used
+        assert fork.fork().variables['calls'].is_initialized
+
+    def test_session_compiles_like_compiler(self, tmp_path):
+        library, program, other = self.write_files(tmp_path)
+        session = LittleDuckCompilerSession()
+        for main in (program, other, program):
+            assert session.compile(main, [library]) == LittleDuckCompiler().compile(main, [library])
+
+    def test_dependencies_are_analyzed_once(self, tmp_path, monkeypatch):
+        library, program, other = self.write_files(tmp_path)
+        session = LittleDuckCompilerSession()
+        session.compile(program, [library])
+
+        analyzed = []
+        original_analyze = LittleDuckDependencyAnalyzer.analyze
+        monkeypatch.setattr(LittleDuckDependencyAnalyzer, 'analyze',
+                            lambda self, *args: analyzed.append(args) or original_analyze(self, *args))
+        session.compile(other, [library])
+        assert analyzed == []
+
+        # Changed dependencies are analyzed again
+        Path(library).write_text(self.library.replace("n + n", "n + n + 1"))
+        func_dir, mem_list, constants, quadruples = session.compile(other, [library])
+        assert len(analyzed) == 1
+        assert (0, 1) in constants
+
+class TestBatch:
+    programs = {
+        'count.ld': """
+            program Count;
+            main {
+                var i: int;
+                i = 0;
+                while (i < 3) {
+                    i = i + 1;
+                    print(i);
+                }
+                return 7;
+            }
+            end;
+        """,
+        'endless.ld': """
+            program Endless;
+            main {
+                var i: int;
+                i = 0;
+                while (i > -1) {
+                    i = i + 1;
+                }
+                return 0;
+            }
+            end;
+        """,
+        'undeclared.ld': """
+            program Undeclared;
+            main {
+                x = 1;
+                return 0;
+            }
+            end;
+        """,
+    }
+
+    def write_programs(self, tmp_path: Path):
+        for name, code in self.programs.items():
+            (tmp_path / name).write_text(code)
+        return program_files([str(tmp_path)])
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_batch_reports_every_program(self, tmp_path, workers):
+        programs = self.write_programs(tmp_path)
+        results = list(run_batch(programs, [], workers=workers, timeout=0.5))
+
+        assert [result.program for result in results] == programs
+        count, endless, undeclared = results
+        assert (count.status, count.exit_code) == ('ok', 7)
+        assert count.stdout.startswith("1\n2\n3\n")
+        assert endless.status == 'timeout' and endless.exit_code is None
+        assert 500 <= endless.compile_ms + endless.run_ms < 5000
+        assert undeclared.status == 'semantic_error' and undeclared.run_ms == 0
+
+    def test_vm_stops_at_deadline(self, tmp_path):
+        code = compile_code(tmp_path, self.programs['endless.ld'])
+        with pytest.raises(VirtualMachineError, match="time limit"):
+            build_vm(code).run(deadline=0)
+
+    def test_cli_writes_json_lines(self, tmp_path):
+        self.write_programs(tmp_path)
+        report = tmp_path / 'report.jsonl'
+        output = subprocess.run([sys.executable, str(ROOT / 'run.py'), 'batch', str(tmp_path),
+                                 '-o', str(report), '-t', '0.2', '-w', '1', '--no_cache'],
+                                cwd=ROOT, check=True, capture_output=True, text=True)
+
+        results = [json.loads(line) for line in report.read_text().splitlines()]
+        assert [result['status'] for result in results] == ['ok', 'timeout', 'semantic_error']
+        assert "Ran 3 programs" in output.stderr
+
+class TestDaemon:
+    programs = TestBatch.programs
+
+    @pytest.fixture
+    def daemon(self, tmp_path):
+        "Starts a daemon and returns its socket, stopping it after the test"
+        socket_path = str(tmp_path / 'run' / 'daemon.sock')
+        process = subprocess.Popen([sys.executable, str(ROOT / 'run.py'), 'daemon', '--socket', socket_path,
+                                    '-w', '2', '-t', '0.5', '--no_cache'],
+                                   cwd=ROOT, stdout=subprocess.PIPE, text=True)
+        assert process.stdout is not None and process.stdout.readline().startswith("Listening")
+        yield socket_path
+
+        process.terminate()
+        process.wait(timeout=10)
+        assert not os.path.exists(socket_path)
+
+    def run(self, socket_path: str, **message):
+        answers = list(request(message, socket_path))
+        return ''.join(answer['stdout'] for answer in answers[:-1]), answers[-1]
+
+    def test_daemon_runs_programs(self, tmp_path, daemon):
+        for name, code in self.programs.items():
+            (tmp_path / name).write_text(code)
+
+        output, result = self.run(daemon, command='run', program=str(tmp_path / 'count.ld'))
+        assert (result['status'], result['exit_code']) == ('ok', 7)
+        assert output == "1\n2\n3\n\nProgram ended with exit code: 7\n"
+
+        # Clients can't turn off or extend the daemon's timeout
+        for timeout in (None, 60):
+            _, result = self.run(daemon, command='run', program=str(tmp_path / 'endless.ld'), timeout=timeout)
+            assert result['status'] == 'timeout'
+            assert result['compile_ms'] + result['run_ms'] < 5000
+        _, result = self.run(daemon, command='run', program=str(tmp_path / 'endless.ld'), timeout=0.1)
+        assert result['status'] == 'timeout' and result['compile_ms'] + result['run_ms'] < 400
+        _, result = self.run(daemon, command='run', program=str(tmp_path / 'undeclared.ld'))
+        assert result['status'] == 'semantic_error'
+        _, result = self.run(daemon, command='jump', program=str(tmp_path / 'count.ld'))
+        assert result['status'] == 'bad_request'
+
+    def test_daemon_is_private_and_uses_client_directory(self, tmp_path, daemon):
+        assert os.stat(daemon).st_mode & 0o777 == 0o600
+        assert os.stat(tmp_path / 'run').st_mode & 0o777 == 0o700
+
+        (tmp_path / 'count.ld').write_text(self.programs['count.ld'])
+        _, result = self.run(daemon, command='compile', cwd=str(tmp_path), program='count.ld', output='count.ldc')
+        assert result['status'] == 'ok'
+        assert load_bytecode(tmp_path / 'count.ldc') == LittleDuckCompiler().compile(str(tmp_path / 'count.ld'), [])
+        assert not (ROOT / 'count.ldc').exists()
+
+    def test_sockets_of_other_users_are_refused(self, daemon, monkeypatch):
+        monkeypatch.setattr(os, 'getuid', lambda: os.stat(daemon).st_uid + 1)
+        with pytest.raises(PermissionError, match="belongs to another user"):
+            next(request({'command': 'stop'}, daemon))
+
+    def test_daemon_refuses_directories_others_can_write(self, tmp_path):
+        shared = tmp_path / 'shared'
+        shared.mkdir()
+        shared.chmod(0o777)
+        with pytest.raises(OSError, match="Other users could replace the socket"):
+            CompilerDaemon(str(shared / 'daemon.sock')).listen()
+
+    def test_default_socket_is_in_a_private_directory(self, monkeypatch):
+        monkeypatch.delenv('LITTLE_DUCK_SOCKET', raising=False)
+        monkeypatch.setenv('XDG_RUNTIME_DIR', '/run/user/1000')
+        assert default_socket_path() == '/run/user/1000/little_duck.sock'
+
+        monkeypatch.delenv('XDG_RUNTIME_DIR')
+        monkeypatch.setenv('TMPDIR', '/tmp')
+        assert default_socket_path() == f'/tmp/little_duck-{os.getuid()}/little_duck.sock'
+
+    def test_client_runs_and_compiles_like_run_py(self, tmp_path, daemon):
+        def run(script, *args, check=True):
+            return subprocess.run([sys.executable, str(ROOT / script), *args], cwd=ROOT,
+                                  check=check, capture_output=True, text=True)
+
+        assert run('client.py', 'code.ld', '-deps', 'algorithms.ld', '--socket', daemon).stdout == \
+               run('run.py', 'code.ld', '-deps', 'algorithms.ld', '--no_cache').stdout
+
+        bytecode = tmp_path / 'code.ldc'
+        run('client.py', 'compile', 'code.ld', '-deps', 'algorithms.ld', '-o', str(bytecode), '--socket', daemon)
+        assert load_bytecode(bytecode) == LittleDuckCompiler().compile('code.ld', ['algorithms.ld'])
+
+        failed = run('client.py', 'examples/var_test.ld', '--socket', daemon, check=False)
+        assert failed.returncode == 1 and failed.stdout.startswith("SemanticError:")
+
+        run('client.py', 'stop', '--socket', daemon)
+        for _ in range(100):
+            if not os.path.exists(daemon):
+                break
+            time.sleep(0.1)
+        assert run('client.py', 'code.ld', '--socket', daemon, check=False).returncode == 2